@@ -1,11 +1,9 @@
-import pickle
 import time
 from typing import Optional, Any
 
-from fastapi import Depends, APIRouter, Request
+from fastapi import Depends, APIRouter, Request, Query
 from fastapi.encoders import jsonable_encoder
 from fastapi.security import OAuth2PasswordBearer
-from fastapi_pagination import Params, paginate
 from loguru import logger
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
@@ -14,7 +12,6 @@ from xpinyin import Pinyin
 
 from apis.manage.user.user_manage_controller import create_access_token
 from core import deps
-from core.setting import settings
 from core.utils.dependencies import DALGetter
 from core.utils.return_message import general_message, error_message
 from core.utils.validation import is_qualified_name
@@ -45,6 +42,7 @@ from schemas.wutong_team_app import DevOpsTeamAppCreateParam
 from service.app_actions.app_deploy import app_deploy_service
 from service.app_actions.exception import ErrServiceSourceNotFound
 from service.app_config.app_relation_service import dependency_service
+from service.base_services import base_service
 from service.application_service import application_service
 from service.market_app_service import market_app_service
 from service.region_service import region_services
@@ -145,7 +143,6 @@ async def add_team(
         return JSONResponse(
             general_message(400, "success", "团队在集群【{} 】中已存在命名空间 {}".format(exist_namespace_region, team.namespace),
                             bean=jsonable_encoder(team)))
-    request.app.state.redis.set("team_%s" % team.tenant_name, pickle.dumps(team), settings.REDIS_CACHE_TTL)
     result = general_message(200, "success", "团队添加成功", bean=jsonable_encoder(team))
     return JSONResponse(status_code=200, content=result)
 
@@ -435,6 +432,8 @@ async def app_models(
 @router.get("/v1.0/devops/teams/{team_code}/components", response_model=Response, name="组件列表")
 async def get_app_state(
         request: Request,
+        page: int = Query(default=1, ge=1),
+        page_size: int = Query(default=-1, ge=-1),
         authorization: Optional[str] = Depends(oauth2_scheme),
         team_code: Optional[str] = None,
         session: SessionClass = Depends(deps.get_session)
@@ -454,7 +453,7 @@ async def get_app_state(
            type: string
            paramType: query
          - name: page_size
-           description: 每页展示个数(默认10个)
+           description: 每页展示个数(默认-1, -1/0 返回全部)
            required: false
            type: string
            paramType: query
@@ -466,8 +465,9 @@ async def get_app_state(
      """
     try:
         code = 200
-        page = 1
-        page_size = 99
+        # page_size 为 -1/0 时返回全部, 否则分页在数据库中完成
+        if page_size <= 0:
+            page_size = None
         application_id = request.query_params.get("application_id")
         region_name = request.query_params.get("region_name")
         if application_id is None or not application_id.isdigit():
@@ -487,13 +487,11 @@ async def get_app_state(
                 team_name=team_code,
                 team_id=team.tenant_id,
                 region_name=region_name,
-                enterprise_id=team.enterprise_id)
-            if page_size == "-1" or page_size == "" or page_size == "0":
-                page_size = len(no_group_service_list) if len(no_group_service_list) > 0 else 10
-            page_params = Params(page=page, size=page_size)
-            pg = paginate(no_group_service_list, page_params)
-            total = pg.total
-            result = general_message(code, "query success", "应用查询成功", list=pg.items, total=total)
+                enterprise_id=team.enterprise_id,
+                page=page,
+                page_size=page_size)
+            total = base_service.count_no_group_services(session, team.tenant_id, region_name)
+            result = general_message(code, "query success", "应用查询成功", list=no_group_service_list, total=total)
             return JSONResponse(result, status_code=code)
 
         team_id = team.tenant_id
@@ -509,11 +507,11 @@ async def get_app_state(
             region_name=region_name,
             team_id=team.tenant_id,
             team_name=team_code,
-            enterprise_id=team.enterprise_id)
-        params = Params(page=page, size=page_size)
-        pg = paginate(group_service_list, params)
-        total = pg.total
-        result = general_message(code, "query success", "应用查询成功", list=jsonable_encoder(pg.items),
+            enterprise_id=team.enterprise_id,
+            page=page,
+            page_size=page_size)
+        total = base_service.count_group_services(session, team.tenant_id, region_name, application_id)
+        result = general_message(code, "query success", "应用查询成功", list=jsonable_encoder(group_service_list),
                                  total=total)
         return JSONResponse(result, status_code=200)
     except GroupNotExistError as e:
@@ -525,10 +523,10 @@ async def get_app_state(
 async def get_un_dependency(
         request: Request,
         authorization: Optional[str] = Depends(oauth2_scheme),
+        page: int = Query(default=1, ge=1),
+        page_size: int = Query(default=-1, ge=-1),
         session: SessionClass = Depends(deps.get_session)
 ) -> Any:
-    page_num = 1
-    page_size = 99
     team_code = request.query_params.get("team_code")
     search_key = None
     condition = None
@@ -562,7 +560,8 @@ async def get_un_dependency(
         elif search_key is None and not condition:
             dep_list.append(dep_service_info)
 
-    rt_list = dep_list[(page_num - 1) * page_size:page_num * page_size]
+    # page_size 为 -1/0 时返回全部
+    rt_list = dep_list[(page - 1) * page_size:page * page_size] if page_size > 0 else dep_list
     result = general_message(200, "success", "查询成功", list=rt_list, total=len(dep_list))
     return JSONResponse(result, status_code=result["code"])
 
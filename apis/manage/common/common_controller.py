@@ -7,9 +7,12 @@ from fastapi.encoders import jsonable_encoder
 from loguru import logger
 from starlette.responses import JSONResponse
 
+from common.region_client_pool import region_client_pool
+from common.region_executor import region_executor
 from core.utils.return_message import general_message
 from core import deps
-from database.session import SessionClass
+from core.utils.metrics import metrics
+from database.session import SessionClass, get_pool_status, async_engine
 from exceptions.exceptions import LogoFormatError, LogoSizeError
 from models.base.err_log import Errorlog
 from repository.users.perms_repo import perms_repo
@@ -72,3 +75,14 @@ async def get_perms_info() -> Any:
     perms = perms_repo.get_perms_info()
     result = general_message(200, None, None, bean=jsonable_encoder(perms))
     return JSONResponse(result, status_code=200)
+
+
+@router.get("/runtime/metrics", response_model=Response, name="获取运行时指标")
+async def get_runtime_metrics() -> Any:
+    bean = metrics.snapshot()
+    bean["db_pool"] = get_pool_status()
+    bean["db_async_pool"] = get_pool_status(async_engine.sync_engine, prefix="db.async_pool.")
+    bean["region_executor"] = region_executor.stats()
+    bean["region_pools"] = region_client_pool.stats()
+    result = general_message(200, None, None, bean=jsonable_encoder(bean))
+    return JSONResponse(result, status_code=200)
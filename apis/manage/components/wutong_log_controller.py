@@ -2,6 +2,7 @@ from typing import Any, Optional
 
 from fastapi import Request, APIRouter, Depends
 from fastapi.responses import JSONResponse
+from starlette.responses import StreamingResponse
 
 from core import deps
 from core.utils.return_message import general_message
@@ -9,6 +10,7 @@ from database.session import SessionClass
 from repository.component.group_service_repo import service_info_repo
 from schemas.response import Response
 from service.app_actions.app_log import log_service
+from service.app_actions.app_log_stream import log_stream_service
 
 router = APIRouter()
 
@@ -54,3 +56,58 @@ async def get_log(request: Request,
         return JSONResponse(general_message(code, "query service log error", msg), status_code=code)
     result = general_message(200, "success", "查询成功", list=log_list)
     return JSONResponse(result, status_code=result["code"])
+
+
+@router.get("/teams/{team_name}/apps/{serviceAlias}/log/stream", name="组件日志实时推送")
+async def stream_log(request: Request,
+                     serviceAlias: Optional[str] = None,
+                     session: SessionClass = Depends(deps.get_session),
+                     team=Depends(deps.get_current_team)) -> Any:
+    """
+    以 SSE 推送组件日志
+    ---
+    parameters:
+        - name: lines
+          description: 轮询模式下每次拉取的日志数量，默认为100
+          required: false
+          type: integer
+          paramType: query
+        - name: pod_name
+          description: 指定时推送该实例的容器日志流
+          required: false
+          type: string
+          paramType: query
+        - name: container_name
+          description: 容器名称，指定 pod_name 时必填
+          required: false
+          type: string
+          paramType: query
+        - name: keyword
+          description: 只推送包含关键字的日志
+          required: false
+          type: string
+          paramType: query
+        - name: cursor
+          description: 从该事件 id 之后继续推送，也可通过 Last-Event-ID 请求头传递
+          required: false
+          type: string
+          paramType: query
+
+    """
+    lines = int(request.query_params.get("lines", 100))
+    pod_name = request.query_params.get("pod_name")
+    container_name = request.query_params.get("container_name")
+    if pod_name and not container_name:
+        return JSONResponse(general_message(400, "the field 'container_name' is required", "缺少容器名称"),
+                            status_code=400)
+    keyword = request.query_params.get("keyword")
+    cursor = request.headers.get("last-event-id") or request.query_params.get("cursor")
+    service = service_info_repo.get_service(session, serviceAlias, team.tenant_id)
+    if not service:
+        return JSONResponse(general_message(404, "service not found", "组件不存在"), status_code=404)
+    source = log_stream_service.get_log_source(session, team, service, lines=lines, pod_name=pod_name,
+                                               container_name=container_name)
+    deps.release_session(session)
+    return StreamingResponse(log_stream_service.stream(source, cursor=cursor, keyword=keyword),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
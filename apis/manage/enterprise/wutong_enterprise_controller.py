@@ -1,4 +1,3 @@
-import pickle
 from typing import Any, Optional
 
 from fastapi import APIRouter, Depends, Query
@@ -10,6 +9,7 @@ from starlette.requests import Request
 from starlette.responses import StreamingResponse
 
 from clients.remote_build_client import remote_build_client
+from common.region_fanout import fan_out, region_errors
 from core import deps
 from core.enum.enterprise_enum import EnterpriseRolesEnum
 from core.utils.perms import ENTERPRISE
@@ -281,17 +281,21 @@ async def monitor(enterprise_id: Optional[str] = None, session: SessionClass = D
         result = general_message(404, "no found", None)
         return JSONResponse(result, status_code=200)
     region_num = len(usable_regions)
-    for region in usable_regions:
-        try:
-            res, body = remote_build_client.get_region_resources(session, enterprise_id, region=region.region_name)
-            if res.get("status") == 200:
-                region_memory_total += body["bean"]["cap_mem"]
-                region_memory_used += body["bean"]["req_mem"]
-                region_cpu_total += body["bean"]["cap_cpu"]
-                region_cpu_used += body["bean"]["req_cpu"]
-        except Exception as e:
-            logger.debug(e)
+
+    def _get_region_resources(region_session, region_name):
+        res, body = remote_build_client.get_region_resources(region_session, enterprise_id, region=region_name)
+        if res.get("status") == 200:
+            return body["bean"]
+        return None
+
+    results = await fan_out([region.region_name for region in usable_regions], _get_region_resources)
+    for result in results:
+        if not result.data:
             continue
+        region_memory_total += result.data["cap_mem"]
+        region_memory_used += result.data["req_mem"]
+        region_cpu_total += result.data["cap_cpu"]
+        region_cpu_used += result.data["req_cpu"]
     data = {
         "total_regions": region_num,
         "memory": {
@@ -303,7 +307,7 @@ async def monitor(enterprise_id: Optional[str] = None, session: SessionClass = D
             "total": region_cpu_total
         }
     }
-    result = general_message(200, "success", None, bean=data)
+    result = general_message(200, "success", None, bean=data, regions=region_errors(results))
     return JSONResponse(result, status_code=result["code"])
 
 
@@ -344,7 +348,6 @@ async def enterprise_admin_join_team(request: Request,
                                                               tenant_name=team_name)
     if not team:
         raise ServiceHandleException(msg="no found team", msg_show="团队不存在", status_code=404)
-    request.app.state.redis.set("team_%s" % team_name, pickle.dumps(team), 24 * 60 * 60)
 
     users = team_services.get_team_users(session=session, team=team)
     if users:
@@ -230,7 +230,6 @@ async def delete_user(request: Request,
     if oauth_instance:
         oauth_instance.delete_user(enterprise_id, user.enterprise_center_user_id)
     oauth_user_repo.del_all_user_oauth(session, user_id)
-    request.app.state.redis.delete("user_%d" % user.user_id)
     result = general_message(200, "success", "删除用户成功")
     return JSONResponse(result, status_code=200)
 
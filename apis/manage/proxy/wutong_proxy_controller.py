@@ -2,7 +2,7 @@ import os
 from typing import Optional, Any
 from fastapi import APIRouter, Request, Depends
 from starlette.responses import JSONResponse
-from clients.remote_app_client import remote_app_client
+from clients.async_remote_app_client import async_remote_app_client
 from core import deps
 from core.utils.return_message import general_message
 from database.session import SessionClass
@@ -11,6 +11,21 @@ from service.region_service import region_services
 
 router = APIRouter()
 
+PROXY_MAX_JSON_BODY_SIZE = int(os.environ.get("PROXY_MAX_JSON_BODY_SIZE", 10 * 1024 * 1024))
+
+
+async def _read_body(request, limit):
+    """
+    按块读取请求体, 超过 limit 时返回 None
+    分块传输的请求没有 content-length, 只检查请求头无法限制大小
+    """
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > limit:
+            return None
+    return bytes(body)
+
 
 @router.api_route(
     "/wt-proxy/{url:path}",
@@ -26,25 +41,26 @@ async def proxy(
         request: Request,
         url: Optional[str] = None,
         session: SessionClass = Depends(deps.get_session)) -> Any:
-    body = await request.body()
-    try:
-        data_json = await request.json()
-    except:
-        data_json = {}
-    region = await region_services.get_region_by_request(session, request)
+    # 仅 JSON 请求体中可能携带集群名称, 读入内存(受大小限制); 其他请求体(文件上传等)直接流式转发
+    body = None
+    if "json" in request.headers.get("content-type", ""):
+        if int(request.headers.get("content-length") or 0) > PROXY_MAX_JSON_BODY_SIZE:
+            return JSONResponse(general_message(413, "request body too large", "请求体过大"), status_code=413)
+        body = await _read_body(request, PROXY_MAX_JSON_BODY_SIZE)
+        if body is None:
+            return JSONResponse(general_message(413, "request body too large", "请求体过大"), status_code=413)
+    region = await region_services.get_region_by_request(session, request, read_body=False, body=body)
     if not region:
         return JSONResponse(general_message(400, "not found region", "数据中心不存在"), status_code=400)
+    # 转发期间不再访问数据库, 提前归还连接, 避免大文件上传下载期间一直占用
+    deps.release_session(session)
 
     params = str(request.query_params)
     remoteurl = "{}/{}?{}".format(region.url, url, params)
-    response = await remote_app_client.proxy(
-        request,
-        remoteurl,
-        region,
-        data_json,
-        body)
-    if response.status_code == 200:
+    response = await async_remote_app_client.proxy_stream(request, remoteurl, region, body)
+    # 200 为流式响应; 未跟随的重定向连同 Location 原样返回
+    if response.status_code == 200 or 300 <= response.status_code < 400:
         return response
     else:
-        return JSONResponse(general_message(response.status_code, bytes.decode(response.body), ""),
+        return JSONResponse(general_message(response.status_code, response.body.decode(errors="replace"), ""),
                             status_code=response.status_code)
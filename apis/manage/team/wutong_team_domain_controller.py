@@ -1,6 +1,6 @@
 from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Query
 from fastapi.responses import JSONResponse
 from loguru import logger
 from sqlalchemy import select, func
@@ -391,6 +391,19 @@ async def get_tenant_certificates(request: Request,
     return JSONResponse(result, status_code=result["code"])
 
 
+@router.get("/teams/{team_name}/certificates/expiring", response_model=Response, name="即将过期的网关证书")
+async def get_expiring_certificates(days: int = Query(default=30, ge=0, le=3650),
+                                    session: SessionClass = Depends(deps.get_session),
+                                    team=Depends(deps.get_current_team),
+                                    user=Depends(deps.get_current_user)) -> Any:
+    """
+    获取团队下指定天数内过期(含已过期)的证书
+    """
+    certificates = domain_service.get_expiring_certificates(session=session, tenant=team, days=days)
+    result = general_message(200, "success", "查询成功", list=certificates)
+    return JSONResponse(result, status_code=result["code"])
+
+
 @router.post("/teams/{team_name}/certificates", response_model=Response, name="添加网关证书")
 async def add_tenant_certificates(request: Request,
                                   session: SessionClass = Depends(deps.get_session),
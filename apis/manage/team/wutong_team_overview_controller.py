@@ -6,14 +6,13 @@ from fastapi.responses import JSONResponse
 from fastapi_pagination import Params, paginate
 from loguru import logger
 
-from clients.remote_app_client import remote_app_client
-from clients.remote_build_client import remote_build_client
+from clients.async_remote_app_client import async_remote_app_client
+from common.region_executor import region_executor
 from core import deps
 from core.utils.return_message import general_message
 from core.utils.status_translate import get_status_info_map
 from database.session import SessionClass
 from exceptions.exceptions import GroupNotExistError
-from models.region.models import RegionApp
 from repository.application.application_repo import application_repo
 from repository.component.group_service_repo import service_info_repo
 from repository.region.region_app_repo import region_app_repo
@@ -61,20 +60,27 @@ async def get_app_state(request: Request,
             return JSONResponse(general_message(400, "not found region", "数据中心不存在"), status_code=400)
         region_name = region.region_name
 
+        # page_size 为 -1/0 时返回全部, 否则分页在数据库中完成, 只查询当前页组件的状态
+        if page_size == 999:
+            page_size = 100
+        paged = page_size > 0
         if group_id == "-1":
             # query service which not belong to any app
-            no_group_service_list = service_info_repo.get_no_group_service_status_by_group_id(
-                session=session,
+            no_group_service_list = await region_executor.run_with_session(
+                region_name,
+                service_info_repo.get_no_group_service_status_by_group_id,
                 team_name=team_name,
                 team_id=team.tenant_id,
                 region_name=region_name,
-                enterprise_id=team.enterprise_id)
-            if page_size == "-1" or page_size == "" or page_size == "0":
-                page_size = len(no_group_service_list) if len(no_group_service_list) > 0 else 10
-            params = Params(page=page, size=page_size)
-            pg = paginate(no_group_service_list, params)
-            total = pg.total
-            result = general_message(code, "query success", "应用查询成功", list=no_group_service_list, total=total)
+                enterprise_id=team.enterprise_id,
+                page=page if paged else None,
+                page_size=page_size if paged else None)
+            if paged:
+                total = base_service.count_no_group_services(session, team.tenant_id, region_name)
+            else:
+                total = len(no_group_service_list)
+            result = general_message(code, "query success", "应用查询成功", list=jsonable_encoder(no_group_service_list),
+                                     total=total)
             return JSONResponse(result, status_code=code)
 
         team_id = team.tenant_id
@@ -84,22 +90,22 @@ async def get_app_state(request: Request,
             result = general_message(202, "group is not yours!", "当前组已删除或您无权限查看！", bean={})
             return JSONResponse(result, status_code=202)
 
-        group_service_list = service_info_repo.get_group_service_by_group_id(
-            session=session,
+        group_service_list = await region_executor.run_with_session(
+            region_name,
+            service_info_repo.get_group_service_by_group_id,
             group_id=group_id,
             region_name=region_name,
             team_id=team.tenant_id,
             team_name=team_name,
             enterprise_id=team.enterprise_id,
-            query=query)
-        if page_size == -1 or str(page_size) == "" or page_size == 0:
-            page_size = len(group_service_list) if len(group_service_list) > 0 else 10
-        if page_size == 999:
-            page_size = 100
-        params = Params(page=page, size=page_size)
-        pg = paginate(group_service_list, params)
-        total = pg.total
-        result = general_message(code, "query success", "应用查询成功", list=jsonable_encoder(pg.items),
+            query=query,
+            page=page if paged else None,
+            page_size=page_size if paged else None)
+        if paged:
+            total = base_service.count_group_services(session, team.tenant_id, region_name, group_id, query)
+        else:
+            total = len(group_service_list)
+        result = general_message(code, "query success", "应用查询成功", list=jsonable_encoder(group_service_list),
                                  total=total)
         return JSONResponse(result, status_code=200)
     except GroupNotExistError as e:
@@ -140,50 +146,17 @@ async def overview_team_info(region_name: Optional[str] = None,
             overview_detail["region_health"] = False
             return general_message(200, "success", "查询成功", bean=overview_detail)
 
-        # 同步应用到集群
+        # 集群应用由 region_app_reconciler 在后台补建, 此处只读取已有的对应关系
         groups = application_repo.get_tenant_region_groups(session, team.tenant_id, region.region_name)
-        batch_create_app_body = []
         region_app_ids = []
         if groups:
-            app_ids = [group.ID for group in groups]
-            region_apps = region_app_repo.list_by_app_ids(session, region.region_name, app_ids)
-            app_id_rels = {rapp.app_id: rapp.region_app_id for rapp in region_apps}
-            for group in groups:
-                if app_id_rels.get(group.ID):
-                    region_app_ids.append(app_id_rels[group.ID])
-                    continue
-                create_app_body = dict()
-                group_services = base_service.get_group_services_list(session=session, team_id=team.tenant_id,
-                                                                      region_name=region.region_name, group_id=group.ID)
-                service_ids = []
-                if group_services:
-                    service_ids = [service["service_id"] for service in group_services]
-                create_app_body["app_name"] = group.group_name
-                create_app_body["console_app_id"] = group.ID
-                create_app_body["service_ids"] = service_ids
-                if group.k8s_app:
-                    create_app_body["k8s_app"] = group.k8s_app
-                batch_create_app_body.append(create_app_body)
-
-        if len(batch_create_app_body) > 0:
-            try:
-                body = {"apps_info": batch_create_app_body}
-                applist = remote_app_client.batch_create_application(session, region.region_name, team_name, body)
-                app_list = []
-                if applist:
-                    for app in applist:
-                        data = RegionApp(
-                            app_id=app["app_id"], region_app_id=app["region_app_id"], region_name=region.region_name)
-                        app_list.append(data)
-                        region_app_ids.append(app["region_app_id"])
-                region_app_repo.bulk_create(session=session, app_list=app_list)
-            except Exception as e:
-                logger.exception(e)
+            region_apps = region_app_repo.list_by_app_ids(session, region.region_name, [group.ID for group in groups])
+            region_app_ids = [rapp.region_app_id for rapp in region_apps]
 
         running_app_num = 0
         try:
-            resp = remote_build_client.list_app_statuses_by_app_ids(session, team_name, region_name,
-                                                                    {"app_ids": region_app_ids})
+            resp = await async_remote_app_client.list_app_statuses_by_app_ids(session, team_name, region_name,
+                                                                              {"app_ids": region_app_ids})
             app_statuses = resp.get("list", [])
             # todo
             for app_status in app_statuses:
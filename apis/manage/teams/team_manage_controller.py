@@ -7,6 +7,7 @@ from fastapi.responses import JSONResponse
 from fastapi_pagination import paginate, Params
 from loguru import logger
 
+from common.region_fanout import fan_out
 from core import deps
 
 from core.utils.return_message import general_message
@@ -134,7 +135,6 @@ async def delete_team(request: Request,
     """
     try:
         team_services.delete_by_tenant_id(session=session, user=user, tenant=team)
-        request.app.state.redis.delete("team_%s" % team_name)
         result = general_message(200, "delete a team successfully", "删除团队成功")
         return JSONResponse(result, status_code=result["code"])
     except ServiceHandleException as e:
@@ -242,19 +242,23 @@ async def team_services_event(
     total = 0
     region_list = region_repo.get_team_opened_region(session, team.tenant_name)
     event_service_dynamic_list = []
-    if region_list:
-        for region in region_list:
-            try:
-                events, event_count, has_next = event_service.get_target_events(session=session, target="tenant",
-                                                                                target_id=team.tenant_id,
-                                                                                tenant=team,
-                                                                                region=region.region_name,
-                                                                                page=int(page),
-                                                                                page_size=int(page_size))
-                event_service_dynamic_list = event_service_dynamic_list + events
-                total = total + event_count
-            except Exception as e:
-                logger.error("Region api return error {0}, ignore it".format(e))
+
+    def _get_region_events(region_session, region_name):
+        return event_service.get_target_events(session=region_session, target="tenant",
+                                               target_id=team.tenant_id,
+                                               tenant=team,
+                                               region=region_name,
+                                               page=int(page),
+                                               page_size=int(page_size))
+
+    results = await fan_out([region.region_name for region in region_list or []], _get_region_events)
+    for result in results:
+        if not result.success:
+            logger.error("Region api return error {0}, ignore it".format(result.error))
+            continue
+        events, event_count, has_next = result.data
+        event_service_dynamic_list = event_service_dynamic_list + events
+        total = total + event_count
 
     event_service_dynamic_list = sorted(event_service_dynamic_list, key=cmp_to_key(__sort_events))
 
@@ -1,4 +1,3 @@
-import pickle
 import re
 import time
 from datetime import datetime, timedelta
@@ -9,8 +8,8 @@ from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from jose import jwt
 from loguru import logger
-from sqlalchemy import select
 
+from common.identity_cache import identity_cache
 from core import deps
 from core.setting import role_required
 from core.setting import settings
@@ -18,18 +17,15 @@ from core.utils.perms import list_enterprise_perms_by_roles
 from core.utils.return_message import general_message
 from database.session import SessionClass
 from exceptions.main import AbortRequest
-from models.teams import PermRelTenant, TeamInfo
 from models.teams.enterprise import TeamEnterprise
 from models.users.users import Users
 from repository.enterprise.enterprise_repo import enterprise_repo
-from repository.enterprise.enterprise_user_perm_repo import enterprise_user_perm_repo
 from repository.teams.team_enterprise_repo import tenant_enterprise_repo
 from repository.users.user_oauth_repo import oauth_repo
 from repository.users.user_repo import user_repo
-from repository.users.user_role_repo import user_role_repo
 from schemas.response import Response
-from service.region_service import get_region_list_by_team_name
-from service.user_service import user_svc, user_kind_perm_service
+from service.team_service import team_services
+from service.user_service import user_svc
 
 router = APIRouter()
 
@@ -103,7 +99,6 @@ async def user_login(request: Request, session: SessionClass = Depends(deps.get_
         expiration = int(time.mktime((datetime.now() + timedelta(days=30)).timetuple()))
         response.set_cookie(key="token", value=token, expires=expiration)
         role_required.login(response, user, token)
-        request.app.state.redis.set("user_%d" % user.user_id, pickle.dumps(user), 24 * 60 * 60)
         return response
 
     except Exception as e:
@@ -210,7 +205,7 @@ async def user_register(request: Request, session: SessionClass = Depends(deps.g
     expires = datetime.utcnow() + access_token_expires
     token = create_access_token(user, expires)
     data["token"] = token
-    request.app.state.redis.set("user_%d" % user.user_id, pickle.dumps(user), 24 * 60 * 60)
+    identity_cache.invalidate_user(session, user.user_id)
     return general_message(200, "register success", "注册成功", bean=data)
 
 
@@ -242,43 +237,8 @@ async def get_user_details(session: SessionClass = Depends(deps.get_session),
     user_detail["roles"] = roles
     # enterprise permissions
     user_detail["permissions"] = permissions
-    tenant_list = []
     # 查询团队信息
-    tenant_ids_results = session.execute(
-        select(PermRelTenant.tenant_id).where(PermRelTenant.user_id == user.user_id))
-    tenant_ids = tenant_ids_results.scalars().all()
-    if len(tenant_ids) > 0:
-        tenants_results = session.execute(
-            select(TeamInfo).where(TeamInfo.ID.in_(tenant_ids)).order_by(TeamInfo.create_time.desc()))
-        tenants = tenants_results.scalars().all()
-        for tenant in tenants:
-            tenant_info = dict()
-            is_team_owner = False
-            team_region_list = get_region_list_by_team_name(session=session, team_name=tenant.tenant_name)
-            tenant_info["team_id"] = tenant.ID
-            tenant_info["team_name"] = tenant.tenant_name
-            tenant_info["team_alias"] = tenant.tenant_alias
-            tenant_info["limit_memory"] = tenant.limit_memory
-            tenant_info["pay_level"] = tenant.pay_level
-            tenant_info["region"] = team_region_list
-            tenant_info["creater"] = tenant.creater
-            tenant_info["create_time"] = tenant.create_time
-            tenant_info["namespace"] = tenant.namespace
-
-            if tenant.creater == user.user_id:
-                is_team_owner = True
-            role_list = user_role_repo.get_user_roles(session=session, kind="team", kind_id=tenant.tenant_id,
-                                                      user=user)
-            tenant_info["role_name_list"] = role_list["roles"]
-            # todo is_enterprise_admin
-            is_enterprise_admin = enterprise_user_perm_repo.is_admin(session, user.enterprise_id, user.user_id)
-            perms = user_kind_perm_service.get_user_perms(session=session,
-                                                          kind="team", kind_id=tenant.tenant_id, user=user,
-                                                          is_owner=is_team_owner,
-                                                          is_ent_admin=is_enterprise_admin)
-            tenant_info["tenant_actions"] = perms["permissions"]
-            tenant_info["is_team_owner"] = is_team_owner
-            tenant_list.append(tenant_info)
+    tenant_list = team_services.list_user_teams_details(session, user)
     user_detail["teams"] = tenant_list
     oauth_services = oauth_repo.get_user_oauth_services_info(
         session=session, eid=user.enterprise_id, user_id=user.user_id)
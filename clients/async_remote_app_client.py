@@ -0,0 +1,171 @@
+import json
+import os
+
+import httpx
+from loguru import logger
+from starlette.background import BackgroundTask
+from starlette.responses import Response, StreamingResponse
+
+from clients.remote_app_client import remote_app_client
+from common.async_api_base_http_client import AsyncApiBaseHttpClient
+from common.base_client_service import get_tenant_region_info, get_region_access_info
+from core.utils.metrics import metrics
+from exceptions.main import ServiceHandleException
+
+# 流式转发的请求体上限
+PROXY_MAX_BODY_SIZE = int(os.environ.get("PROXY_MAX_BODY_SIZE", 1024 * 1024 * 1024))
+# 非 200 响应会读入内存转换为错误信息, 超出部分截断
+PROXY_MAX_ERROR_BODY_SIZE = int(os.environ.get("PROXY_MAX_ERROR_BODY_SIZE", 1024 * 1024))
+# 两次读写之间的最长等待时间
+PROXY_TIMEOUT = int(os.environ.get("PROXY_TIMEOUT", 20))
+
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailers',
+                      'transfer-encoding', 'upgrade', 'host', 'content-length'}
+
+
+class AsyncRemoteAppClient(AsyncApiBaseHttpClient):
+    """
+    AsyncRemoteAppClient
+    """
+
+    def __init__(self, *args, **kwargs):
+        AsyncApiBaseHttpClient.__init__(self, *args, **kwargs)
+
+    @staticmethod
+    def _headers(token):
+        if not token:
+            token = os.environ.get('REGION_TOKEN', "")
+        return {'Content-Type': 'application/json', 'Authorization': token}
+
+    async def list_app_services(self, session, region_name, tenant_name, region_app_id):
+        """
+
+        :param region_name:
+        :param tenant_name:
+        :param region_app_id:
+        :return:
+        """
+        url, token = get_region_access_info(tenant_name, region_name, session)
+        tenant_region = get_tenant_region_info(tenant_name, region_name, session)
+        url = url + "/v2/tenants/" + tenant_region.region_tenant_name + "/apps/" + region_app_id + "/services"
+
+        _, body = await self._async_get(session, url, self._headers(token), region=region_name)
+        return body["list"]
+
+    async def get_app_status(self, session, region_name, tenant_name, region_app_id):
+        """
+
+        :param region_name:
+        :param tenant_name:
+        :param region_app_id:
+        :return:
+        """
+        url, token = get_region_access_info(tenant_name, region_name, session)
+        tenant_region = get_tenant_region_info(tenant_name, region_name, session)
+        url = url + "/v2/tenants/" + tenant_region.region_tenant_name + "/apps/" + region_app_id + "/status"
+
+        res, body = await self._async_put(session, url, self._headers(token), region=region_name)
+        return body["bean"]
+
+    async def get_app_detect_process(self, session, region_name, tenant_name, region_app_id):
+        """
+
+        :param region_name:
+        :param tenant_name:
+        :param region_app_id:
+        :return:
+        """
+        url, token = get_region_access_info(tenant_name, region_name, session)
+        tenant_region = get_tenant_region_info(tenant_name, region_name, session)
+        url = url + "/v2/tenants/" + tenant_region.region_tenant_name + "/apps/" + region_app_id + "/detect-process"
+
+        res, body = await self._async_get(session, url, self._headers(token), region=region_name)
+        return body["list"]
+
+    async def list_app_statuses_by_app_ids(self, session, tenant_name, region_name, body):
+        """
+
+        :param tenant_name:
+        :param region_name:
+        :param body:
+        :return:
+        """
+        url, token = get_region_access_info(tenant_name, region_name, session)
+        url += "/v2/tenants/{tenant_name}/appstatuses".format(tenant_name=tenant_name)
+        res, body = await self._async_get(session, url, self._headers(token), body=json.dumps(body),
+                                          region=region_name)
+        return body
+
+    async def _limited_stream(self, stream):
+        size = 0
+        async for chunk in stream:
+            size += len(chunk)
+            if size > PROXY_MAX_BODY_SIZE:
+                raise ServiceHandleException(msg="request body too large", msg_show="请求体过大", status_code=413,
+                                             error_code=413)
+            metrics.incr("proxy.request_bytes", len(chunk))
+            yield chunk
+
+    async def _relay(self, upstream):
+        try:
+            async for chunk in upstream.aiter_raw():
+                metrics.incr("proxy.response_bytes", len(chunk))
+                yield chunk
+        finally:
+            await upstream.aclose()
+
+    async def proxy_stream(self, request, url, region, body=None):
+        """
+        流式转发请求: 请求体与响应体按块透传, 复用集群的长连接,
+        下游读取变慢时上游读取随之暂停, 内存占用与传输大小无关
+        :param body: 已读取的请求体, 为 None 时转发 request.stream()
+        :return: 200 时为 StreamingResponse, 其他状态码为包含(截断后)响应体的 Response
+        """
+        headers = [(key, value) for key, value in request.headers.items() if key.lower() not in HOP_BY_HOP_HEADERS]
+        if body is None and not (int(request.headers.get("content-length") or 0)
+                                 or "transfer-encoding" in request.headers):
+            body = b""
+        content = body if body is not None else self._limited_stream(request.stream())
+        client = await self.get_async_client(region_config=region)
+        upstream_request = client.build_request(request.method, url, headers=headers, content=content,
+                                                timeout=httpx.Timeout(PROXY_TIMEOUT))
+        try:
+            # 与原先 urllib3 的行为一致跟随重定向; 流式请求体无法重放, 此时由调用方将 3xx 原样返回给客户端
+            upstream = await client.send(upstream_request, stream=True, follow_redirects=body is not None)
+        except httpx.TimeoutException as e:
+            logger.warning("proxy {} timeout: {}", url, e)
+            raise ServiceHandleException(msg="proxy timeout", msg_show="访问数据中心超时，请稍后重试", status_code=504,
+                                         error_code=10411)
+        except httpx.TransportError as e:
+            logger.exception(e)
+            await self.destroy_async_client(region_config=region)
+            raise ServiceHandleException(msg="TransportError", msg_show="访问数据中心异常，请稍后重试", status_code=502,
+                                         error_code=10411)
+
+        response_headers = {}
+        for key, value in upstream.headers.items():
+            if key.lower() in HOP_BY_HOP_HEADERS:
+                continue
+            if key.lower() == 'location':
+                value = remote_app_client.make_absolute_location(str(upstream.url), value)
+            response_headers[key] = value
+        response_headers["content-security-policy"] = "upgrade-insecure-requests"
+
+        if upstream.status_code != 200:
+            content = b""
+            try:
+                async for chunk in upstream.aiter_bytes():
+                    content += chunk
+                    if len(content) >= PROXY_MAX_ERROR_BODY_SIZE:
+                        content = content[:PROXY_MAX_ERROR_BODY_SIZE]
+                        break
+            finally:
+                await upstream.aclose()
+            response_headers.pop("content-encoding", None)
+            return Response(content, headers=response_headers, status_code=upstream.status_code)
+        # 响应体按原始编码透传, 保留 content-encoding, 由客户端解压
+        return StreamingResponse(self._relay(upstream), headers=response_headers, status_code=upstream.status_code,
+                                 background=BackgroundTask(upstream.aclose))
+
+
+async_remote_app_client = AsyncRemoteAppClient()
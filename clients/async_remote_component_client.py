@@ -0,0 +1,109 @@
+import json
+import os
+
+import httpx
+
+from common.api_base_http_client import get_default_timeout_config
+from common.async_api_base_http_client import AsyncApiBaseHttpClient
+from common.base_client_service import get_tenant_region_info, get_region_access_info, \
+    get_region_access_info_by_enterprise_id
+
+
+class AsyncRemoteComponentClient(AsyncApiBaseHttpClient):
+    """
+    AsyncRemoteComponentClient
+    """
+
+    def __init__(self, *args, **kwargs):
+        AsyncApiBaseHttpClient.__init__(self, *args, **kwargs)
+
+    @staticmethod
+    def _headers(token):
+        # 每次请求单独构造请求头, 避免并发协程互相覆盖 Authorization
+        if not token:
+            token = os.environ.get('REGION_TOKEN', "")
+        return {'Content-Type': 'application/json', 'Authorization': token}
+
+    async def get_service_pods(self, session, region, tenant_name, service_alias, enterprise_id):
+        """获取组件pod信息"""
+
+        url, token = get_region_access_info(tenant_name, region, session)
+        tenant_region = get_tenant_region_info(tenant_name, region, session)
+        url = url + "/v2/tenants/" + tenant_region.region_tenant_name + "/services/" \
+              + service_alias + "/pods?enterprise_id=" + enterprise_id
+
+        res, body = await self._async_get(session, url, self._headers(token), None, region=region, timeout=15)
+        return body
+
+    async def get_dynamic_services_pods(self, session, region, tenant_name, services_ids):
+        url, token = get_region_access_info(tenant_name, region, session)
+        tenant_region = get_tenant_region_info(tenant_name, region, session)
+        url = url + "/v2/tenants/" + tenant_region.region_tenant_name + "/pods?service_ids={}".format(
+            ",".join(services_ids))
+        res, body = await self._async_get(session, url, self._headers(token), region=region, timeout=15)
+        return body
+
+    async def check_service_status(self, session, region, tenant_name, service_alias, enterprise_id):
+        """获取单个组件状态"""
+
+        url, token = get_region_access_info(tenant_name, region, session)
+        tenant_region = get_tenant_region_info(tenant_name, region, session)
+        url = url + "/v2/tenants/" + tenant_region.region_tenant_name + "/services/" \
+              + service_alias + "/status?enterprise_id=" + enterprise_id
+
+        res, body = await self._async_get(session, url, self._headers(token), region=region)
+        return body
+
+    async def service_status(self, session, region, tenant_name, body):
+        """获取多个组件的状态"""
+
+        url, token = get_region_access_info(tenant_name, region, session)
+        tenant_region = get_tenant_region_info(tenant_name, region, session)
+        url = url + "/v2/tenants/" + tenant_region.region_tenant_name + "/services_status"
+
+        res, body = await self._async_post(session, url, self._headers(token), region=region, body=json.dumps(body),
+                                           timeout=20)
+        return body
+
+    async def get_enterprise_running_services(self, session, enterprise_id, region):
+        url, token = get_region_access_info_by_enterprise_id(enterprise_id, region, session)
+        url = url + "/v2/enterprise/" + enterprise_id + "/running-services"
+        res, body = await self._async_get(session, url, self._headers(token), region=region, timeout=10)
+        if res.get("status") == 200 and isinstance(body, dict):
+            return body
+        return None
+
+    async def get_all_services_status(self, session, enterprise_id, region):
+        url, token = get_region_access_info_by_enterprise_id(enterprise_id, region, session)
+        url = url + "/v2/enterprise/" + enterprise_id + "/services/status"
+        res, body = await self._async_get(session, url, self._headers(token), region=region, timeout=10)
+        if res.get("status") == 200 and isinstance(body, dict):
+            return body
+        return None
+
+    async def fetch_service_logs(self, region_config, url, token):
+        """
+        获取组件最近的日志, url 与 token 由调用方预先解析, 不使用数据库会话
+        """
+        client = await self.get_async_client(region_config)
+        d_connect, d_red = get_default_timeout_config()
+        response = await client.get(url, headers=self._headers(token), timeout=httpx.Timeout(d_red, connect=d_connect))
+        _, body = self._check_status(url, "GET", response.status_code, response.content)
+        return body["list"] if body else []
+
+    async def stream_pod_log(self, region_config, url, token):
+        """
+        按行读取容器日志流(follow), url 与 token 由调用方预先解析
+        """
+        client = await self.get_async_client(region_config)
+        d_connect, _ = get_default_timeout_config()
+        async with client.stream("GET", url, headers=self._headers(token),
+                                 timeout=httpx.Timeout(None, connect=d_connect)) as response:
+            if response.status_code != 200:
+                await response.aread()
+                self._check_status(url, "GET", response.status_code, response.content)
+            async for line in response.aiter_lines():
+                yield line
+
+
+async_remote_component_client = AsyncRemoteComponentClient()
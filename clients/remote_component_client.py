@@ -128,6 +128,33 @@ class RemoteComponentClient(ApiBaseHttpClient):
         res, body = self._post(session, url, self.default_headers, region=region, body=json.dumps(body))
         return body
 
+    def _batch_headers(self, token):
+        """批量请求复用长连接, 不携带 Connection: close"""
+        self._set_headers(token)
+        headers = dict(self.default_headers)
+        headers.pop("Connection", None)
+        return headers
+
+    def _batch_add(self, session, region, tenant_name, service_alias, resource, bodies, key_field,
+                   tenant_id_field=True):
+        """同一组件同类属性的批量添加, 集群访问信息只查询一次, 各条目并发提交"""
+        if not bodies:
+            return []
+        url, token = get_region_access_info(tenant_name, region, session)
+        tenant_region = get_tenant_region_info(tenant_name, region, session)
+        url = url + "/v2/tenants/" + tenant_region.region_tenant_name + "/services/" + service_alias + "/" + resource
+        items = []
+        for body in bodies:
+            if tenant_id_field:
+                # 更新tenant_id 为数据中心tenant_id
+                body["tenant_id"] = tenant_region.region_tenant_id
+            items.append((body.get(key_field), url, json.dumps(body)))
+        return self._batch_post(session, self._batch_headers(token), items, region=region)
+
+    def batch_add_service_dependencies(self, session, region, tenant_name, service_alias, bodies):
+        """批量增加组件依赖, 返回逐条结果"""
+        return self._batch_add(session, region, tenant_name, service_alias, "dependency", bodies, "dep_service_id")
+
     def delete_service_dependency(self, session, region, tenant_name, service_alias, body):
         """取消组件依赖"""
 
@@ -154,6 +181,10 @@ class RemoteComponentClient(ApiBaseHttpClient):
         res, body = self._post(session, url, self.default_headers, region=region, body=json.dumps(body))
         return body
 
+    def batch_add_service_envs(self, session, region, tenant_name, service_alias, bodies):
+        """批量添加环境变量, 返回逐条结果"""
+        return self._batch_add(session, region, tenant_name, service_alias, "env", bodies, "attr_name")
+
     def delete_service_env(self, session, region, tenant_name, service_alias, body):
         """删除环境变量"""
 
@@ -497,6 +528,11 @@ class RemoteComponentClient(ApiBaseHttpClient):
         self._set_headers(token)
         return self._post(session, url, self.default_headers, json.dumps(body), region=region)
 
+    def batch_add_service_volumes(self, session, region, tenant_name, service_alias, bodies):
+        """批量添加持久化存储, 返回逐条结果"""
+        return self._batch_add(session, region, tenant_name, service_alias, "volumes", bodies, "volume_name",
+                               tenant_id_field=False)
+
     def delete_service_volumes(self, session, region, tenant_name, service_alias, volume_name, enterprise_id, body={}):
         """
 
@@ -542,6 +578,11 @@ class RemoteComponentClient(ApiBaseHttpClient):
         res, body = self._post(session, url, self.default_headers, json.dumps(body), region=region)
         return res, body
 
+    def batch_add_service_dep_volumes(self, session, region, tenant_name, service_alias, bodies):
+        """批量添加依赖存储, 返回逐条结果"""
+        return self._batch_add(session, region, tenant_name, service_alias, "depvolumes", bodies, "volume_name",
+                               tenant_id_field=False)
+
     def delete_service_dep_volumes(self, session, region, tenant_name, service_alias, body):
         """ Delete dependent volume"""
         url, token = get_region_access_info(tenant_name, region, session)
@@ -1,11 +1,14 @@
 """
 wutong api server base http client
 """
+import hashlib
 import json
 import multiprocessing
 import os
 import socket
 import ssl
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import certifi
 import urllib3
 from addict import Dict
@@ -14,6 +17,8 @@ from loguru import logger
 from urllib3.exceptions import MaxRetryError
 from exceptions.main import ServiceHandleException, ErrClusterLackOfMemory, ErrTenantLackOfMemory
 from core.setting import settings
+from common.region_client_pool import region_client_pool, is_connection_failure, CONNECTION_FAILURES
+from core.utils.metrics import metrics
 from repository.region.region_config_repo import region_config_repo
 
 urllib3.disable_warnings()
@@ -154,8 +159,6 @@ class ApiBaseHttpClient(object):
 
     def __init__(self, *args, **kwargs):
         self.timeout = 5
-        # cache client
-        self.clients = {}
         self.api_type = 'Not specified'
 
     def _check_status(self, url, method, status, content):
@@ -201,13 +204,6 @@ class ApiBaseHttpClient(object):
         else:
             cert_reqs = ssl.CERT_NONE
 
-        # ca_certs
-        if configuration.ssl_ca_cert:
-            ca_certs = configuration.ssl_ca_cert
-        else:
-            # if not set certificate file, use Mozilla's root certificates.
-            ca_certs = certifi.where()
-
         addition_pool_args = {}
         if configuration.assert_hostname is not None:
             addition_pool_args['assert_hostname'] = configuration.assert_hostname
@@ -219,41 +215,40 @@ class ApiBaseHttpClient(object):
                 maxsize = 4
 
         # https pool manager
-        self.pool_manager = urllib3.PoolManager(
+        # CA 与客户端证书已加载到复用的 ssl_context 中, 不再传文件路径, 避免每次建连重新加载
+        return urllib3.PoolManager(
             num_pools=pools_size,
             maxsize=maxsize,
             cert_reqs=cert_reqs,
-            ca_certs=ca_certs,
-            cert_file=configuration.cert_file,
-            key_file=configuration.key_file,
+            ssl_context=configuration.ssl_context,
             timeout=5,
             **addition_pool_args)
-        return self.pool_manager
 
     def get_client(self, region_config):
         """
+        从连接池注册表获取集群客户端, 集群熔断时抛出 ServiceHandleException
 
         :param region_config:
         :return:
         """
-        # get client from cache
-        key = hash(region_config.url + region_config.ssl_ca_cert + region_config.cert_file + region_config.key_file)
-        client = self.clients.get(key, None)
-        if client:
-            return client
-        config = Configuration(region_config)
+        return region_client_pool.get(region_config, lambda: self._build_client(region_config))
+
+    def _build_client(self, region_config):
         pools_size = int(os.environ.get("CLIENT_POOL_SIZE", 20))
-        client = self.create_client(config, pools_size)
-        self.clients[key] = client
-        return client
+        try:
+            config = Configuration(region_config)
+            return self.create_client(config, pools_size)
+        except (ssl.SSLError, OSError) as e:
+            logger.exception(e)
+            return None
 
     def destroy_client(self, region_config):
         """
+        淘汰并关闭集群客户端连接
 
         :param region_config:
         """
-        key = hash(region_config.url + region_config.ssl_ca_cert + region_config.cert_file + region_config.key_file)
-        self.clients[key] = None
+        region_client_pool.evict(region_config)
 
     def _request(self, url, method, session, headers=None, body=None, *args, **kwargs):
         region_name = kwargs.get("region")
@@ -264,12 +259,16 @@ class ApiBaseHttpClient(object):
         if kwargs.get("for_test"):
             region = region_name
             region_name = region.region_name
+        elif kwargs.get("region_config"):
+            # 批量请求已预先解析集群配置, 工作线程中不再访问数据库会话
+            region = kwargs.get("region_config")
         else:
-            region = region_config_repo.get_region_config_by_region_name(session, region_name)
+            region = region_config_repo.get_cached_region_config_by_region_name(session, region_name)
         if not region:
             raise ServiceHandleException("region {0} not found".format(region_name), error_code=10412)
         client = self.get_client(region_config=region)
         if not client:
+            region_client_pool.record_error(region_name)
             raise ServiceHandleException(
                 msg="create region api client failure", msg_show="创建集群通信客户端错误，请检查集群配置", error_code=10411)
         try:
@@ -281,6 +280,7 @@ class ApiBaseHttpClient(object):
                     preload_content=preload_content,
                     timeout=None,  # None will set an infinite timeout.
                 )
+                region_client_pool.record_success(region_name)
                 return response, None
             if body is None:
                 response = client.request(
@@ -297,11 +297,14 @@ class ApiBaseHttpClient(object):
                     body=body,
                     timeout=urllib3.Timeout(connect=d_connect, read=timeout),
                     retries=retries)
+            region_client_pool.record_success(region_name)
             return response.status, response.data
         except urllib3.exceptions.SSLError:
+            region_client_pool.record_error(region_name)
             self.destroy_client(region_config=region)
             raise ServiceHandleException(error_code=10411, msg="SSLError", msg_show="访问数据中心异常，请稍后重试")
         except socket.timeout as e:
+            region_client_pool.record_error(region_name)
             raise self.CallApiError(self.api_type, url, method, Dict({"status": 101}), {
                 "type": "request time out",
                 "error": str(e),
@@ -310,11 +313,23 @@ class ApiBaseHttpClient(object):
         except MaxRetryError as e:
             logger.debug("error url {}".format(url))
             logger.exception(e)
+            # 读超时重试耗尽时同样是 MaxRetryError, 只有连接失败计入熔断
+            if is_connection_failure(e):
+                region_client_pool.record_failure(region_name)
+            else:
+                region_client_pool.record_error(region_name)
             self.destroy_client(region_config=region)
             raise ServiceHandleException(error_code=10411, msg="MaxRetryError", msg_show="访问数据中心异常，请稍后重试")
+        except CONNECTION_FAILURES as e:
+            # 不重试时连接失败直接抛出
+            logger.debug("error url {}".format(url))
+            logger.exception(e)
+            region_client_pool.record_failure(region_name)
+            raise ServiceHandleException(error_code=10411, msg="ConnectionError", msg_show="访问数据中心异常，请稍后重试")
         except Exception as e:
             logger.debug("error url {}".format(url))
             logger.exception(e)
+            region_client_pool.record_error(region_name)
             raise ServiceHandleException(error_code=10411, msg="Exception", msg_show="访问数据中心异常，请稍后重试")
 
     def _get(self, session, url, headers, body=None, *args, **kwargs):
@@ -352,42 +367,139 @@ class ApiBaseHttpClient(object):
         res, body = self._check_status(url, 'DELETE', response, content)
         return res, body
 
+    def _batch_post(self, session, headers, items, *args, **kwargs):
+        """
+        并发提交同一集群的一组 POST 请求, 集群配置只解析一次, 单条失败不影响其他条目
+        :param headers: 请求头, 所有条目共用
+        :param items: [(key, url, body)], key 用于标识结果
+        :return: [BatchResult], 与 items 顺序一致
+        """
+        if not items:
+            return []
+        region_name = kwargs.get("region")
+        region_config = region_config_repo.get_cached_region_config_by_region_name(session, region_name)
+        if not region_config:
+            raise ServiceHandleException("region {0} not found".format(region_name), error_code=10412)
+        kwargs["region_config"] = region_config
+
+        def _post_item(item):
+            key, url, body = item
+            try:
+                res, res_body = self._post(None, url, headers, body, *args, **kwargs)
+                return BatchResult(key, res.status, res_body)
+            except Exception as e:
+                # 逐条记录失败原因, 由调用方决定忽略或回滚
+                return BatchResult(key, getattr(e, "status", None) or getattr(e, "status_code", None), None, e)
+
+        metrics.incr("region.batch.{}.items".format(region_name), len(items))
+        with metrics.timer("region.batch.{}.call".format(region_name)):
+            if len(items) == 1:
+                return [_post_item(items[0])]
+            return list(batch_executor.map(_post_item, items))
+
 
-def create_file(path, name, body):
+class BatchResult(object):
     """
-    create_file
-    :param path:
-    :param name:
-    :param body:
-    :return:
+    批量请求中单个条目的结果
     """
-    if not os.path.exists(path):
-        os.makedirs(path)
-    file_path = path + "/" + name
-    with open(file_path, 'w') as f:
-        f.writelines(body)
-    f.close()
-    read = ""
-    with open(file_path, 'r') as f:
-        read = f.read()
-    f.close()
-    if read != body:
-        return None
-    return file_path
-
-
-def check_file_path(path, name, body):
+    __slots__ = ("key", "status", "body", "error")
+
+    def __init__(self, key, status, body, error=None):
+        self.key = key
+        self.status = status
+        self.body = body
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None
+
+    def to_dict(self):
+        return {"key": self.key, "success": self.success, "status": self.status,
+                "error": str(self.error) if self.error else None}
+
+
+# 批量同步使用独立线程池, 避免与 region_executor 中的调用互相占用线程
+batch_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("REGION_BATCH_CONCURRENCY", 8)),
+                                    thread_name_prefix="region-batch")
+
+
+class CertificateStore(object):
     """
-    check_file_path
-    :param path:
-    :param name:
-    :param body:
-    :return:
+    证书内容寻址存储
+
+    以内容 sha256 作为文件名, 同一份证书只落盘一次, 路径缓存在内存中,
+    重建客户端时不再重复写文件和回读校验
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self._lock = threading.Lock()
+        self._paths = {}
+
+    def get_path(self, content, suffix="pem"):
+        """
+        获取证书内容对应的文件路径, 文件不存在时写入
+        :param content: 证书内容
+        :param suffix: 文件后缀
+        :return: 文件路径
+        """
+        digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        path = self._paths.get(digest)
+        if path:
+            return path
+        with self._lock:
+            path = self._paths.get(digest)
+            if path:
+                return path
+            path = os.path.join(self.base_dir, "{0}.{1}".format(digest, suffix))
+            if not os.path.exists(path):
+                if not os.path.exists(self.base_dir):
+                    os.makedirs(self.base_dir)
+                # 先写临时文件再原子替换, 其他进程不会读到写了一半的证书
+                tmp_path = "{0}.{1}.tmp".format(path, os.getpid())
+                with open(tmp_path, 'w') as f:
+                    f.write(content)
+                os.chmod(tmp_path, 0o600)
+                os.replace(tmp_path, path)
+            self._paths[digest] = path
+            return path
+
+
+cert_store = CertificateStore(settings.BASE_DIR + "/data/ssl")
+
+_ssl_contexts = {}
+_ssl_contexts_lock = threading.Lock()
+
+
+def get_ssl_context(verify_ssl, ca_certs, cert_file, key_file, owner="urllib3"):
+    """
+    获取预构建的 SSLContext, 相同证书组合复用同一个 context
+    urllib3 与 httpx 每次建连都会改写 context 的 ALPN 协议列表(httpx 启用 HTTP/2 时包含 h2),
+    两者共用一个 context 时并发建连会协商出对方的协议, 因此按 owner 分别缓存
+    :param verify_ssl:
+    :param ca_certs:
+    :param cert_file:
+    :param key_file:
+    :param owner: 使用该 context 的客户端库, urllib3 或 httpx
+    :return: ssl.SSLContext
     """
-    file_path = create_file(path, name, body)
-    if not file_path:
-        file_path = create_file(path, name, body)
-    return file_path
+    key = (owner, verify_ssl, ca_certs, cert_file, key_file)
+    context = _ssl_contexts.get(key)
+    if context:
+        return context
+    with _ssl_contexts_lock:
+        context = _ssl_contexts.get(key)
+        if context:
+            return context
+        context = ssl.create_default_context(cafile=ca_certs or certifi.where())
+        if not verify_ssl:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        if cert_file:
+            context.load_cert_chain(cert_file, key_file)
+        _ssl_contexts[key] = context
+        return context
 
 
 class Configuration():
@@ -414,28 +526,26 @@ class Configuration():
         # Set this to false to skip verifying SSL certificate when calling API from https server.
         self.verify_ssl = verify_ssl
         # Set this to customize the certificate file to verify the peer.
-        # 兼容证书路径和内容
-        file_path = settings.BASE_DIR + "/data/{0}-{1}/ssl".format(region_config.enterprise_id,
-                                                                   region_config.region_name)
+        # 兼容证书路径和内容, 内容形式的证书写入内容寻址存储
         ssl_ca_cert = region_config.ssl_ca_cert
         cert_file = region_config.cert_file
         key_file = region_config.key_file
         if not ssl_ca_cert or ssl_ca_cert.startswith('/'):
             self.ssl_ca_cert = ssl_ca_cert
         else:
-            self.ssl_ca_cert = check_file_path(file_path, "ca.pem", ssl_ca_cert)
+            self.ssl_ca_cert = cert_store.get_path(ssl_ca_cert)
 
         # client certificate file
         if not cert_file or cert_file.startswith('/'):
             self.cert_file = cert_file
         else:
-            self.cert_file = check_file_path(file_path, "client.pem", cert_file)
+            self.cert_file = cert_store.get_path(cert_file)
 
         # client key file
         if not key_file or key_file.startswith('/'):
             self.key_file = key_file
         else:
-            self.key_file = check_file_path(file_path, "client.key.pem", key_file)
+            self.key_file = cert_store.get_path(key_file, suffix="key.pem")
 
         # Set this to True/False to enable/disable SSL hostname verification.
         self.assert_hostname = assert_hostname
@@ -451,3 +561,17 @@ class Configuration():
         self.proxy = None
         # Safe chars for path_param
         self.safe_chars_for_path_param = ''
+
+    @property
+    def ssl_context(self):
+        """
+        按证书组合缓存的 SSLContext, 已加载 CA 与客户端证书, 仅供 urllib3 使用
+        """
+        return get_ssl_context(self.verify_ssl, self.ssl_ca_cert, self.cert_file, self.key_file)
+
+    @property
+    def async_ssl_context(self):
+        """
+        供 httpx 使用的 SSLContext, 与 urllib3 的 context 分开, 互不影响 ALPN 协商
+        """
+        return get_ssl_context(self.verify_ssl, self.ssl_ca_cert, self.cert_file, self.key_file, owner="httpx")
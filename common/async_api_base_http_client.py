@@ -0,0 +1,135 @@
+"""
+wutong api server async http client
+
+与 ApiBaseHttpClient 行为一致的异步实现, 基于 httpx 为每个集群维护长连接(keep-alive, 可用时启用 HTTP/2),
+便于在一个协程中并发发起多个集群请求。
+"""
+import os
+
+import httpx
+from addict import Dict
+from loguru import logger
+
+from common.api_base_http_client import ApiBaseHttpClient, Configuration, get_default_timeout_config
+from exceptions.main import ServiceHandleException
+from repository.region.region_config_repo import region_config_repo
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_ENABLED = os.environ.get("REGION_CLIENT_HTTP2", "true").lower() == "true"
+except ImportError:
+    HTTP2_ENABLED = False
+
+
+class AsyncApiBaseHttpClient(ApiBaseHttpClient):
+    """
+    AsyncApiBaseHttpClient
+    """
+
+    def __init__(self, *args, **kwargs):
+        ApiBaseHttpClient.__init__(self, *args, **kwargs)
+        self.async_clients = {}
+
+    @staticmethod
+    def _client_key(region_config):
+        return "|".join([region_config.region_name or "", region_config.url or "", region_config.ssl_ca_cert or "",
+                         region_config.cert_file or "", region_config.key_file or ""])
+
+    @staticmethod
+    def create_async_client(configuration, retries=3):
+        """
+        创建集群异步客户端
+        :param configuration: Configuration
+        :param retries: 连接失败重试次数
+        :return: httpx.AsyncClient
+        """
+        # 按证书组合缓存并加载客户端证书的 httpx 专用 context, 不与 urllib3 共用
+        verify = configuration.async_ssl_context
+        max_connections = int(os.environ.get("CLIENT_POOL_SIZE", 20))
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=configuration.connection_pool_maxsize,
+                              keepalive_expiry=30)
+        d_connect, d_red = get_default_timeout_config()
+        transport = httpx.AsyncHTTPTransport(verify=verify, http2=HTTP2_ENABLED, limits=limits,
+                                             retries=retries)
+        return httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(d_red, connect=d_connect))
+
+    async def get_async_client(self, region_config):
+        """
+
+        :param region_config:
+        :return:
+        """
+        # 检查与写入之间没有 await, 在单个事件循环内不会重复创建
+        key = self._client_key(region_config)
+        client = self.async_clients.get(key)
+        if client and not client.is_closed:
+            return client
+        client = self.create_async_client(Configuration(region_config))
+        self.async_clients[key] = client
+        return client
+
+    async def destroy_async_client(self, region_config):
+        """
+
+        :param region_config:
+        """
+        client = self.async_clients.pop(self._client_key(region_config), None)
+        if client:
+            await client.aclose()
+
+    async def close_all(self):
+        clients = list(self.async_clients.values())
+        self.async_clients = {}
+        for client in clients:
+            await client.aclose()
+
+    async def _async_request(self, url, method, session, headers=None, body=None, *args, **kwargs):
+        region_name = kwargs.get("region")
+        d_connect, d_red = get_default_timeout_config()
+        timeout = kwargs.get("timeout", d_red)
+        if kwargs.get("for_test"):
+            region = region_name
+            region_name = region.region_name
+        else:
+            region = region_config_repo.get_cached_region_config_by_region_name(session, region_name)
+        if not region:
+            raise ServiceHandleException("region {0} not found".format(region_name), error_code=10412)
+        client = await self.get_async_client(region_config=region)
+        try:
+            response = await client.request(method, url, headers=headers, content=body,
+                                            timeout=httpx.Timeout(timeout, connect=d_connect))
+            return response.status_code, response.content
+        except httpx.TimeoutException as e:
+            raise self.CallApiError(self.api_type, url, method, Dict({"status": 101}), {
+                "type": "request time out",
+                "error": str(e),
+                "error_code": 10411,
+            })
+        except httpx.TransportError as e:
+            logger.debug("error url {}".format(url))
+            logger.exception(e)
+            await self.destroy_async_client(region_config=region)
+            raise ServiceHandleException(error_code=10411, msg="TransportError", msg_show="访问数据中心异常，请稍后重试")
+        except Exception as e:
+            logger.debug("error url {}".format(url))
+            logger.exception(e)
+            raise ServiceHandleException(error_code=10411, msg="Exception", msg_show="访问数据中心异常，请稍后重试")
+
+    async def _async_call(self, method, session, url, headers, body=None, *args, **kwargs):
+        response, content = await self._async_request(url, method, session=session, headers=headers, body=body,
+                                                       *args, **kwargs)
+        return self._check_status(url, method, response, content)
+
+    async def _async_get(self, session, url, headers, body=None, *args, **kwargs):
+        return await self._async_call('GET', session, url, headers, body, *args, **kwargs)
+
+    async def _async_post(self, session, url, headers, body=None, *args, **kwargs):
+        return await self._async_call('POST', session, url, headers, body, *args, **kwargs)
+
+    async def _async_put(self, session, url, headers, body=None, *args, **kwargs):
+        return await self._async_call('PUT', session, url, headers, body, *args, **kwargs)
+
+    async def _async_delete(self, session, url, headers, body=None, *args, **kwargs):
+        return await self._async_call('DELETE', session, url, headers, body, *args, **kwargs)
@@ -18,8 +18,8 @@ def get_region_access_info_by_enterprise_id(enterprise_id, region, session):
     :return:
     """
     url, token = client_auth_service.get_region_access_token_by_enterprise_id(session, enterprise_id, region)
-    # 管理后台数据需要及时生效，对于数据中心的信息查询使用直接查询原始数据库
-    region_info = region_config_repo.get_region_config_by_region_name(session, region)
+    # 管理后台数据需要及时生效，集群修改时会主动失效缓存
+    region_info = region_config_repo.get_cached_region_config_by_region_name(session, region)
     if not region_info:
         raise ServiceHandleException("region not found")
     url = region_info.url
@@ -61,8 +61,8 @@ def get_region_access_info(tenant_name, region_name, session):
     if tenant_name:
         url, token = client_auth_service.get_region_access_token_by_tenant(session, tenant_name, region_name)
     # 如果团队所在企业所属数据中心信息不存在则使用通用的配置(兼容未申请数据中心token的企业)
-    # 管理后台数据需要及时生效，对于数据中心的信息查询使用直接查询原始数据库
-    region_config_info = region_config_repo.get_region_config_by_region_name(session, region_name)
+    # 管理后台数据需要及时生效，集群修改时会主动失效缓存
+    region_config_info = region_config_repo.get_cached_region_config_by_region_name(session, region_name)
     if region_config_info is None:
         raise ServiceHandleException("region not found", "数据中心不存在", 404, 404)
     url = region_config_info.url
@@ -0,0 +1,154 @@
+"""
+component status cache
+
+组件状态短时缓存, 以 (集群, service_id) 为键:
+- L1: 进程内 TTLCache
+- L2: redis, 多个 worker 与浏览器标签页轮询共享
+- 只向集群查询缓存中缺失的组件, 并发的相同查询合并为一次集群调用
+- 组件执行操作(启动/停止/构建/升级/回滚/伸缩/删除)后主动失效; 依据状态做安全检查的调用方指定 use_cache=False
+"""
+import json
+import os
+
+from loguru import logger
+
+from clients.remote_component_client import remote_component_client
+from core.utils.cache import TTLCache, SingleFlight
+from core.utils.metrics import metrics
+from database.redis_session import redis_client
+
+STATUS_CACHE_TTL = int(os.environ.get("COMPONENT_STATUS_CACHE_TTL", 3))
+
+
+class ComponentStatusCache(object):
+    """
+    ComponentStatusCache
+    """
+
+    def __init__(self, ttl=STATUS_CACHE_TTL):
+        self.ttl = ttl
+        self.local = TTLCache("component_status", maxsize=20000, ttl=ttl)
+        self.flight = SingleFlight("component_status")
+
+    @staticmethod
+    def _redis_key(region, service_id):
+        return "component_status:{0}:{1}".format(region, service_id)
+
+    def _get_from_redis(self, region, service_ids):
+        try:
+            values = redis_client.mget([self._redis_key(region, service_id) for service_id in service_ids])
+        except Exception as e:
+            logger.warning("get component status from redis failed: {}", e)
+            return {}
+        result = {}
+        for service_id, value in zip(service_ids, values):
+            if value:
+                result[service_id] = json.loads(value)
+        return result
+
+    def _set_to_redis(self, region, statuses):
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for service_id, status in statuses.items():
+                pipe.setex(self._redis_key(region, service_id), self.ttl, json.dumps(status))
+            pipe.execute()
+        except Exception as e:
+            logger.warning("set component status to redis failed: {}", e)
+
+    def _fetch(self, session, region, tenant_name, service_ids, enterprise_id):
+        body = remote_component_client.service_status(session, region, tenant_name, {
+            "service_ids": service_ids,
+            "enterprise_id": enterprise_id
+        })
+        statuses = {status["service_id"]: status for status in (body.get("list") or [])}
+        for service_id, status in statuses.items():
+            self.local.set((region, service_id), status)
+        if statuses:
+            self._set_to_redis(region, statuses)
+        return statuses
+
+    def get_statuses(self, session, region, tenant_name, service_ids, enterprise_id, use_cache=True):
+        """
+        批量获取组件状态, 返回与 service_status 接口 list 相同结构的列表
+        :param session:
+        :param region: 集群名称
+        :param tenant_name: 团队名称
+        :param service_ids: 组件id列表
+        :param enterprise_id: 企业id
+        :param use_cache: 为 False 时直接查询集群, 查询结果仍写入缓存
+        :return: list
+        """
+        if not service_ids:
+            return []
+        if not use_cache:
+            metrics.incr("component_status.region_fetch")
+            fetched = self._fetch(session, region, tenant_name, service_ids, enterprise_id)
+            return [fetched[service_id] for service_id in service_ids if service_id in fetched]
+        found = {}
+        missing = []
+        for service_id in service_ids:
+            status = self.local.get((region, service_id))
+            if status is not None:
+                found[service_id] = status
+            else:
+                missing.append(service_id)
+        if missing:
+            cached = self._get_from_redis(region, missing)
+            for service_id, status in cached.items():
+                self.local.set((region, service_id), status)
+            found.update(cached)
+            missing = [service_id for service_id in missing if service_id not in cached]
+        if missing:
+            metrics.incr("component_status.region_fetch")
+            key = (region, tenant_name, tuple(sorted(missing)))
+            fetched = self.flight.do(key, lambda: self._fetch(session, region, tenant_name, missing, enterprise_id))
+            found.update(fetched)
+        return [found[service_id] for service_id in service_ids if service_id in found]
+
+    def get_all_services_status(self, session, enterprise_id, region, test=False):
+        """
+        企业在集群下全部组件的运行状态汇总(running/unrunning/abnormal), 整体缓存
+        """
+        key = ("all_services_status", region, enterprise_id)
+        data = self.local.get(key)
+        if data is not None:
+            return data
+        redis_key = "component_status_all:{0}:{1}".format(region, enterprise_id)
+        try:
+            value = redis_client.get(redis_key)
+        except Exception as e:
+            logger.warning("get component status from redis failed: {}", e)
+            value = None
+        if value:
+            data = json.loads(value)
+            self.local.set(key, data)
+            return data
+
+        def _fetch():
+            result = remote_component_client.get_all_services_status(session, enterprise_id, region, test=test)
+            if result is not None:
+                self.local.set(key, result)
+                try:
+                    redis_client.setex(redis_key, self.ttl, json.dumps(result))
+                except Exception as err:
+                    logger.warning("set component status to redis failed: {}", err)
+            return result
+
+        metrics.incr("component_status.region_fetch")
+        return self.flight.do(key, _fetch)
+
+    def invalidate(self, region, service_ids):
+        """
+        组件执行操作(启动/停止/部署等)后主动失效
+        """
+        if not service_ids:
+            return
+        for service_id in service_ids:
+            self.local.invalidate((region, service_id))
+        try:
+            redis_client.delete(*[self._redis_key(region, service_id) for service_id in service_ids])
+        except Exception as e:
+            logger.warning("delete component status from redis failed: {}", e)
+
+
+component_status_cache = ComponentStatusCache()
@@ -0,0 +1,170 @@
+"""
+identity cache
+
+get_current_user / get_current_team 的身份缓存。原先在 redis 中缓存 pickle 后的 ORM 对象, 每个请求都要反序列化整个对象状态,
+模型字段变更后旧缓存会反序列化出错, 且 pickle 数据不应从共享存储中加载。此处:
+- redis 中只保存模型各列的值(JSON), 键中带结构版本号, 结构变更时递增 SCHEMA_VERSION 即可废弃旧缓存
+- redis 之前有一层进程内 LRU, 缓存解码后的列值, 每次返回新建的 detached 对象, 请求之间不共享 ORM 实例
+- 用户、团队变更时在事务提交后删除缓存; 其他 worker 的进程内缓存最多延迟 IDENTITY_CACHE_L1_TTL 秒失效
+- 读写缓存使用异步 redis 客户端, 事务提交后的删除在同步回调中执行, 使用同步客户端
+- redis 不可用时直接查询数据库
+"""
+import datetime
+import decimal
+import json
+import os
+
+from loguru import logger
+from sqlalchemy import Date, DateTime, Numeric, event, inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
+
+from core.setting import settings
+from core.utils.cache import TTLCache
+from database.redis_session import async_redis_client, redis_client
+from models.teams import TeamInfo
+from models.users.users import Users
+
+IDENTITY_CACHE_L1_TTL = int(os.environ.get("IDENTITY_CACHE_L1_TTL", 5))
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError("unsupported column value {!r}".format(value))
+
+
+class _ModelCodec(object):
+    """
+    ORM 对象与列值之间的转换
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.columns = {}
+        self.decoders = {}
+        for prop in inspect(model).column_attrs:
+            column = prop.columns[0]
+            self.columns[prop.key] = column
+            if isinstance(column.type, DateTime):
+                self.decoders[prop.key] = datetime.datetime.fromisoformat
+            elif isinstance(column.type, Date):
+                self.decoders[prop.key] = datetime.date.fromisoformat
+            elif isinstance(column.type, Numeric):
+                self.decoders[prop.key] = decimal.Decimal
+
+    def dump(self, obj):
+        return {key: getattr(obj, key) for key in self.columns}
+
+    def encode(self, values):
+        return json.dumps(values, default=_encode_value, separators=(",", ":"))
+
+    def decode(self, raw):
+        """
+        :return: 列值, 缓存内容与当前模型的列不一致时返回 None
+        """
+        try:
+            values = json.loads(raw)
+            if set(values) != set(self.columns):
+                return None
+            for key, decoder in self.decoders.items():
+                if values[key] is not None:
+                    values[key] = decoder(values[key])
+        except (ValueError, TypeError, decimal.InvalidOperation):
+            return None
+        return values
+
+    def build(self, values):
+        """
+        按列值构造 detached 对象, 与从数据库加载的对象一样可以重新 add 到会话中
+        """
+        obj = self.model(**values)
+        make_transient_to_detached(obj)
+        return obj
+
+
+class IdentityCache(object):
+    """
+    IdentityCache
+    """
+    SCHEMA_VERSION = 1
+    DIRTY_KEY = "identity_cache_dirty"
+
+    def __init__(self, ttl=settings.REDIS_CACHE_TTL, l1_ttl=IDENTITY_CACHE_L1_TTL):
+        self.ttl = ttl
+        self.local = TTLCache("identity", maxsize=10000, ttl=l1_ttl)
+        self.codecs = {"user": _ModelCodec(Users), "team": _ModelCodec(TeamInfo)}
+
+    def _key(self, kind, ident):
+        return "identity:v{}:{}:{}".format(self.SCHEMA_VERSION, kind, ident)
+
+    async def _get(self, kind, ident, loader):
+        codec = self.codecs[kind]
+        key = self._key(kind, ident)
+        values = self.local.get(key)
+        if values is not None:
+            return codec.build(values)
+        redis_ok = True
+        try:
+            raw = await async_redis_client.get(key)
+            if raw:
+                values = codec.decode(raw)
+        except Exception as e:
+            logger.warning("get identity {} from redis failed: {}", key, e)
+            redis_ok = False
+        if values is not None:
+            self.local.set(key, values)
+            return codec.build(values)
+        obj = loader()
+        if obj is None:
+            return None
+        values = codec.dump(obj)
+        if redis_ok:
+            try:
+                await async_redis_client.set(key, codec.encode(values), self.ttl)
+            except Exception as e:
+                logger.warning("set identity {} to redis failed: {}", key, e)
+        self.local.set(key, values)
+        return obj
+
+    async def get_user(self, user_id, loader):
+        """
+        :param loader: 未命中时从数据库加载用户, 返回 None 时不缓存
+        """
+        return await self._get("user", user_id, loader)
+
+    async def get_team(self, team_name, loader):
+        return await self._get("team", team_name, loader)
+
+    def invalidate_user(self, session, user_id):
+        """
+        标记会话中有用户变更, 事务提交后删除缓存
+        """
+        session.info.setdefault(self.DIRTY_KEY, set()).add(self._key("user", user_id))
+
+    def invalidate_team(self, session, team_name):
+        session.info.setdefault(self.DIRTY_KEY, set()).add(self._key("team", team_name))
+
+    def invalidate_now(self, keys):
+        for key in keys:
+            self.local.invalidate(key)
+        try:
+            redis_client.delete(*keys)
+        except Exception as e:
+            logger.warning("delete identity cache {} failed: {}", keys, e)
+
+
+identity_cache = IdentityCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    keys = session.info.pop(IdentityCache.DIRTY_KEY, None)
+    if keys:
+        identity_cache.invalidate_now(list(keys))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(IdentityCache.DIRTY_KEY, None)
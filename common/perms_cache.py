@@ -0,0 +1,86 @@
+"""
+perms cache
+
+用户在团队/企业下的角色权限位图缓存, 以 (user_id, kind, kind_id) 为键:
+- 缓存值为用户所有角色权限的并集位图, 不含拥有者、企业管理员等由调用方判断的身份
+- 角色、角色权限、用户角色变更时在事务提交后递增 redis 中的全局版本号, 所有 worker 的缓存随之失效
+- redis 不可用时不使用缓存
+"""
+import os
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core.utils.cache import TTLCache
+from database.redis_session import redis_client
+
+PERMS_CACHE_TTL = int(os.environ.get("PERMS_CACHE_TTL", 60))
+
+
+class PermsCache(object):
+    """
+    PermsCache
+    """
+    EPOCH_KEY = "perms:epoch"
+    DIRTY_KEY = "perms_cache_dirty"
+
+    def __init__(self, ttl=PERMS_CACHE_TTL):
+        self.local = TTLCache("perms", maxsize=10000, ttl=ttl)
+
+    def epoch(self):
+        try:
+            return int(redis_client.get(self.EPOCH_KEY) or 0)
+        except Exception as e:
+            logger.warning("get perms epoch from redis failed: {}", e)
+            return None
+
+    def get(self, user_id, kind, kind_id):
+        """
+        :return: 权限位图, 未命中时为 None
+        """
+        item = self.local.get((user_id, kind, kind_id))
+        if not item:
+            return None
+        epoch, mask = item
+        if epoch is None or epoch != self.epoch():
+            return None
+        return mask
+
+    def get_or_load(self, user_id, kind, kind_id, loader):
+        mask = self.get(user_id, kind, kind_id)
+        if mask is not None:
+            return mask
+        # 先取版本号再加载, 加载期间发生的变更会使本次写入的缓存失效
+        epoch = self.epoch()
+        mask = loader()
+        if epoch is not None:
+            self.local.set((user_id, kind, kind_id), (epoch, mask))
+        return mask
+
+    def invalidate(self, session):
+        """
+        标记会话中有权限相关的变更, 事务提交后失效全部缓存
+        """
+        session.info[self.DIRTY_KEY] = True
+
+    def invalidate_now(self):
+        self.local.clear()
+        try:
+            redis_client.incr(self.EPOCH_KEY)
+        except Exception as e:
+            logger.warning("incr perms epoch failed: {}", e)
+
+
+perms_cache = PermsCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop(PermsCache.DIRTY_KEY, False):
+        perms_cache.invalidate_now()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(PermsCache.DIRTY_KEY, None)
@@ -0,0 +1,222 @@
+"""
+region client pool registry
+
+集群 urllib3 连接池注册表:
+- 以集群名与连接配置的摘要作为稳定键, 所有集群客户端共享
+- 加锁创建, 避免并发重复创建连接池
+- 淘汰时显式关闭连接池中的 socket
+- 定期回收长时间空闲的连接池
+- 按集群熔断: 连续连接失败(建连失败、建连超时、连接中断)达到阈值后在冷却期内直接失败,
+  读超时、SSL 及其他错误不计入
+"""
+import hashlib
+import os
+import threading
+import time
+
+from loguru import logger
+from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, ProtocolError
+
+from core.utils.metrics import metrics
+from exceptions.main import ServiceHandleException
+
+
+# 计入熔断的连接失败, NewConnectionError 是 ConnectTimeoutError 的子类
+CONNECTION_FAILURES = (ConnectTimeoutError, ProtocolError)
+
+
+def is_connection_failure(exc):
+    """
+    是否为计入熔断的连接失败; 重试耗尽时 urllib3 抛出 MaxRetryError, 按其 reason 判断
+    """
+    if isinstance(exc, MaxRetryError):
+        exc = exc.reason
+    return isinstance(exc, CONNECTION_FAILURES)
+
+
+class _PoolEntry(object):
+    __slots__ = ("key", "region_name", "pool_manager", "created_at", "last_used", "requests")
+
+    def __init__(self, key, region_name, pool_manager):
+        self.key = key
+        self.region_name = region_name
+        self.pool_manager = pool_manager
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.requests = 0
+
+
+class _Breaker(object):
+    __slots__ = ("failures", "open_until", "trial")
+
+    def __init__(self):
+        self.failures = 0
+        self.open_until = 0.0
+        self.trial = False
+
+
+class RegionClientPoolRegistry(object):
+    """
+    RegionClientPoolRegistry
+    """
+
+    def __init__(self):
+        self.idle_timeout = int(os.environ.get("REGION_POOL_IDLE_TIMEOUT", 300))
+        self.reap_interval = int(os.environ.get("REGION_POOL_REAP_INTERVAL", 60))
+        self.failure_threshold = int(os.environ.get("REGION_BREAKER_FAILURES", 5))
+        self.cooldown = int(os.environ.get("REGION_BREAKER_COOLDOWN", 30))
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._breakers = {}
+        self._last_reap = time.monotonic()
+
+    @staticmethod
+    def make_key(region_config):
+        """
+        稳定的连接池键, 集群地址或证书变化时生成新键
+        """
+        raw = "\n".join([region_config.region_name or "", region_config.url or "", region_config.ssl_ca_cert or "",
+                         region_config.cert_file or "", region_config.key_file or ""])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, region_config, factory):
+        """
+        获取集群连接池, 不存在时调用 factory 创建
+        :param region_config: 集群配置
+        :param factory: 无参函数, 返回 urllib3.PoolManager
+        :return: PoolManager, factory 返回 None 时为 None
+        """
+        self.check_breaker(region_config.region_name)
+        key = self.make_key(region_config)
+        self._maybe_reap()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                pool_manager = factory()
+                if not pool_manager:
+                    return None
+                # 同一集群配置变更后旧连接池不会再被使用, 直接关闭
+                for stale in [e for e in self._entries.values() if e.region_name == region_config.region_name]:
+                    self._close(stale)
+                entry = _PoolEntry(key, region_config.region_name, pool_manager)
+                self._entries[key] = entry
+                metrics.incr("region.pool.{}.created".format(region_config.region_name))
+            entry.last_used = time.monotonic()
+            entry.requests += 1
+            return entry.pool_manager
+
+    def evict(self, region_config):
+        """
+        淘汰并关闭集群连接池
+        """
+        with self._lock:
+            entry = self._entries.get(self.make_key(region_config))
+            if entry:
+                self._close(entry)
+                metrics.incr("region.pool.{}.evicted".format(entry.region_name))
+
+    def _close(self, entry):
+        self._entries.pop(entry.key, None)
+        try:
+            entry.pool_manager.clear()
+        except Exception as e:
+            logger.exception(e)
+
+    def _maybe_reap(self):
+        now = time.monotonic()
+        if now - self._last_reap < self.reap_interval:
+            return
+        self.reap_idle(now)
+
+    def reap_idle(self, now=None):
+        """
+        关闭空闲超过 idle_timeout 的连接池
+        """
+        now = now or time.monotonic()
+        with self._lock:
+            self._last_reap = now
+            idle = [e for e in self._entries.values() if now - e.last_used > self.idle_timeout]
+            for entry in idle:
+                self._close(entry)
+                metrics.incr("region.pool.{}.reaped".format(entry.region_name))
+        return len(idle)
+
+    def check_breaker(self, region_name):
+        """
+        熔断打开时直接拒绝; 冷却期结束后放行一次试探请求
+        """
+        with self._lock:
+            breaker = self._breakers.get(region_name)
+            if not breaker or breaker.failures < self.failure_threshold:
+                return
+            if time.monotonic() < breaker.open_until or breaker.trial:
+                metrics.incr("region.breaker.{}.rejected".format(region_name))
+                raise ServiceHandleException(msg="region {} circuit open".format(region_name),
+                                             msg_show="集群连接异常，请稍后重试", status_code=503, error_code=10411)
+            breaker.trial = True
+
+    def record_success(self, region_name):
+        with self._lock:
+            breaker = self._breakers.get(region_name)
+            if breaker and (breaker.failures or breaker.trial):
+                if breaker.failures >= self.failure_threshold:
+                    logger.info("region {} circuit closed", region_name)
+                self._breakers.pop(region_name, None)
+
+    def record_error(self, region_name):
+        """
+        不计入熔断的错误, 只结束试探请求, 冷却期结束后的下一个请求继续试探
+        """
+        with self._lock:
+            breaker = self._breakers.get(region_name)
+            if breaker:
+                breaker.trial = False
+
+    def record_failure(self, region_name):
+        """
+        连接失败, 计入熔断
+        """
+        with self._lock:
+            breaker = self._breakers.setdefault(region_name, _Breaker())
+            breaker.failures += 1
+            breaker.trial = False
+            if breaker.failures >= self.failure_threshold:
+                breaker.open_until = time.monotonic() + self.cooldown
+                metrics.incr("region.breaker.{}.opened".format(region_name))
+                logger.warning("region {} circuit open for {}s after {} failures", region_name, self.cooldown,
+                               breaker.failures)
+
+    def stats(self):
+        """
+        按集群汇总连接池状态
+        """
+        now = time.monotonic()
+        with self._lock:
+            result = {}
+            for entry in self._entries.values():
+                pools = entry.pool_manager.pools
+                connections = 0
+                for pool_key in list(pools.keys()):
+                    pool = pools.get(pool_key)
+                    if pool is not None:
+                        connections += pool.num_connections
+                result[entry.region_name] = {
+                    "host_pools": len(pools),
+                    "connections_created": connections,
+                    "requests": entry.requests,
+                    "idle_seconds": round(now - entry.last_used, 1),
+                    "age_seconds": round(now - entry.created_at, 1),
+                }
+            for region_name, breaker in self._breakers.items():
+                item = result.setdefault(region_name, {})
+                item["failures"] = breaker.failures
+                item["circuit_open"] = breaker.failures >= self.failure_threshold and now < breaker.open_until
+            return result
+
+    def close_all(self):
+        with self._lock:
+            for entry in list(self._entries.values()):
+                self._close(entry)
+
+
+region_client_pool = RegionClientPoolRegistry()
@@ -0,0 +1,131 @@
+"""
+region api executor
+
+集群接口客户端基于 urllib3 同步阻塞调用, 在 async 接口中直接调用会阻塞整个 worker 的事件循环。
+此处为每个集群维护独立的有界线程池, 单个集群响应缓慢时只会占满自身的线程与排队额度,
+不影响其他集群及其他请求。
+调用方超时取消后线程中的调用仍会继续执行, 在途额度在线程执行结束时才释放。
+需要查询数据库的调用使用 run_with_session 在线程内创建独立会话, 请求会话不能跨线程使用:
+调用方取消后线程仍在查询时, 请求结束会在事件循环线程中提交并关闭请求会话。
+"""
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from core.utils.metrics import metrics
+from database.session import SessionClass
+from exceptions.main import ServiceHandleException
+
+
+def _call_with_session(func, /, *args, **kwargs):
+    session = SessionClass()
+    try:
+        return func(*args, session=session, **kwargs)
+    finally:
+        session.close()
+
+
+class RegionExecutor(object):
+    """
+    RegionExecutor
+    """
+
+    def __init__(self, max_workers=None, max_pending=None):
+        self.max_workers = max_workers or int(os.environ.get("REGION_EXECUTOR_WORKERS", 8))
+        # 单集群允许的在途调用数(执行中 + 排队中), 超过后直接拒绝
+        self.max_pending = max_pending or int(os.environ.get("REGION_EXECUTOR_MAX_PENDING", 64))
+        self._lock = threading.Lock()
+        self._executors = {}
+        self._slots = {}
+        self._pending = {}
+
+    def _get_executor(self, region_name):
+        executor = self._executors.get(region_name)
+        if executor:
+            return executor
+        with self._lock:
+            executor = self._executors.get(region_name)
+            if not executor:
+                executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                              thread_name_prefix="region-{}".format(region_name))
+                self._slots[region_name] = threading.BoundedSemaphore(self.max_pending)
+                self._pending[region_name] = 0
+                self._executors[region_name] = executor
+            return executor
+
+    def _update_pending(self, region_name, delta):
+        with self._lock:
+            pending = self._pending.get(region_name, 0) + delta
+            self._pending[region_name] = pending
+        metrics.set_gauge("region.executor.{}.pending".format(region_name), pending)
+
+    async def run(self, region_name, func, /, *args, **kwargs):
+        """
+        在集群对应的线程池中执行阻塞调用, region_name/func 仅限位置参数, func 的关键字参数中可以有 region_name
+        :param region_name: 集群名称
+        :param func: 阻塞函数
+        :return: func 返回值
+        """
+        executor = self._get_executor(region_name)
+        slots = self._slots[region_name]
+        if not slots.acquire(blocking=False):
+            metrics.incr("region.executor.{}.rejected".format(region_name))
+            logger.warning("region {} executor is full, pending limit {}", region_name, self.max_pending)
+            raise ServiceHandleException(msg="region {} is busy".format(region_name), msg_show="集群请求繁忙，请稍后重试",
+                                         status_code=503, error_code=10411)
+        self._update_pending(region_name, 1)
+        submit_time = time.perf_counter()
+
+        def _call():
+            metrics.observe("region.executor.{}.queue_wait".format(region_name), time.perf_counter() - submit_time)
+            return func(*args, **kwargs)
+
+        def _release(_future=None):
+            self._update_pending(region_name, -1)
+            slots.release()
+
+        try:
+            future = executor.submit(_call)
+        except Exception:
+            _release()
+            raise
+        future.add_done_callback(_release)
+        with metrics.timer("region.executor.{}.call".format(region_name)):
+            return await asyncio.wrap_future(future)
+
+    async def run_with_session(self, region_name, func, /, *args, **kwargs):
+        """
+        在集群线程池中执行 func, 以关键字参数 session 传入线程内新建的数据库会话, 执行结束后关闭
+        """
+        return await self.run(region_name, _call_with_session, func, *args, **kwargs)
+
+    def wrap(self, region_name, func):
+        """
+        返回 func 的可 await 版本
+        """
+
+        @functools.wraps(func)
+        async def _wrapper(*args, **kwargs):
+            return await self.run(region_name, func, *args, **kwargs)
+
+        return _wrapper
+
+    def stats(self):
+        with self._lock:
+            return {name: {"pending": pending, "max_pending": self.max_pending, "max_workers": self.max_workers}
+                    for name, pending in self._pending.items()}
+
+    def shutdown(self):
+        with self._lock:
+            executors = list(self._executors.values())
+            self._executors = {}
+        for executor in executors:
+            executor.shutdown(wait=False)
+
+
+region_executor = RegionExecutor()
@@ -0,0 +1,80 @@
+"""
+region fan-out
+
+企业级总览需要对每个集群分别调用集群接口并做少量数据库查询, 逐个集群串行执行时耗时随集群数线性增长,
+且一个不可达的集群会占用完整的超时时间。
+此处通过 region_executor 并发执行各集群的调用:
+- 每个集群使用独立的数据库会话, 会话不跨线程共享
+- 每个集群有独立的截止时间, 超时或失败的集群只记录错误, 不影响其他集群的结果
+"""
+import asyncio
+import os
+
+from loguru import logger
+
+from common.region_executor import region_executor
+from core.utils.metrics import metrics
+from database.session import SessionClass
+
+REGION_FANOUT_TIMEOUT = float(os.environ.get("REGION_FANOUT_TIMEOUT", 10))
+
+
+class RegionResult(object):
+    """
+    单个集群的调用结果
+    """
+    __slots__ = ("region_name", "data", "error")
+
+    def __init__(self, region_name, data=None, error=None):
+        self.region_name = region_name
+        self.data = data
+        self.error = error
+
+    @property
+    def success(self):
+        return self.error is None
+
+    def to_dict(self):
+        return {"region_name": self.region_name, "success": self.success, "error": self.error}
+
+
+def _call(func, region_name):
+    session = SessionClass()
+    try:
+        return func(session, region_name)
+    finally:
+        session.close()
+
+
+async def _run(region_name, func, timeout):
+    try:
+        with metrics.timer("region.fanout.{}".format(region_name)):
+            data = await asyncio.wait_for(region_executor.run(region_name, _call, func, region_name), timeout)
+        return RegionResult(region_name, data=data)
+    except asyncio.TimeoutError:
+        metrics.incr("region.fanout.{}.timeout".format(region_name))
+        logger.warning("region {} fan-out call timeout after {}s", region_name, timeout)
+        return RegionResult(region_name, error="timeout")
+    except Exception as e:
+        metrics.incr("region.fanout.{}.failed".format(region_name))
+        logger.exception("region {} fan-out call failed: {}", region_name, e)
+        return RegionResult(region_name, error=getattr(e, "msg_show", None) or str(e))
+
+
+async def fan_out(region_names, func, timeout=None):
+    """
+    并发对多个集群执行阻塞调用, 等待全部完成或超时
+    :param region_names: 集群名称列表
+    :param func: func(session, region_name), 在集群线程池中执行, session 为独立的数据库会话
+    :param timeout: 单个集群的截止时间(秒)
+    :return: [RegionResult], 与 region_names 顺序一致
+    """
+    timeout = timeout or REGION_FANOUT_TIMEOUT
+    return list(await asyncio.gather(*[_run(region_name, func, timeout) for region_name in region_names]))
+
+
+def region_errors(results):
+    """
+    响应中附带的集群错误信息
+    """
+    return [result.to_dict() for result in results if not result.success]
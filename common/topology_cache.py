@@ -0,0 +1,82 @@
+"""
+topology cache
+
+应用拓扑图静态部分(组件节点与依赖边)的进程内快照, 以 group_id 为键:
+- 快照记录构建时的应用组件集合, 组件增删后自动失效
+- 依赖关系变更的事务提交后递增 redis 中的全局版本号, 所有 worker 的快照随之失效;
+  构建快照前先读取版本号, 构建期间有变更提交时快照的版本号已过期, 不会被使用
+- redis 不可用时不使用快照
+组件状态与实例数每次轮询实时查询, 不在快照中。
+"""
+import os
+
+from loguru import logger
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core.utils.cache import TTLCache
+from database.redis_session import redis_client
+
+TOPOLOGY_CACHE_TTL = int(os.environ.get("TOPOLOGY_CACHE_TTL", 10))
+
+
+class TopologyCache(object):
+    """
+    TopologyCache
+    """
+    EPOCH_KEY = "topology:epoch"
+    DIRTY_KEY = "topology_dirty"
+
+    def __init__(self, ttl=TOPOLOGY_CACHE_TTL):
+        self.local = TTLCache("topology", maxsize=1000, ttl=ttl)
+
+    def epoch(self):
+        """
+        当前依赖关系版本号, redis 不可用时返回 None
+        """
+        try:
+            return int(redis_client.get(self.EPOCH_KEY) or 0)
+        except Exception as e:
+            logger.warning("get topology epoch from redis failed: {}", e)
+            return None
+
+    def get(self, group_id, member_ids):
+        snapshot = self.local.get(group_id)
+        if not snapshot or snapshot.member_ids != frozenset(member_ids):
+            return None
+        epoch = self.epoch()
+        if epoch is None or epoch != snapshot.epoch:
+            return None
+        return snapshot
+
+    def set(self, group_id, snapshot):
+        if snapshot.epoch is None or not snapshot.cacheable:
+            return
+        self.local.set(group_id, snapshot)
+
+    def invalidate(self, session):
+        """
+        标记会话中有依赖关系变更, 事务提交后失效
+        """
+        session.info[self.DIRTY_KEY] = True
+
+    def invalidate_now(self):
+        self.local.clear()
+        try:
+            redis_client.incr(self.EPOCH_KEY)
+        except Exception as e:
+            logger.warning("incr topology epoch failed: {}", e)
+
+
+topology_cache = TopologyCache()
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop(TopologyCache.DIRTY_KEY, None):
+        topology_cache.invalidate_now()
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(TopologyCache.DIRTY_KEY, None)
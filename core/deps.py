@@ -1,18 +1,28 @@
-import pickle
+import hashlib
+import os
+import time
 from typing import Optional
 
 from fastapi import Request, Header, Depends
 from jose import jwt
 from loguru import logger
 
+from common.identity_cache import identity_cache
 from core.setting import settings
-from database.session import SessionClass
+from core.utils.cache import TTLCache
+from core.utils.metrics import metrics
+from database.session import SessionClass, AsyncSessionClass
 from exceptions.main import ServiceHandleException
 from models.teams import TeamInfo
 from models.users.users import Users
 from repository.teams.team_repo import team_repo
 from repository.users.user_repo import user_repo
 
+JWT_CACHE_TTL = int(os.environ.get("JWT_CACHE_TTL", 300))
+
+# 已校验通过的访问令牌, 以令牌哈希为键, 缓存时间不超过令牌剩余有效期
+_verified_tokens = TTLCache("jwt", maxsize=10000, ttl=JWT_CACHE_TTL)
+
 
 async def get_session() -> SessionClass:
     """
@@ -31,27 +41,64 @@ async def get_session() -> SessionClass:
         session.close()
 
 
+def release_session(session):
+    """
+    提前提交并关闭请求会话, 归还数据库连接
+    get_session 的清理在响应结束后才执行, 流式响应会在整个推送期间占用连接, 返回流式响应前调用
+    """
+    session.commit()
+    session.close()
+
+
+async def get_async_session() -> AsyncSessionClass:
+    """
+    get async session
+    """
+    async with AsyncSessionClass() as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception as e:
+            logger.exception(e)
+            await session.rollback()
+            raise
+
+
+def verify_token(token):
+    """
+    校验访问令牌并返回 payload, 同一令牌在缓存有效期内不再重复验签
+    """
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    payload = _verified_tokens.get(key)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    ttl = JWT_CACHE_TTL
+    if payload.get("exp"):
+        ttl = min(ttl, payload["exp"] - time.time())
+    if ttl > 0:
+        _verified_tokens.set(key, payload, ttl)
+    return payload
+
+
 async def get_current_user(request: Request, authorization: Optional[str] = Header(None),
                            session: SessionClass = Depends(get_session)) -> Users:
-    try:
-        logger.info("token:{}", authorization)
-        if not authorization:
-            raise ServiceHandleException(msg="parse token failed", msg_show="访问令牌解析失败")
-        token = authorization.split(" ")[1]
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        result = request.app.state.redis.get("user_" + str(payload["user_id"]))
-        if not result:
-            user = user_repo.get_by_primary_key(session=session, primary_key=payload["user_id"])
-            if user:
-                request.app.state.redis.set("user_%d" % user.user_id, pickle.dumps(user), settings.REDIS_CACHE_TTL)
-        else:
-            user = pickle.loads(result)
-        return user
-    except ServiceHandleException as token_err:
-        logger.exception("ServiceHandleException", token_err)
-        raise token_err
-    except Exception as e:
-        logger.exception("catch exception", e)
+    with metrics.timer("auth.current_user"):
+        try:
+            if not authorization:
+                raise ServiceHandleException(msg="parse token failed", msg_show="访问令牌解析失败")
+            token = authorization.split(" ")[1]
+            payload = verify_token(token)
+            user_id = payload["user_id"]
+            return await identity_cache.get_user(
+                user_id, lambda: user_repo.get_by_primary_key(session=session, primary_key=user_id))
+        except ServiceHandleException as token_err:
+            metrics.incr("auth.current_user.failed")
+            logger.exception("ServiceHandleException", token_err)
+            raise token_err
+        except Exception as e:
+            metrics.incr("auth.current_user.failed")
+            logger.exception("catch exception", e)
 
 
 async def get_current_team(request: Request, team_name: str, session: SessionClass = Depends(get_session)) -> TeamInfo:
@@ -59,13 +106,11 @@ async def get_current_team(request: Request, team_name: str, session: SessionCla
     logger.info("查询团队信息,团队名称:{}", team_name)
     if not team_name:
         raise ServiceHandleException(msg="team_name not found", msg_show="团队名称不存在")
-    team_cache = request.app.state.redis.get("team_%s" % team_name)
-    if not team_cache:
-        team_db = team_repo.get_one_by_model(session=session, query_model=TeamInfo(tenant_name=team_name))
-        if not team_db:
-            logger.error("未找到团队信息,团队名称:{}", team_name)
-            raise ServiceHandleException(msg="team not found", msg_show="团队不存在")
-        request.app.state.redis.set("team_%s" % team_name, pickle.dumps(team_db), settings.REDIS_CACHE_TTL)
-        return team_db
-    team_cache_info = pickle.loads(team_cache)
-    return team_cache_info
+    with metrics.timer("auth.current_team"):
+        team = await identity_cache.get_team(
+            team_name,
+            lambda: team_repo.get_one_by_model(session=session, query_model=TeamInfo(tenant_name=team_name)))
+    if not team:
+        logger.error("未找到团队信息,团队名称:{}", team_name)
+        raise ServiceHandleException(msg="team not found", msg_show="团队不存在")
+    return team
@@ -5,7 +5,6 @@ import os
 import socket
 import ssl
 
-import certifi
 import httplib2
 import urllib3
 from addict import Dict
@@ -213,13 +212,6 @@ class RegionApiBaseHttpClient(object):
         else:
             cert_reqs = ssl.CERT_NONE
 
-        # ca_certs
-        if configuration.ssl_ca_cert:
-            ca_certs = configuration.ssl_ca_cert
-        else:
-            # if not set certificate file, use Mozilla's root certificates.
-            ca_certs = certifi.where()
-
         addition_pool_args = {}
         if configuration.assert_hostname is not None:
             addition_pool_args['assert_hostname'] = configuration.assert_hostname
@@ -236,9 +228,7 @@ class RegionApiBaseHttpClient(object):
                 num_pools=pools_size,
                 maxsize=maxsize,
                 cert_reqs=cert_reqs,
-                ca_certs=ca_certs,
-                cert_file=configuration.cert_file,
-                key_file=configuration.key_file,
+                ssl_context=configuration.ssl_context,
                 proxy_url=configuration.proxy,
                 timeout=5,
                 **addition_pool_args)
@@ -247,9 +237,7 @@ class RegionApiBaseHttpClient(object):
                 num_pools=pools_size,
                 maxsize=maxsize,
                 cert_reqs=cert_reqs,
-                ca_certs=ca_certs,
-                cert_file=configuration.cert_file,
-                key_file=configuration.key_file,
+                ssl_context=configuration.ssl_context,
                 timeout=5,
                 **addition_pool_args)
         return self.pool_manager
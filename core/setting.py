@@ -1,6 +1,6 @@
 import os
 import sys
-from typing import List
+from typing import List, Optional
 from loguru import logger
 from pydantic import BaseSettings
 from core.auth.role_required import RoleRequired
@@ -37,6 +37,23 @@ class Settings(BaseSettings):
     MYSQL_PASS = os.environ.get("MYSQL_PASS", "admin")
 
     SQLALCHEMY_DATABASE_URI: str = 'mysql://' + MYSQL_USER + ':' + MYSQL_PASS + '@' + MYSQL_HOST + ':' + MYSQL_PORT + '/console'
+    SQLALCHEMY_ASYNC_DATABASE_URI: str = 'mysql+aiomysql://' + MYSQL_USER + ':' + MYSQL_PASS + '@' + MYSQL_HOST + ':' \
+                                         + MYSQL_PORT + '/console'
+
+    # 数据库连接池配置, DB_POOL_CLASS 可选 queue/null(迁移脚本等短任务使用 null)
+    DB_POOL_CLASS = os.environ.get("DB_POOL_CLASS", "queue")
+    # 所有worker合计的连接数上限, 按 WEB_CONCURRENCY 均分到每个worker, 每个worker的份额再按
+    # DB_ASYNC_POOL_RATIO 分给同步、异步两个引擎; 显式配置 DB_POOL_SIZE/DB_ASYNC_POOL_SIZE 时按各自的值
+    DB_POOL_TOTAL_SIZE = int(os.environ.get("DB_POOL_TOTAL_SIZE", 40))
+    DB_POOL_SIZE: Optional[int] = None
+    DB_ASYNC_POOL_SIZE: Optional[int] = None
+    DB_ASYNC_POOL_RATIO = float(os.environ.get("DB_ASYNC_POOL_RATIO", 0.25))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 5))
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 10))
+    # 需小于 MySQL wait_timeout
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+    WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
 
     # 日志级别
     # CRITICAL = 50
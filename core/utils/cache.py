@@ -0,0 +1,116 @@
+# -*- coding: utf8 -*-
+"""
+进程内 LRU + TTL 缓存
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from core.utils.metrics import metrics
+
+_MISSING = object()
+
+
+class TTLCache(object):
+    """
+    线程安全的 LRU 缓存, 条目在 ttl 秒后过期, 超过 maxsize 时淘汰最久未使用的条目。
+    命中/未命中次数记录在 cache.{name}.hit / cache.{name}.miss
+    """
+
+    def __init__(self, name, maxsize=1024, ttl=60):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expire_at = item
+                if expire_at > now:
+                    self._data.move_to_end(key)
+                    metrics.incr("cache.{}.hit".format(self.name))
+                    return value
+                del self._data[key]
+        metrics.incr("cache.{}.miss".format(self.name))
+        return default
+
+    def set(self, key, value, ttl=None):
+        expire_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expire_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_load(self, key, loader, ttl=None):
+        """
+        读取缓存, 未命中时调用 loader 加载, loader 返回 None 时不缓存
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = loader()
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+        metrics.incr("cache.{}.invalidate".format(self.name))
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        metrics.incr("cache.{}.invalidate".format(self.name))
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Call(object):
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    合并并发的相同调用: 同一 key 同时只执行一次 func, 其余调用方等待并共享结果
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func, timeout=None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            metrics.incr("singleflight.{}.shared".format(self.name))
+            if not call.event.wait(timeout):
+                return func()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
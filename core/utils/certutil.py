@@ -62,6 +62,21 @@ def parse_subject_alt_names(content):
     return subject_alt_names
 
 
+def san_suffix(san):
+    """证书域名可匹配的后缀, 通配符域名去掉 *."""
+    return san[2:] if san.startswith('*') else san
+
+
+def domain_suffixes(domain_name):
+    """域名按 . 切分后的全部后缀, 自身在前"""
+    labels = domain_name.split('.')
+    return ['.'.join(labels[i:]) for i in range(len(labels)) if labels[i]]
+
+
+def reverse_domain(domain_name):
+    return domain_name[::-1]
+
+
 def cert_is_effective(content, private_key):
     """分析证书是否有效"""
     try:
@@ -0,0 +1,80 @@
+# -*- coding: utf8 -*-
+"""
+进程内运行时指标
+
+按名称记录计数器、瞬时值与耗时统计, 供连接池、缓存、集群调用等模块上报,
+通过 snapshot() 统一导出。
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class _Timer(object):
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self):
+        avg = self.total / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "avg_ms": round(avg * 1000, 3),
+            "max_ms": round(self.max * 1000, 3)
+        }
+
+
+class MetricsRegistry(object):
+    """
+    MetricsRegistry
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._timers = {}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = _Timer()
+            timer.observe(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self, prefix=""):
+        with self._lock:
+            return {
+                "counters": {k: v for k, v in self._counters.items() if k.startswith(prefix)},
+                "gauges": {k: v for k, v in self._gauges.items() if k.startswith(prefix)},
+                "timers": {k: v.to_dict() for k, v in self._timers.items() if k.startswith(prefix)},
+            }
+
+
+metrics = MetricsRegistry()
@@ -218,17 +218,17 @@ def get_model(kind, kind_name):
 
 
 def get_team_perms_model():
-    return get_model(copy.deepcopy(TEAM), "team")
+    return get_model(TEAM, "team")
 
 
 def get_enterprise_perms_model():
-    return get_model(copy.deepcopy(ENTERPRISE), "enterprise")
+    return get_model(ENTERPRISE, "enterprise")
 
 
 def get_perms_model():
     perms_model = {}
-    team = get_model(copy.deepcopy(TEAM), "team")
-    enterprise = get_model(copy.deepcopy(ENTERPRISE), "enterprise")
+    team = get_model(TEAM, "team")
+    enterprise = get_model(ENTERPRISE, "enterprise")
     perms_model.update(team)
     perms_model.update(enterprise)
     return perms_model
@@ -236,8 +236,8 @@ def get_perms_model():
 
 def get_perms_structure():
     perms_structure = {}
-    team = get_structure(copy.deepcopy(TEAM), "team")
-    enterprise = get_structure(copy.deepcopy(ENTERPRISE), "enterprise")
+    team = get_structure(TEAM, "team")
+    enterprise = get_structure(ENTERPRISE, "enterprise")
     perms_structure.update(team)
     perms_structure.update(enterprise)
     return perms_structure
@@ -312,11 +312,71 @@ def get_perms_name_code(perms_model, kind_name):
 
 def get_perms_name_code_kv():
     perms = {}
-    perms.update(get_perms_name_code(copy.deepcopy(TEAM), "team"))
-    perms.update(get_perms_name_code(copy.deepcopy(ENTERPRISE), "enterprise"))
+    perms.update(get_perms_name_code(TEAM, "team"))
+    perms.update(get_perms_name_code(ENTERPRISE, "enterprise"))
     return perms
 
 
+class CompiledPerms(object):
+    """
+    编译后的权限模型: 每个权限编码对应一个二进制位, 角色权限集合为整数位图,
+    多个角色取并集为按位或, 拥有者为全部位。模型只在首次使用时编译一次。
+    """
+
+    def __init__(self):
+        self.bits = {}
+        self.trees = {"team": self._compile(TEAM, "team"), "enterprise": self._compile(ENTERPRISE, "enterprise")}
+        self.all_mask = (1 << len(self.bits)) - 1
+
+    def _compile(self, kind, kind_name):
+        perms = []
+        for perm in kind.get("perms", []):
+            bit = self.bits.setdefault(perm[2], 1 << len(self.bits))
+            perms.append((perm[0], bit))
+        subs = [self._compile(kind[sub], sub) for sub in kind.keys() if sub != "perms"]
+        return kind_name, tuple(perms), tuple(subs)
+
+    def mask(self, codes):
+        """
+        权限编码列表转换为位图, 忽略模型中不存在的编码
+        """
+        mask = 0
+        for code in codes:
+            mask |= self.bits.get(code, 0)
+        return mask
+
+    def _render(self, node, mask):
+        kind_name, perms, subs = node
+        return {
+            kind_name: {
+                "sub_models": [self._render(sub, mask) for sub in subs],
+                "perms": [{name: bool(mask & bit)} for name, bit in perms]
+            }
+        }
+
+    def render(self, mask, kind=None):
+        """
+        生成与 RolePermService.pack_role_perms_tree 结构一致的权限树
+        :param kind: team/enterprise, 为空时包含两者
+        """
+        if kind in self.trees:
+            return self._render(self.trees[kind], mask)
+        tree = {}
+        for node in self.trees.values():
+            tree.update(self._render(node, mask))
+        return tree
+
+
+_compiled_perms = None
+
+
+def get_compiled_perms():
+    global _compiled_perms
+    if _compiled_perms is None:
+        _compiled_perms = CompiledPerms()
+    return _compiled_perms
+
+
 def get_perm_code(obj):
     codes = []
     for key in obj:
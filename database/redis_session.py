@@ -0,0 +1,22 @@
+from redis import StrictRedis
+from redis import asyncio as aioredis
+
+from core.setting import settings
+
+
+def get_redis_pool():
+    redis = StrictRedis(host=settings.REDIS_HOST, port=int(settings.REDIS_PORT), db=int(settings.REDIS_DATABASE),
+                        password=settings.REDIS_PASSWORD, encoding="utf-8")
+    return redis
+
+
+def get_async_redis_pool():
+    redis = aioredis.StrictRedis(host=settings.REDIS_HOST, port=int(settings.REDIS_PORT),
+                                 db=int(settings.REDIS_DATABASE), password=settings.REDIS_PASSWORD, encoding="utf-8")
+    return redis
+
+
+# 进程内共享的 redis 客户端, 供 app.state 之外的服务层缓存使用
+redis_client = get_redis_pool()
+# 事件循环中使用的异步 redis 客户端, 避免在异步依赖中阻塞
+async_redis_client = get_async_redis_pool()
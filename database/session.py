@@ -1,16 +1,145 @@
+import time
+
 import pymysql
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool
 
 from core.setting import settings
+from core.utils.metrics import metrics
 
 pymysql.install_as_MySQLdb()
 DATABASE_URL = settings.SQLALCHEMY_DATABASE_URI
-# pool_size=10, max_overflow=2, pool_pre_ping=True,
-engine = create_engine(DATABASE_URL, future=True, echo=False, poolclass=NullPool)
+ASYNC_DATABASE_URL = settings.SQLALCHEMY_ASYNC_DATABASE_URI
+
+
+class MetricsQueuePool(QueuePool):
+    """
+    记录连接借出等待耗时的 QueuePool
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super(MetricsQueuePool, self)._do_get()
+        except PoolTimeoutError:
+            metrics.incr("db.pool.timeout")
+            raise
+        finally:
+            metrics.observe("db.pool.checkout_wait", time.perf_counter() - start)
+
+
+def get_pool_size(is_async=False):
+    """
+    计算单个worker的连接池大小
+    未显式配置 DB_POOL_SIZE/DB_ASYNC_POOL_SIZE 时, 将 DB_POOL_TOTAL_SIZE 按 worker 数均分,
+    再按 DB_ASYNC_POOL_RATIO 分给同步、异步引擎, 两个连接池合计不超过该worker的份额
+    :param is_async: 是否为异步引擎
+    """
+    explicit = settings.DB_ASYNC_POOL_SIZE if is_async else settings.DB_POOL_SIZE
+    # 未配置时为 None
+    if explicit is not None:
+        return max(explicit, 1)
+    workers = max(settings.WEB_CONCURRENCY, 1)
+    worker_size = max(settings.DB_POOL_TOTAL_SIZE // workers, 2)
+    async_size = min(max(int(worker_size * settings.DB_ASYNC_POOL_RATIO), 1), worker_size - 1)
+    return async_size if is_async else worker_size - async_size
+
+
+def build_engine(url=DATABASE_URL, pool_class=None, **kwargs):
+    """
+    创建数据库引擎
+    :param url: 数据库地址
+    :param pool_class: queue/null, 默认取 DB_POOL_CLASS
+    :return: engine
+    """
+    pool_class = (pool_class or settings.DB_POOL_CLASS).lower()
+    if pool_class == "null":
+        return create_engine(url, future=True, echo=False, poolclass=NullPool, **kwargs)
+    new_engine = create_engine(url, future=True, echo=False, poolclass=MetricsQueuePool,
+                               pool_size=get_pool_size(),
+                               max_overflow=settings.DB_MAX_OVERFLOW,
+                               pool_timeout=settings.DB_POOL_TIMEOUT,
+                               pool_recycle=settings.DB_POOL_RECYCLE,
+                               pool_pre_ping=settings.DB_POOL_PRE_PING,
+                               **kwargs)
+    register_pool_metrics(new_engine)
+    return new_engine
+
+
+def build_async_engine(url=ASYNC_DATABASE_URL, pool_class=None, **kwargs):
+    """
+    创建异步数据库引擎(aiomysql), 连接池大小见 get_pool_size, 其余参数与同步引擎一致
+    :param url: 数据库地址
+    :param pool_class: queue/null, 默认取 DB_POOL_CLASS
+    :return: AsyncEngine
+    """
+    pool_class = (pool_class or settings.DB_POOL_CLASS).lower()
+    if pool_class == "null":
+        return create_async_engine(url, future=True, echo=False, poolclass=NullPool, **kwargs)
+    new_engine = create_async_engine(url, future=True, echo=False,
+                                     pool_size=get_pool_size(is_async=True),
+                                     max_overflow=settings.DB_MAX_OVERFLOW,
+                                     pool_timeout=settings.DB_POOL_TIMEOUT,
+                                     pool_recycle=settings.DB_POOL_RECYCLE,
+                                     pool_pre_ping=settings.DB_POOL_PRE_PING,
+                                     **kwargs)
+    register_pool_metrics(new_engine.sync_engine, prefix="db.async_pool.")
+    return new_engine
+
+
+def register_pool_metrics(target_engine, prefix="db.pool."):
+    """
+    注册连接池事件, 统计连接创建、借出、归还及失效次数
+    """
+
+    @event.listens_for(target_engine.pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.incr(prefix + "connect")
+
+    @event.listens_for(target_engine.pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.incr(prefix + "checkout")
+        metrics.set_gauge(prefix + "checked_out", target_engine.pool.checkedout())
+
+    @event.listens_for(target_engine.pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.incr(prefix + "checkin")
+        metrics.set_gauge(prefix + "checked_out", target_engine.pool.checkedout())
+
+    @event.listens_for(target_engine.pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.incr(prefix + "invalidate")
+
+
+def get_pool_status(target_engine=None, prefix="db.pool."):
+    """
+    连接池状态
+    """
+    target_engine = target_engine or engine
+    pool = target_engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool_class": pool.__class__.__name__}
+    return {
+        "pool_class": pool.__class__.__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "stats": metrics.snapshot(prefix),
+    }
+
+
+engine = build_engine()
 
 SessionClass = sessionmaker(engine, expire_on_commit=False, autoflush=False)
 # SessionClass = sessionmaker(bind=engine, autoflush=False)
 
+async_engine = build_async_engine()
+
+AsyncSessionClass = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
 Base = declarative_base()
@@ -4,15 +4,21 @@ from fastapi import FastAPI, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from loguru import logger
-from redis import StrictRedis
 from starlette.responses import JSONResponse
 
 from apis.apis import api_router
+from clients.async_remote_app_client import async_remote_app_client
+from clients.async_remote_component_client import async_remote_component_client
+from common.region_client_pool import region_client_pool
+from common.region_executor import region_executor
 from core.nacos import register_nacos, beat
 from core.utils.return_message import general_message
-from database.session import engine, Base, settings
+from database.redis_session import async_redis_client, redis_client
+from database.session import engine, async_engine, Base, settings
 from exceptions.main import ServiceHandleException
 from middleware import register_middleware
+from service.expressway.hunan_dashboard_service import hunan_dashboard_service, DASHBOARD_AGGREGATE_INTERVAL
+from service.region_app_reconciler import region_app_reconciler, REGION_APP_RECONCILE_INTERVAL
 
 if settings.ENV == "PROD":
     # 生产关闭swagger
@@ -46,12 +52,6 @@ async def request_validation_exception_handler(request: Request, exception: Requ
     return JSONResponse(general_message(400, "validation error", "参数异常"), status_code=400)
 
 
-def get_redis_pool():
-    redis = StrictRedis(host=settings.REDIS_HOST, port=int(settings.REDIS_PORT), db=int(settings.REDIS_DATABASE),
-                        password=settings.REDIS_PASSWORD, encoding="utf-8")
-    return redis
-
-
 @app.on_event('startup')
 def startup_event():
     """
@@ -59,20 +59,33 @@ def startup_event():
     :return:
     """
     Base.metadata.create_all(engine)
-    app.state.redis = get_redis_pool()
+    app.state.redis = redis_client
 
-    # scheduler = AsyncIOScheduler()
+    scheduler = AsyncIOScheduler()
     # scheduler.add_job(beat, 'interval', seconds=20)
-    # scheduler.start()
+    scheduler.add_job(hunan_dashboard_service.aggregate, 'interval', seconds=DASHBOARD_AGGREGATE_INTERVAL,
+                      max_instances=1, coalesce=True)
+    scheduler.add_job(region_app_reconciler.reconcile, 'interval', seconds=REGION_APP_RECONCILE_INTERVAL,
+                      max_instances=1, coalesce=True)
+    scheduler.start()
+    app.state.scheduler = scheduler
 
 
 @app.on_event('shutdown')
-def shutdown_event():
+async def shutdown_event():
     """
     关闭
     :return:
     """
+    app.state.scheduler.shutdown(wait=False)
     app.state.redis.connection_pool.disconnect()
+    await async_redis_client.connection_pool.disconnect()
+    engine.dispose()
+    await async_engine.dispose()
+    region_executor.shutdown()
+    region_client_pool.close_all()
+    await async_remote_app_client.close_all()
+    await async_remote_component_client.close_all()
 
 
 app.mount("/static", StaticFiles(directory="weavescope"), name="static")
@@ -147,6 +147,32 @@ class ServiceDomainCertificate(Base):
         return "private_key:{} certificate:{}".format(self.private_key, self.certificate)
 
 
+class ServiceDomainCertificateMeta(Base):
+    """网关证书解析结果, 证书新增或修改时写入"""
+
+    __tablename__ = 'service_domain_certificate_meta'
+
+    ID = Column(Integer, primary_key=True)
+    certificate_pk = Column(Integer, comment="证书ID", nullable=False, unique=True)
+    tenant_id = Column(String(32), comment="租户id", nullable=False, index=True)
+    issued_to = Column(Text, comment="证书域名(json)", nullable=False, default='[]')
+    issued_by = Column(String(64), comment="颁发机构", nullable=False, default='')
+    end_data = Column(String(32), comment="过期时间(本地时间)", nullable=False, default='')
+    not_after = Column(DateTime(), comment="过期时间", nullable=True, index=True)
+
+
+class ServiceDomainCertificateSan(Base):
+    """网关证书域名后缀索引, suffix 为去掉通配符的域名, 按倒序存储以便按后缀查询"""
+
+    __tablename__ = 'service_domain_certificate_san'
+
+    ID = Column(Integer, primary_key=True)
+    certificate_pk = Column(Integer, comment="证书ID", nullable=False, index=True)
+    tenant_id = Column(String(32), comment="租户id", nullable=False)
+    san = Column(String(256), comment="证书域名", nullable=False)
+    reversed_suffix = Column(String(256), comment="倒序的域名后缀", nullable=False, index=True)
+
+
 class Applicants(Base):
     """待审批人员信息"""
 
@@ -6,6 +6,7 @@ from sqlalchemy import select, delete, text
 from models.component.models import TeamComponentInfo, ComponentWebhooks, ComponentRecycleBin, \
     ComponentRelationRecycleBin, TeamComponentInfoDelete, TeamComponentConfigurationFile
 from models.market.models import CenterApp, CenterAppVersion, CenterAppTag, CenterAppTagsRelation
+from repository.bulk import bulk_insert
 
 
 class TenantServiceDeleteRepository(object):
@@ -242,9 +243,7 @@ class ComponentConfigurationFileRepository(object):
     def overwrite_by_component_ids(session, component_ids, config_files):
         session.execute(delete(TeamComponentConfigurationFile).where(
             TeamComponentConfigurationFile.service_id.in_(component_ids)))
-        for config_file in config_files:
-            session.merge(config_file)
-        session.flush()
+        bulk_insert(session, TeamComponentConfigurationFile, config_files)
 
 
 app_repo = AppRepo()
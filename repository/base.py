@@ -2,6 +2,7 @@ from typing import Generic, TypeVar, Type, Optional, Any, List, Union, Dict
 
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy import select, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from database.session import Base
@@ -107,3 +108,104 @@ class BaseRepository(Generic[ModelType]):
         """
         list_data = (session.execute(select(self.model))).scalars().all()
         return list_data
+
+
+class AsyncBaseRepository(Generic[ModelType]):
+    """
+    AsyncBaseRepository
+
+    BaseRepository 的异步版本, 配合 deps.get_async_session 在 async 接口中使用,
+    查询期间不会阻塞事件循环
+    """
+
+    def __init__(self, model: Type[ModelType]):
+        self.model = model
+
+    def _primary_key_column(self):
+        if self.model.__name__ == Users.__name__:
+            return self.model.user_id
+        return self.model.ID
+
+    async def get_by_primary_key(self, session: AsyncSession, primary_key: Any) -> Optional[ModelType]:
+        """
+        根据主键查询记录
+        :param session: session
+        :param primary_key: id
+        :return: model
+        """
+        return (await session.execute(
+            select(self.model).where(self._primary_key_column() == primary_key))).scalars().first()
+
+    async def get_multi(self, session: AsyncSession, *, skip: int = 0, limit: int = 20) -> List[ModelType]:
+        """
+        查询多条记录
+        :param session:
+        :param skip:
+        :param limit:
+        :return:
+        """
+        return (await session.execute(select(self.model).offset(skip).limit(limit))).scalars().all()
+
+    async def delete_by_primary_key(self, session: AsyncSession, *, primary_key: int):
+        """
+        根据主键删除记录
+
+        :param session:
+        :param primary_key:
+        """
+        await session.execute(delete(self.model).where(self.model.ID == primary_key))
+        await session.flush()
+
+    @staticmethod
+    async def base_create(session: AsyncSession, *, add_model: ModelType) -> ModelType:
+        """
+        新增记录
+        :param session:
+        :param add_model:
+        :return:
+        """
+        session.add(add_model)
+        await session.flush()
+        await session.refresh(add_model)
+        return add_model
+
+    async def update_by_primary_key(self, session: AsyncSession, *, update_model: Union[ModelType, Dict[str, Any]]):
+        """
+        更新记录
+        :param session:
+        :param update_model:
+        :return:
+        """
+        obj_data = jsonable_encoder(update_model)
+        await session.execute(update(self.model).where(self.model.ID == update_model.ID).values(obj_data))
+        await session.flush()
+
+    async def get_one_by_model(self, session: AsyncSession, *,
+                               query_model: Union[ModelType, Dict[str, Any]]) -> ModelType:
+        """
+        获取单条记录
+        :param session:
+        :param query_model:
+        :return:
+        """
+        query_data: dict = jsonable_encoder(query_model)
+        return (await session.execute(select(self.model).filter_by(**query_data))).scalars().first()
+
+    async def list_by_model(self, session: AsyncSession, *,
+                            query_model: Union[ModelType, Dict[str, Any]]) -> List[ModelType]:
+        """
+        查询列表
+        :param session:
+        :param query_model:
+        :return:
+        """
+        query_data: dict = jsonable_encoder(query_model)
+        return (await session.execute(select(self.model).filter_by(**query_data))).scalars().all()
+
+    async def get_all(self, session: AsyncSession) -> List[ModelType]:
+        """
+        查询列表
+        :param session:
+        :return:
+        """
+        return (await session.execute(select(self.model))).scalars().all()
@@ -0,0 +1,73 @@
+"""
+批量写入
+
+session.add_all / merge 在 flush 时逐行 INSERT(MySQL 自增主键需要逐行取回 lastrowid), merge 还会先按主键 SELECT,
+迁移、复制、恢复上百个组件时会产生数千条语句。
+此处将 ORM 对象转换为列值后按表使用 insert() executemany 写入, 不回填自增主键, 需要新主键时按业务唯一键回查。
+"""
+from sqlalchemy import insert, inspect, select
+
+from core.utils.metrics import metrics
+
+BULK_CHUNK_SIZE = 500
+
+
+def _to_row(mapper, obj):
+    """
+    取已赋值的列, 与 ORM INSERT 一致: 值为 None 的列不写入, 由列默认值填充
+    """
+    if isinstance(obj, dict):
+        return {k: v for k, v in obj.items() if v is not None}
+    state_dict = inspect(obj).dict
+    row = {}
+    for prop in mapper.column_attrs:
+        value = state_dict.get(prop.key)
+        if value is not None:
+            row[prop.columns[0].key] = value
+    return row
+
+
+def bulk_insert(session, model, objs, chunk_size=BULK_CHUNK_SIZE):
+    """
+    批量插入, 列集合相同的行合并为一条 executemany 语句
+    :param model: ORM 模型
+    :param objs: 模型实例或列值字典
+    :return: 插入行数
+    """
+    if not objs:
+        return 0
+    mapper = inspect(model)
+    groups = {}
+    for obj in objs:
+        row = _to_row(mapper, obj)
+        groups.setdefault(frozenset(row.keys()), []).append(row)
+    table = mapper.local_table
+    for rows in groups.values():
+        for i in range(0, len(rows), chunk_size):
+            session.execute(insert(table), rows[i:i + chunk_size])
+            metrics.incr("db.bulk.{}.statements".format(table.name))
+    metrics.incr("db.bulk.{}.rows".format(table.name), len(objs))
+    return len(objs)
+
+
+def fetch_ids(session, model, key_columns, where):
+    """
+    批量插入后按业务唯一键回查新主键
+    :param key_columns: 组成唯一键的列
+    :param where: 过滤条件
+    :return: {(key values): ID}
+    """
+    rows = session.execute(select(model.ID, *key_columns).where(where)).all()
+    return {tuple(row[1:]): row[0] for row in rows}
+
+
+def bulk_insert_objects(session, objs, chunk_size=BULK_CHUNK_SIZE):
+    """
+    按模型分组批量插入 ORM 对象
+    """
+    by_model = {}
+    for obj in objs:
+        by_model.setdefault(type(obj), []).append(obj)
+    for model, items in by_model.items():
+        bulk_insert(session, model, items, chunk_size)
+    return len(objs)
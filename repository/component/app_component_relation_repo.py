@@ -1,6 +1,7 @@
 from sqlalchemy import select, delete, func
 
 from models.application.models import ComponentApplicationRelation, Application
+from models.component.models import TeamComponentInfo
 from repository.base import BaseRepository
 
 
@@ -34,6 +35,21 @@ class ComponentApplicationRelationRepository(BaseRepository[ComponentApplication
                 select(ComponentApplicationRelation).where(ComponentApplicationRelation.group_id.in_(group_ids)))
         ).scalars().all()
 
+    def list_service_ids_by_groups(self, session, tenant_id, region_name, group_ids):
+        """
+        :return: {group_id: [service_id]}
+        """
+        rows = session.execute(
+            select(ComponentApplicationRelation.group_id, TeamComponentInfo.service_id).join(
+                TeamComponentInfo, TeamComponentInfo.service_id == ComponentApplicationRelation.service_id).where(
+                TeamComponentInfo.tenant_id == tenant_id,
+                TeamComponentInfo.service_region == region_name,
+                ComponentApplicationRelation.group_id.in_(group_ids))).all()
+        service_ids = {}
+        for group_id, service_id in rows:
+            service_ids.setdefault(group_id, []).append(service_id)
+        return service_ids
+
     def get_group_by_service_id(self, session, service_id):
         return session.execute(
             select(ComponentApplicationRelation).where(
@@ -3,6 +3,7 @@ from sqlalchemy import select, delete
 from database.session import SessionClass
 from models.component.models import ComponentEnvVar
 from repository.base import BaseRepository
+from repository.bulk import bulk_insert
 
 
 class ServiceEnvVarRepository(BaseRepository[ComponentEnvVar]):
@@ -10,9 +11,7 @@ class ServiceEnvVarRepository(BaseRepository[ComponentEnvVar]):
     def overwrite_by_component_ids(self, session, component_ids, envs):
         session.execute(delete(ComponentEnvVar).where(
             ComponentEnvVar.service_id.in_(component_ids)))
-        for env in envs:
-            session.merge(env)
-        session.flush()
+        bulk_insert(session, ComponentEnvVar, envs)
 
     def list_envs_by_component_ids(self, session, tenant_id, component_ids):
         return session.execute(select(ComponentEnvVar).where(
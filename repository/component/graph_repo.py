@@ -3,6 +3,7 @@ from database.session import SessionClass
 from exceptions.bcode import ErrComponentGraphNotFound, ErrComponentGraphExists
 from models.component.models import ComponentGraph
 from repository.base import BaseRepository
+from repository.bulk import bulk_insert
 
 
 class ComponentGraphRepository(BaseRepository[ComponentGraph]):
@@ -64,9 +65,7 @@ class ComponentGraphRepository(BaseRepository[ComponentGraph]):
     def overwrite_by_component_ids(self, session, component_ids, component_graphs):
         session.execute(delete(ComponentGraph).where(
             ComponentGraph.component_id.in_(component_ids)))
-        for component_graph in component_graphs:
-            session.merge(component_graph)
-        session.flush()
+        bulk_insert(session, ComponentGraph, component_graphs)
 
     def list(self, session: SessionClass, component_id):
         return session.execute(
@@ -161,11 +161,18 @@ class ServiceInfoRepository(BaseRepository[TeamComponentInfo]):
             TeamComponentInfo.service_id == service_id)).scalars().first()
 
     def get_group_service_by_group_id(self, session, group_id, region_name, team_id, team_name, enterprise_id,
-                                      query=""):
-        # todo
+                                      query="", page=None, page_size=None):
+        """
+        应用下组件列表及状态, service_source 随列表查询一并取出;
+        指定 page/page_size 时分页在数据库中完成, 只查询当前页组件的状态
+        """
+        offset = limit = None
+        if page and page_size:
+            limit = page_size
+            offset = (page - 1) * page_size
         group_services_list = base_service.get_group_services_list(session=session, team_id=team_id,
                                                                    region_name=region_name, group_id=group_id,
-                                                                   query=query)
+                                                                   query=query, offset=offset, limit=limit)
         if not group_services_list:
             return []
         service_ids = [service.service_id for service in group_services_list]
@@ -179,10 +186,6 @@ class ServiceInfoRepository(BaseRepository[TeamComponentInfo]):
         result = []
         for service in group_services_list:
             service = dict(service)
-            service_obj = session.execute(select(TeamComponentInfo).where(
-                TeamComponentInfo.service_id == service["service_id"])).scalars().first()
-            if service_obj:
-                service["service_source"] = service_obj.service_source
             service["status_cn"] = statuscn_cache.get(service["service_id"], "未知")
             status = status_cache.get(service["service_id"], "unknow")
 
@@ -216,9 +219,14 @@ class ServiceInfoRepository(BaseRepository[TeamComponentInfo]):
                                                 TeamComponentInfo.tenant_service_group_id.in_(service_group_ids)))
         ).scalars().all()
 
-    def get_no_group_service_status_by_group_id(self, session, team_name, team_id, region_name, enterprise_id):
+    def get_no_group_service_status_by_group_id(self, session, team_name, team_id, region_name, enterprise_id,
+                                                page=None, page_size=None):
+        offset = limit = None
+        if page and page_size:
+            limit = page_size
+            offset = (page - 1) * page_size
         no_services = base_service.get_no_group_services_list(session=session, team_id=team_id,
-                                                              region_name=region_name)
+                                                              region_name=region_name, offset=offset, limit=limit)
         if no_services:
             service_ids = [service.service_id for service in no_services]
             status_list = base_service.status_multi_service(session=session,
@@ -231,7 +239,7 @@ class ServiceInfoRepository(BaseRepository[TeamComponentInfo]):
                 statuscn_cache[status["service_id"]] = status["status_cn"]
             result = []
             for service in no_services:
-
+                service = dict(service)
                 if service["group_name"] is None:
                     service["group_name"] = "未分组"
                 service["status_cn"] = statuscn_cache.get(service["service_id"], "未知")
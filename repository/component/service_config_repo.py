@@ -8,8 +8,10 @@ from models.component.models import TeamComponentPort, ComponentExtendMethod, Te
     ThirdPartyComponentEndpoints, ComponentCreateStep, ComponentPaymentNotify, ComponentAttachInfo
 from models.relate.models import TeamComponentRelation
 from models.teams import GatewayCustomConfiguration
+from common.topology_cache import topology_cache
 from repository.application.config_group_repo import app_config_group_service_repo
 from repository.base import BaseRepository
+from repository.bulk import bulk_insert
 
 
 class TenantServicePortRepository(BaseRepository[TeamComponentPort]):
@@ -28,9 +30,7 @@ class TenantServicePortRepository(BaseRepository[TeamComponentPort]):
     def overwrite_by_component_ids(self, session, component_ids, ports):
         session.execute(delete(TeamComponentPort).where(
             TeamComponentPort.service_id.in_(component_ids)))
-        for port in ports:
-            session.merge(port)
-        session.flush()
+        bulk_insert(session, TeamComponentPort, ports)
 
     def list_by_k8s_service_names(self, session, tenant_id, k8s_service_names):
         return session.execute(select(TeamComponentPort).where(
@@ -278,7 +278,7 @@ class TenantServiceMntRelationRepository(BaseRepository[TeamComponentMountRelati
         session.execute(delete(TeamComponentMountRelation).where(
             TeamComponentMountRelation.service_id.in_(component_ids)
         ))
-        session.add_all(volume_deps)
+        bulk_insert(session, TeamComponentMountRelation, volume_deps)
 
     def list_mnt_relations_by_service_ids(self, session, tenant_id, service_ids):
         return session.execute(select(TeamComponentMountRelation).where(
@@ -366,9 +366,7 @@ class TenantServiceVolumnRepository(BaseRepository[TeamComponentVolume]):
     def overwrite_by_component_ids(self, session, component_ids, volumes):
         session.execute(delete(TeamComponentVolume).where(
             TeamComponentVolume.service_id.in_(component_ids)))
-        for volume in volumes:
-            session.merge(volume)
-        session.flush()
+        bulk_insert(session, TeamComponentVolume, volumes)
 
     def delete_service_volumes(self, session, service_id):
         session.execute(
@@ -475,7 +473,8 @@ class TenantServiceRelationRepository(BaseRepository[TeamComponentRelation]):
             session.execute(delete(TeamComponentRelation).where(
                 TeamComponentRelation.service_id.in_(component_ids)
             ))
-            session.add_all(component_deps)
+            bulk_insert(session, TeamComponentRelation, component_deps)
+        topology_cache.invalidate(session)
 
     def check_db_dep_by_eid(self, session, eid):
         """
@@ -528,6 +527,7 @@ class TenantServiceRelationRepository(BaseRepository[TeamComponentRelation]):
         session.execute(delete(TeamComponentRelation).where(
             TeamComponentRelation.service_id == service_id,
             TeamComponentRelation.tenant_id == tenant_id))
+        topology_cache.invalidate(session)
 
     def get_service_dependencies(self, session, tenant_id, service_id):
         return session.execute(select(TeamComponentRelation).where(
@@ -540,9 +540,11 @@ class TenantServiceRelationRepository(BaseRepository[TeamComponentRelation]):
             TeamComponentRelation.dep_service_id == dep_service_id))).scalars().all()
 
     def delete_dependency_by_dep_id(self, session, tenant_id, dep_service_id):
-        return session.execute(delete(TeamComponentRelation).where(
+        result = session.execute(delete(TeamComponentRelation).where(
             TeamComponentRelation.tenant_id == tenant_id,
             TeamComponentRelation.dep_service_id == dep_service_id))
+        topology_cache.invalidate(session)
+        return result
 
     def get_dependency_by_dep_service_ids(self, session, tenant_id, service_id, dep_service_ids):
         return (session.execute(select(TeamComponentRelation).where(
@@ -559,9 +561,11 @@ class TenantServiceRelationRepository(BaseRepository[TeamComponentRelation]):
     def add_service_dependency(self, session, **tenant_service_relation):
         tsr = TeamComponentRelation(**tenant_service_relation)
         session.add(tsr)
+        topology_cache.invalidate(session)
 
     def delete(self, session, dependency):
         session.delete(dependency)
+        topology_cache.invalidate(session)
 
 
 class GatewayCustom(BaseRepository[GatewayCustomConfiguration]):
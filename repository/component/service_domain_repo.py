@@ -1,9 +1,12 @@
 import datetime
+import json
 import os
 
-from sqlalchemy import select, delete, func, text
+from sqlalchemy import select, delete, func, insert, text
 
-from models.teams import ServiceDomain, ServiceDomainCertificate
+from core.utils.certutil import san_suffix, domain_suffixes, reverse_domain
+from models.teams import ServiceDomain, ServiceDomainCertificate, ServiceDomainCertificateMeta, \
+    ServiceDomainCertificateSan
 from repository.base import BaseRepository
 
 
@@ -90,16 +93,111 @@ class ServiceDomainRepository(BaseRepository[ServiceDomain]):
 
     def get_tenant_certificate_page(self, session, tenant_id, start, end):
         """提供指定位置和数量的数据"""
-        cert = (session.execute(select(ServiceDomainCertificate).where(
-            ServiceDomainCertificate.tenant_id == tenant_id))).scalars().all()
-        nums = len(cert)  # 证书数量
-        # if end > nums - 1:
-        #     end =nums - 1
-        # if start <= nums - 1:
-
-        part_cert = cert[start:end + 1]
+        nums = session.execute(select(func.count(ServiceDomainCertificate.ID)).where(
+            ServiceDomainCertificate.tenant_id == tenant_id)).scalar()
+        part_cert = session.execute(select(ServiceDomainCertificate).where(
+            ServiceDomainCertificate.tenant_id == tenant_id).order_by(ServiceDomainCertificate.ID).offset(
+            start).limit(end - start + 1)).scalars().all()
         return part_cert, nums
 
+    @staticmethod
+    def _certificate_meta_values(certificate_pk, tenant_id, data):
+        return {
+            "certificate_pk": certificate_pk,
+            "tenant_id": tenant_id,
+            "issued_to": json.dumps(data["issued_to"]),
+            "issued_by": data["issued_by"],
+            "end_data": data["end_data"],
+            "not_after": datetime.datetime.strptime(data["end_data"], '%Y-%m-%d %H:%M:%S')
+        }
+
+    @staticmethod
+    def _certificate_sans(certificate_pk, tenant_id, data):
+        return [
+            ServiceDomainCertificateSan(certificate_pk=certificate_pk, tenant_id=tenant_id, san=san,
+                                        reversed_suffix=reverse_domain(san_suffix(san)))
+            for san in set(data["issued_to"]) if san
+        ]
+
+    def save_certificate_meta(self, session, certificate_pk, tenant_id, data):
+        """
+        保存证书解析结果及域名后缀索引, 覆盖旧数据
+        :param data: analyze_cert 的返回值
+        """
+        self.delete_certificate_meta(session, certificate_pk)
+        meta = ServiceDomainCertificateMeta(**self._certificate_meta_values(certificate_pk, tenant_id, data))
+        session.add(meta)
+        session.add_all(self._certificate_sans(certificate_pk, tenant_id, data))
+        return meta
+
+    def backfill_certificate_meta(self, session, certificate_pk, tenant_id, data):
+        """
+        补齐历史证书的解析结果, 并发的首次读取可能同时补齐同一证书, 以 INSERT IGNORE 写入, 只有写入成功的一方写入域名后缀索引
+        :return: (未加入会话的解析结果, 是否由本次写入)
+        """
+        values = self._certificate_meta_values(certificate_pk, tenant_id, data)
+        result = session.execute(insert(ServiceDomainCertificateMeta).prefix_with("IGNORE").values(**values))
+        inserted = result.rowcount == 1
+        if inserted:
+            session.add_all(self._certificate_sans(certificate_pk, tenant_id, data))
+        return ServiceDomainCertificateMeta(**values), inserted
+
+    def delete_certificate_meta(self, session, certificate_pk):
+        session.execute(delete(ServiceDomainCertificateMeta).where(
+            ServiceDomainCertificateMeta.certificate_pk == certificate_pk))
+        session.execute(delete(ServiceDomainCertificateSan).where(
+            ServiceDomainCertificateSan.certificate_pk == certificate_pk))
+
+    def get_certificate_metas(self, session, certificate_pks):
+        """
+        :return: {certificate_pk: ServiceDomainCertificateMeta}
+        """
+        if not certificate_pks:
+            return {}
+        metas = session.execute(select(ServiceDomainCertificateMeta).where(
+            ServiceDomainCertificateMeta.certificate_pk.in_(certificate_pks))).scalars().all()
+        return {meta.certificate_pk: meta for meta in metas}
+
+    def certificate_matches_domain(self, session, certificate_pk, domain_name):
+        """
+        证书域名是否覆盖 domain_name, 按域名后缀索引查询
+        """
+        reversed_suffixes = [reverse_domain(suffix) for suffix in domain_suffixes(domain_name)]
+        if not reversed_suffixes:
+            return False
+        return session.execute(select(ServiceDomainCertificateSan.ID).where(
+            ServiceDomainCertificateSan.certificate_pk == certificate_pk,
+            ServiceDomainCertificateSan.reversed_suffix.in_(reversed_suffixes)).limit(1)).first() is not None
+
+    def list_certificates_by_domain(self, session, tenant_id, domain_name):
+        """
+        团队下覆盖 domain_name 的证书
+        """
+        reversed_suffixes = [reverse_domain(suffix) for suffix in domain_suffixes(domain_name)]
+        if not reversed_suffixes:
+            return []
+        return session.execute(select(ServiceDomainCertificate).where(
+            ServiceDomainCertificate.ID.in_(select(ServiceDomainCertificateSan.certificate_pk).where(
+                ServiceDomainCertificateSan.tenant_id == tenant_id,
+                ServiceDomainCertificateSan.reversed_suffix.in_(reversed_suffixes))))).scalars().all()
+
+    def list_tenant_certificates_without_meta(self, session, tenant_id):
+        return session.execute(select(ServiceDomainCertificate).where(
+            ServiceDomainCertificate.tenant_id == tenant_id,
+            ServiceDomainCertificate.ID.not_in(select(ServiceDomainCertificateMeta.certificate_pk)))).scalars().all()
+
+    def list_expiring_certificates(self, session, tenant_id, before):
+        """
+        过期时间早于 before 的证书, 按过期时间排序
+        :return: [(ServiceDomainCertificate, ServiceDomainCertificateMeta)]
+        """
+        return session.execute(select(ServiceDomainCertificate, ServiceDomainCertificateMeta).join(
+            ServiceDomainCertificateMeta,
+            ServiceDomainCertificateMeta.certificate_pk == ServiceDomainCertificate.ID).where(
+            ServiceDomainCertificateMeta.tenant_id == tenant_id,
+            ServiceDomainCertificateMeta.not_after < before).order_by(
+            ServiceDomainCertificateMeta.not_after)).all()
+
     def count_by_service_ids(self, session, region_id, service_ids):
         return (session.execute(
             select(func.count(ServiceDomain.ID)).where(ServiceDomain.region_id == region_id,
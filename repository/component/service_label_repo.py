@@ -3,6 +3,7 @@ from sqlalchemy import select, delete
 from models.region.label import NodeLabels, Labels
 from models.component.models import ComponentLabels
 from repository.base import BaseRepository
+from repository.bulk import bulk_insert
 
 
 class ServiceLabelsReporsitory(BaseRepository[ComponentLabels]):
@@ -10,9 +11,7 @@ class ServiceLabelsReporsitory(BaseRepository[ComponentLabels]):
     def overwrite_by_component_ids(self, session, component_ids, labels: [ComponentLabels]):
         session.execute(delete(ComponentLabels).where(
             ComponentLabels.service_id.in_(component_ids)))
-        for label in labels:
-            session.merge(label)
-        session.flush()
+        bulk_insert(session, ComponentLabels, labels)
 
     def delete_service_all_labels(self, session, service_id):
         session.execute(
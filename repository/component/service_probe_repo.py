@@ -2,6 +2,7 @@ from sqlalchemy import select, delete, update
 
 from models.component.models import ComponentProbe
 from repository.base import BaseRepository
+from repository.bulk import bulk_insert
 
 
 class ServiceProbeRepository(BaseRepository[ComponentProbe]):
@@ -9,9 +10,7 @@ class ServiceProbeRepository(BaseRepository[ComponentProbe]):
     def overwrite_by_component_ids(self, session, component_ids, probes):
         session.execute(delete(ComponentProbe).where(
             ComponentProbe.service_id.in_(component_ids)))
-        for probe in probes:
-            session.merge(probe)
-        session.flush()
+        bulk_insert(session, ComponentProbe, probes)
 
     def list_probes(self, session, service_id):
         return (session.execute(select(ComponentProbe).where(
@@ -7,6 +7,7 @@ from core.utils.crypt import make_uuid
 from models.application.plugin import TeamComponentPluginRelation, TeamServicePluginAttr, ComponentPluginConfigVar, \
     PluginConfigGroup, PluginConfigItems
 from repository.base import BaseRepository
+from repository.bulk import bulk_insert
 from repository.plugin.plugin_config_repo import config_group_repo, config_item_repo
 from repository.teams.team_plugin_repo import plugin_repo
 from service.plugin.plugin_version_service import plugin_version_service
@@ -18,9 +19,7 @@ class AppPluginRelationRepository(BaseRepository[TeamComponentPluginRelation]):
         session.execute(delete(TeamComponentPluginRelation).where(
             TeamComponentPluginRelation.service_id.in_(component_ids)
         ))
-        for plugin_dep in plugin_deps:
-            session.merge(plugin_dep)
-        session.flush()
+        bulk_insert(session, TeamComponentPluginRelation, plugin_deps)
 
     def list_by_component_ids(self, session, service_ids):
         rels = session.execute(select(TeamComponentPluginRelation).where(
@@ -127,9 +126,7 @@ class ServicePluginConfigVarRepository(BaseRepository[ComponentPluginConfigVar])
         session.execute(delete(ComponentPluginConfigVar).where(
             ComponentPluginConfigVar.service_id.in_(component_ids)
         ))
-        for plugin_config in plugin_configs:
-            session.merge(plugin_config)
-        session.flush()
+        bulk_insert(session, ComponentPluginConfigVar, plugin_configs)
 
     def list_by_component_ids(self, session, component_ids):
         configs = session.execute(select(ComponentPluginConfigVar).where(
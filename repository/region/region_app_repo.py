@@ -1,6 +1,7 @@
-from sqlalchemy import select
+from sqlalchemy import and_, select
 
 from database.session import SessionClass
+from models.application.models import Application
 from models.region.models import RegionApp
 from repository.base import BaseRepository
 
@@ -34,5 +35,26 @@ class RegionAppRepository(BaseRepository[RegionApp]):
                                     RegionApp.app_id.in_(app_ids)))).scalars().all()
         return region_apps
 
+    @staticmethod
+    def _unmapped_apps_sql(*columns):
+        return select(*columns).outerjoin(
+            RegionApp, and_(RegionApp.app_id == Application.ID,
+                            RegionApp.region_name == Application.region_name)).where(RegionApp.ID.is_(None))
+
+    def list_unmapped_apps(self, session: SessionClass, tenant_id, region_name):
+        """
+        团队在集群下尚未创建集群应用的应用
+        """
+        return session.execute(self._unmapped_apps_sql(Application).where(
+            Application.tenant_id == tenant_id,
+            Application.region_name == region_name)).scalars().all()
+
+    def list_unmapped_team_regions(self, session: SessionClass):
+        """
+        存在未创建集群应用的应用的 (tenant_id, region_name)
+        """
+        return session.execute(
+            self._unmapped_apps_sql(Application.tenant_id, Application.region_name).distinct()).all()
+
 
 region_app_repo = RegionAppRepository(RegionApp)
@@ -1,17 +1,59 @@
+import os
+
 from loguru import logger
-from sqlalchemy import select, Constraint, or_
+from sqlalchemy import select, Constraint, or_, event
+from sqlalchemy.orm import Session
 
+from core.utils.cache import TTLCache
 from database.session import SessionClass
 from models.teams import RegionConfig
 from repository.base import BaseRepository
 
 
+# 集群配置缓存, 集群在本进程修改时于事务提交后失效, 其他进程依赖 TTL 过期
+region_config_cache = TTLCache("region_config", maxsize=256, ttl=int(os.environ.get("REGION_CONFIG_CACHE_TTL", 30)))
+# session.info 中记录待失效的集群名, None 表示清空
+REGION_CONFIG_DIRTY_KEY = "region_config_dirty"
+
+
+def _detached_copy(region_config):
+    """
+    复制为不绑定 session 的对象, 避免缓存对象随请求 session 关闭而失效
+    """
+    return RegionConfig(**{column.name: getattr(region_config, column.name)
+                           for column in RegionConfig.__table__.columns})
+
+
 class RegionConfigRepository(BaseRepository[RegionConfig]):
     """
     RegionConfigRepository
 
     """
 
+    def get_cached_region_config_by_region_name(self, session: SessionClass, region_name):
+        """
+        带缓存的 get_region_config_by_region_name, 返回对象只读
+        :param session:
+        :param region_name:
+        :return:
+        """
+        if not region_name:
+            return None
+
+        def _load():
+            region_config = self.get_region_config_by_region_name(session, region_name)
+            return _detached_copy(region_config) if region_config else None
+
+        return region_config_cache.get_or_load(region_name, _load)
+
+    @staticmethod
+    def invalidate_region_config_cache(session, region_name=None):
+        """
+        标记会话中有集群配置变更, 事务提交后失效缓存, 不指定集群名时清空
+        提交前失效的话, 其他请求可能在提交前重新加载旧配置并缓存到 TTL 过期
+        """
+        session.info.setdefault(REGION_CONFIG_DIRTY_KEY, set()).add(region_name)
+
     def get_region_config_by_region_name(self, session: SessionClass, region_name):
         """
         get_region_config_by_region_name
@@ -49,3 +91,20 @@ class RegionConfigRepository(BaseRepository[RegionConfig]):
 
 
 region_config_repo = RegionConfigRepository(RegionConfig)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    region_names = session.info.pop(REGION_CONFIG_DIRTY_KEY, None)
+    if not region_names:
+        return
+    if None in region_names:
+        region_config_cache.clear()
+        return
+    for region_name in region_names:
+        region_config_cache.invalidate(region_name)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(REGION_CONFIG_DIRTY_KEY, None)
@@ -6,6 +6,7 @@ from exceptions.main import ServiceHandleException, RegionNotFound
 from models.region.models import TeamRegionInfo
 from models.teams import RegionConfig, TeamInfo
 from repository.base import BaseRepository
+from repository.region.region_config_repo import region_config_repo
 from repository.teams.team_repo import team_repo
 
 
@@ -16,11 +17,13 @@ class RegionRepo(BaseRepository[RegionConfig]):
             RegionConfig.enterprise_id == enterprise_id,
             RegionConfig.region_id == region_id
         ))
+        region_config_repo.invalidate_region_config_cache(session)
 
     def create_region(self, session, region_data):
         region_config = RegionConfig(**region_data)
         session.add(region_config)
         session.flush()
+        region_config_repo.invalidate_region_config_cache(session, region_config.region_name)
         return region_config
 
     def get_region_by_enterprise_id(self, session, enterprise_id):
@@ -48,6 +51,7 @@ class RegionRepo(BaseRepository[RegionConfig]):
         region.cert_file = data.get("cert_file")
         region.desc = data.get("desc")
         region.key_file = data.get("key_file")
+        region_config_repo.invalidate_region_config_cache(session, region.region_name)
         return region
 
     def get_region_by_id(self, session, eid, region_id):
@@ -96,6 +96,10 @@ class TeamRepository(BaseRepository[TeamInfo]):
         return session.execute(select(TeamInfo).where(
             TeamInfo.tenant_name.in_(team_names))).scalars().all()
 
+    def get_team_by_team_ids(self, session, team_ids):
+        return session.execute(select(TeamInfo).where(
+            TeamInfo.tenant_id.in_(team_ids))).scalars().all()
+
     def get_tenants_by_user_id(self, session, user_id, name=None):
         tenants = session.execute(select(PermRelTenant).where(
             PermRelTenant.user_id == user_id)).scalars().all()
@@ -1,6 +1,7 @@
 from loguru import logger
 from sqlalchemy import select, or_, delete
 
+from common.perms_cache import perms_cache
 from core.utils.perms import get_team_perms_model, get_enterprise_perms_model, get_perms_model, DEFAULT_TEAM_ROLE_PERMS, \
     DEFAULT_ENTERPRISE_ROLE_PERMS
 from exceptions.main import ServiceHandleException
@@ -94,6 +95,7 @@ class TeamRolesRepository(BaseRepository[RoleInfo]):
                                          RoleInfo.kind == kind,
                                          RoleInfo.ID == id)
         session.execute(sql)
+        perms_cache.invalidate(session)
 
     def get_role_by_id(self, session, kind, kind_id, id, with_default=False):
         if with_default:
@@ -1,5 +1,6 @@
 from sqlalchemy import select, delete
 
+from common.perms_cache import perms_cache
 from models.teams import RolePerms, PermsInfo
 from repository.base import BaseRepository
 
@@ -34,12 +35,14 @@ class RolePermsRepository(BaseRepository[RolePerms]):
                 role_perm_list.append({"role_id": role_id, "perm_code": perm_code})
             session.execute(RolePerms.__table__.insert(), role_perm_list)
             session.flush()
+            perms_cache.invalidate(session)
             return role_perm_list
         return []
 
     def delete_role_perm_relation(self, session, role_id):
         sql = delete(RolePerms).where(RolePerms.role_id == role_id)
         session.execute(sql)
+        perms_cache.invalidate(session)
 
     def get_role_perms(self, session, role_id):
         role_perms = self.get_role_perm_relation(session=session, role_id=role_id)
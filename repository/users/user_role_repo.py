@@ -1,5 +1,6 @@
 from sqlalchemy import select, delete
 
+from common.perms_cache import perms_cache
 from database.session import SessionClass
 from exceptions.exceptions import UserRoleNotFoundException
 from exceptions.main import ServiceHandleException
@@ -100,6 +101,7 @@ class UserRoleRepository(BaseRepository[UserRole]):
         for role_id in update_role_ids:
             user_role_list.append(UserRole(user_id=user.user_id, role_id=role_id))
         session.add_all(user_role_list)
+        perms_cache.invalidate(session)
 
     def delete_user_roles(self, session, kind, kind_id, user, role_ids=None):
         if not user:
@@ -119,6 +121,7 @@ class UserRoleRepository(BaseRepository[UserRole]):
                 sql = delete(UserRole).where(UserRole.role_id.in_(has_role_ids), UserRole.user_id == user.user_id)
             session.execute(sql)
             session.flush()
+            perms_cache.invalidate(session)
 
     def get_role_names(self, session: SessionClass, user_id, tenant_id):
         sql: str = """
@@ -153,6 +156,7 @@ class UserRoleRepository(BaseRepository[UserRole]):
                 session.execute(
                     delete(UserRole).where(UserRole.role_id == role_id)
                 )
+                perms_cache.invalidate(session)
 
 
 user_role_repo = UserRoleRepository(UserRole)
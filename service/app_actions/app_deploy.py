@@ -4,7 +4,6 @@ from copy import deepcopy
 from datetime import datetime
 from enum import IntEnum
 
-from addict import Dict
 from loguru import logger
 
 from clients.remote_build_client import remote_build_client
@@ -540,22 +539,39 @@ class MarketService(object):
         if envs is None:
             return
         logger.debug("service id: {}; sync envs; data: {}".format(self.service.service_id, envs))
-        add = envs.get("add", [])
-        for env in add:
+        bodies = []
+        for env in envs.get("add", []):
             body = self._create_env_body(env, scope)
-            if not body:
+            if body:
+                bodies.append(body)
+        if not bodies:
+            return
+        results = remote_component_client.batch_add_service_envs(session,
+                                                                 self.service.service_region, self.tenant.tenant_name,
+                                                                 self.service.service_alias,
+                                                                 bodies)
+        self._check_sync_results("envs", results, lambda e: getattr(e, "status", None) == 400)
+
+    def _check_sync_results(self, prop, results, ignorable=None):
+        """
+        汇总批量同步的逐条结果, 存在不可忽略的失败时抛出第一个错误, 由 pre_action 回滚
+        """
+        failed = []
+        for result in results:
+            if result.success:
                 continue
-            try:
-                remote_component_client.add_service_env(session,
-                                                        self.service.service_region, self.tenant.tenant_name,
-                                                        self.service.service_alias,
-                                                        body)
-            except remote_component_client.CallApiError as e:
-                if e.status == 400:
-                    logger.warning("env name: {}; failed to create env: {}".format(env["attr_name"], e))
-                    continue
-                res = Dict({"status": e.status})
-                raise remote_component_client.CallApiError(e.apitype, e.url, e.method, res, e.body)
+            if ignorable and ignorable(result.error):
+                logger.warning("service id: {}; {}: {}; ignore sync error: {}".format(
+                    self.service.service_id, prop, result.key, result.error))
+                continue
+            failed.append(result)
+        logger.info("service id: {}; sync {}; total: {}; failed: {}".format(
+            self.service.service_id, prop, len(results), len(failed)))
+        if failed:
+            logger.error("service id: {}; failed to sync {}: {}".format(
+                self.service.service_id, prop, json.dumps([result.to_dict() for result in failed])))
+            raise failed[0].error
+        return results
 
     def _restore_inner_envs(self, session, backup):
         self._restore_envs(session, backup, "inner")
@@ -750,17 +766,19 @@ class MarketService(object):
         """
         raise RegionApiBaseHttpClient.CallApiError
         """
+        bodies = []
         for volume in volumes.get("add"):
             volume["enterprise_id"] = self.tenant.enterprise_id
-            try:
-                remote_component_client.add_service_volumes(session,
-                                                            self.service.service_region, self.tenant.tenant_name,
-                                                            self.service.service_alias,
-                                                            volume)
-            except RegionApiBaseHttpClient.CallApiError as e:
-                if not e.body or "is exist" not in e.body.msg:
-                    logger.exception(e)
-                    raise e
+            bodies.append(volume)
+        if not bodies:
+            return
+        results = remote_component_client.batch_add_service_volumes(session,
+                                                                    self.service.service_region,
+                                                                    self.tenant.tenant_name,
+                                                                    self.service.service_alias,
+                                                                    bodies)
+        self._check_sync_results("volumes", results,
+                                 lambda e: bool(getattr(e, "body", None)) and "is exist" in (e.body.msg or ""))
 
     def _restore_volumes(self, session, backup):
         backup_data = json.loads(backup.backup_data)
@@ -857,24 +875,34 @@ class MarketService(object):
             create_dep_service(dep_service["service_id"])
 
     def _sync_dep_services(self, session, dep_services):
-        def sync_dep_service(dep_service_id):
-            """
-            raise RegionApiBaseHttpClient.CallApiError
-            """
-            dep_service = service_info_repo.get_service_by_service_id(session, dep_service_id)
-            body = dict()
-            body["dep_service_id"] = dep_service.service_id
-            body["tenant_id"] = self.tenant.tenant_id
-            body["dep_service_type"] = dep_service.service_type
-            body["enterprise_id"] = self.tenant.enterprise_id
-            remote_component_client.add_service_dependency(session,
-                                                           self.service.service_region, self.tenant.tenant_name,
-                                                           self.service.service_alias,
-                                                           body)
-
+        """
+        raise RegionApiBaseHttpClient.CallApiError
+        """
         add = dep_services.get("add", [])
-        for dep_service in add:
-            sync_dep_service(dep_service["service_id"])
+        if not add:
+            return
+        dep_service_ids = [dep_service["service_id"] for dep_service in add]
+        services = service_info_repo.get_services_by_service_ids(session, dep_service_ids)
+        service_map = {service.service_id: service for service in services}
+        bodies = []
+        for dep_service_id in dep_service_ids:
+            dep_service = service_map.get(dep_service_id)
+            if not dep_service:
+                logger.warning("dep service id: {}; failed to sync dep service: service not found".format(
+                    dep_service_id))
+                continue
+            bodies.append({
+                "dep_service_id": dep_service.service_id,
+                "tenant_id": self.tenant.tenant_id,
+                "dep_service_type": dep_service.service_type,
+                "enterprise_id": self.tenant.enterprise_id,
+            })
+        results = remote_component_client.batch_add_service_dependencies(session,
+                                                                         self.service.service_region,
+                                                                         self.tenant.tenant_name,
+                                                                         self.service.service_alias,
+                                                                         bodies)
+        self._check_sync_results("dep_services", results)
 
     def _restore_dep_services(self, session, backup):
         backup_data = json.loads(backup.backup_data)
@@ -918,16 +946,17 @@ class MarketService(object):
             create_dep_vol(dep_volume)
 
     def _sync_dep_volumes(self, session, dep_volumes):
-        def sync_dep_vol(dep_vol_info):
-            """
-            raise RegionApiBaseHttpClient.CallApiError
-            """
+        """
+        raise RegionApiBaseHttpClient.CallApiError
+        """
+        bodies = []
+        for dep_vol_info in dep_volumes.get("add", []):
             dep_vol = volume_repo.get_service_volume_by_name(session, dep_vol_info["service_id"],
                                                              dep_vol_info["mnt_name"])
             if dep_vol is None:
                 logger.warning("dep service id: {}; volume name: {}; fail to \
                     sync dep volume: dep volume not found".format(dep_vol_info["service_id"], dep_vol_info["mnt_name"]))
-                return
+                continue
             data = {
                 "depend_service_id": dep_vol.service_id,
                 "volume_name": dep_vol.volume_name,
@@ -938,14 +967,13 @@ class MarketService(object):
             if dep_vol.volume_type == "config-file":
                 config_file = volume_repo.get_service_config_file(session, dep_vol)
                 data["file_content"] = config_file.file_content
-            remote_component_client.add_service_dep_volumes(session,
-                                                            self.service.service_region, self.tenant.tenant_name,
-                                                            self.service.service_alias,
-                                                            data)
-
-        add = dep_volumes.get("add", [])
-        for dep_vol in add:
-            sync_dep_vol(dep_vol)
+            bodies.append(data)
+        results = remote_component_client.batch_add_service_dep_volumes(session,
+                                                                        self.service.service_region,
+                                                                        self.tenant.tenant_name,
+                                                                        self.service.service_alias,
+                                                                        bodies)
+        self._check_sync_results("dep_volumes", results)
 
     def _restore_dep_volumes(self, session, backup):
         backup_data = json.loads(backup.backup_data)
@@ -0,0 +1,161 @@
+"""
+组件日志流式推送(SSE)
+
+日志接口原先每次返回最近 N 行, 页面轮询时反复下载相同的日志。此处按连接增量推送:
+- 指定 pod_name 时转发集群的容器日志流(follow), 游标为行号
+- 未指定时按间隔拉取组件最近日志并只推送新增的行, 游标为最后几行内容的摘要
+- 事件 id 即游标, 断线重连时通过 Last-Event-ID 或 cursor 参数从上次位置继续
+- 按关键字在服务端过滤, 过滤不影响游标
+- 每个连接的缓冲区有上限, 客户端读取过慢时丢弃最旧的行并推送 dropped 事件
+"""
+import asyncio
+import hashlib
+import os
+import time
+
+from loguru import logger
+
+from clients.async_remote_component_client import async_remote_component_client
+from common.base_client_service import get_region_access_info, get_tenant_region_info
+from repository.region.region_config_repo import region_config_repo
+
+LOG_STREAM_POLL_INTERVAL = float(os.environ.get("LOG_STREAM_POLL_INTERVAL", 2))
+LOG_STREAM_BUFFER_LINES = int(os.environ.get("LOG_STREAM_BUFFER_LINES", 1000))
+LOG_STREAM_MAX_LINE_SIZE = int(os.environ.get("LOG_STREAM_MAX_LINE_SIZE", 16 * 1024))
+LOG_STREAM_MAX_DURATION = int(os.environ.get("LOG_STREAM_MAX_DURATION", 1800))
+LOG_STREAM_HEARTBEAT = 15
+# 轮询模式下用于定位上次位置的行数
+ANCHOR_LINES = 3
+
+_EOF = object()
+
+
+def _digest(lines):
+    return "{}:{}".format(len(lines), hashlib.sha1("\n".join(lines).encode("utf-8")).hexdigest()[:16])
+
+
+def _find_after_cursor(window, cursor):
+    """
+    返回 window 中位于游标之后的行, 找不到游标位置时返回 None
+    """
+    try:
+        k = int(cursor.split(":", 1)[0])
+    except ValueError:
+        return None
+    for i in range(len(window), k - 1, -1):
+        if _digest(window[i - k:i]) == cursor:
+            return window[i:]
+    return None
+
+
+class LogSource(object):
+    """
+    预先解析好的集群日志来源, 推送过程中不再访问数据库
+    """
+    __slots__ = ("region_config", "url", "token", "follow")
+
+    def __init__(self, region_config, url, token, follow):
+        self.region_config = region_config
+        self.url = url
+        self.token = token
+        self.follow = follow
+
+
+class AppLogStreamService(object):
+
+    def get_log_source(self, session, tenant, service, lines=100, pod_name=None, container_name=None):
+        region_name = service.service_region
+        region_config = region_config_repo.get_cached_region_config_by_region_name(session, region_name)
+        url, token = get_region_access_info(tenant.tenant_name, region_name, session)
+        if pod_name:
+            url += "/v2/tenants/{}/services/{}/log?podName={}&containerName={}&follow=true".format(
+                tenant.tenant_name, service.service_alias, pod_name, container_name)
+            return LogSource(region_config, url, token, True)
+        tenant_region = get_tenant_region_info(tenant.tenant_name, region_name, session)
+        url += "/v2/tenants/{0}/services/{1}/logs?rows={2}".format(tenant_region.region_tenant_name,
+                                                                   service.service_alias, lines)
+        return LogSource(region_config, url, token, False)
+
+    async def _follow(self, source, cursor):
+        skip = int(cursor) if cursor and cursor.isdigit() else 0
+        offset = 0
+        async for line in async_remote_component_client.stream_pod_log(source.region_config, source.url,
+                                                                       source.token):
+            offset += 1
+            if offset > skip:
+                yield str(offset), line
+
+    async def _poll(self, source, cursor):
+        anchor = None
+        while True:
+            window = await async_remote_component_client.fetch_service_logs(source.region_config, source.url,
+                                                                            source.token)
+            lines = None
+            if anchor is not None:
+                lines = _find_after_cursor(window, anchor)
+            elif cursor:
+                lines = _find_after_cursor(window, cursor)
+            if lines is None:
+                # 首次拉取, 或两次拉取间新增的日志超过窗口大小
+                lines = window
+            start = len(window) - len(lines)
+            for i, line in enumerate(lines, start + 1):
+                yield _digest(window[max(i - ANCHOR_LINES, 0):i]), line
+            if window:
+                anchor = _digest(window[-ANCHOR_LINES:])
+            await asyncio.sleep(LOG_STREAM_POLL_INTERVAL)
+
+    async def _produce(self, source, cursor, keyword, queue, state):
+        lines = self._follow(source, cursor) if source.follow else self._poll(source, cursor)
+        try:
+            async for event_id, line in lines:
+                if keyword and keyword not in line:
+                    continue
+                if len(line) > LOG_STREAM_MAX_LINE_SIZE:
+                    line = line[:LOG_STREAM_MAX_LINE_SIZE]
+                if queue.full():
+                    queue.get_nowait()
+                    state["dropped"] += 1
+                queue.put_nowait((event_id, line))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("log stream {} failed: {}", source.url, e)
+            state["error"] = getattr(e, "msg_show", None) or str(e)
+        finally:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(_EOF)
+
+    async def stream(self, source, cursor=None, keyword=None):
+        """
+        以 SSE 格式推送日志
+        :param cursor: 上次收到的事件 id
+        :param keyword: 只推送包含该关键字的行
+        """
+        queue = asyncio.Queue(maxsize=LOG_STREAM_BUFFER_LINES)
+        state = {"dropped": 0, "error": None}
+        producer = asyncio.ensure_future(self._produce(source, cursor, keyword, queue, state))
+        deadline = time.monotonic() + LOG_STREAM_MAX_DURATION
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    item = await asyncio.wait_for(queue.get(), LOG_STREAM_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if state["dropped"]:
+                    yield "event: dropped\ndata: {}\n\n".format(state["dropped"])
+                    state["dropped"] = 0
+                if item is _EOF:
+                    if state["error"]:
+                        yield "event: error\ndata: {}\n\n".format(state["error"])
+                    yield "event: end\ndata: \n\n"
+                    return
+                event_id, line = item
+                yield "id: {}\ndata: {}\n\n".format(event_id, line.replace("\r", "").replace("\n", "\ndata: "))
+        finally:
+            producer.cancel()
+
+
+log_stream_service = AppLogStreamService()
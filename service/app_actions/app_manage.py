@@ -9,6 +9,7 @@ from starlette.responses import JSONResponse
 from clients.remote_app_client import remote_app_client
 from clients.remote_build_client import remote_build_client
 from clients.remote_component_client import remote_component_client
+from common.component_status_cache import component_status_cache
 from core.enum.component_enum import ComponentType, is_state, is_singleton
 from core.utils import slug_util
 from core.utils.constants import AppConstants
@@ -141,6 +142,7 @@ class AppManageService(AppManageBase):
             body["enterprise_id"] = tenant.enterprise_id
             try:
                 remote_component_client.rollback(session, service.service_region, tenant.tenant_name, service.service_alias, body)
+                component_status_cache.invalidate(service.service_region, [service.service_id])
             except remote_component_client.CallApiError as e:
                 logger.exception(e)
                 return 507, "组件异常"
@@ -175,6 +177,7 @@ class AppManageService(AppManageBase):
                 remote_component_client.delete_service(session, service.service_region, tenant.tenant_name,
                                                        service.service_alias,
                                                        tenant.enterprise_id, data)
+                component_status_cache.invalidate(service.service_region, [service.service_id])
             except remote_component_client.CallApiError as e:
                 if (not ignore_cluster_result) and int(e.status) != 404:
                     logger.error("delete component form cluster failure {}".format(e.body))
@@ -462,6 +465,7 @@ class AppManageService(AppManageBase):
         # 获取数据中心信息
         try:
             _, body = remote_build_client.batch_operation_service(session, region_name, tenant.tenant_name, data)
+            component_status_cache.invalidate(region_name, service_ids)
             events = body["bean"]["batch_result"]
             return events
         except remote_build_client.CallApiError as e:
@@ -505,32 +509,89 @@ class AppManageService(AppManageBase):
                 upgrade_infos_list.append(service_dict)
         return 200, body
 
-    def get_build_envs(self, session: SessionClass, tenant_id, service_id):
-        envs = {}
-        build_envs = (
-            session.execute(
-                select(ComponentEnvVar).where(ComponentEnvVar.tenant_id == tenant_id,
-                                              ComponentEnvVar.service_id == service_id,
-                                              or_(ComponentEnvVar.scope == "build",
-                                                  ComponentEnvVar.attr_name.in_(
-                                                      ["COMPILE_ENV", "NO_CACHE", "DEBUG", "PROXY",
-                                                       "SBT_EXTRAS_OPTS"]),
-                                                  ComponentEnvVar.attr_name.like("BUILD_%"))
-                                              ))
-        ).scalars().all()
+    @staticmethod
+    def _build_env_filter():
+        return or_(ComponentEnvVar.scope == "build",
+                   ComponentEnvVar.attr_name.in_(["COMPILE_ENV", "NO_CACHE", "DEBUG", "PROXY", "SBT_EXTRAS_OPTS"]),
+                   ComponentEnvVar.attr_name.like("BUILD_%"))
 
+    @staticmethod
+    def _assemble_build_envs(build_envs, compile_env):
+        envs = {}
         for benv in build_envs:
             attr_name = benv.attr_name
             if attr_name.startswith("BUILD_"):
                 attr_name = attr_name.replace("BUILD_", "", 1)
             envs[attr_name] = benv.attr_value
-        compile_env = (session.execute(
-            select(TeamComponentEnv).where(TeamComponentEnv.service_id == service_id))).scalars().first()
-
         if compile_env:
             envs["PROC_ENV"] = compile_env.user_dependency
         return envs
 
+    def get_build_envs(self, session: SessionClass, tenant_id, service_id):
+        build_envs = (
+            session.execute(
+                select(ComponentEnvVar).where(ComponentEnvVar.tenant_id == tenant_id,
+                                              ComponentEnvVar.service_id == service_id,
+                                              self._build_env_filter()))
+        ).scalars().all()
+        compile_env = (session.execute(
+            select(TeamComponentEnv).where(TeamComponentEnv.service_id == service_id))).scalars().first()
+        return self._assemble_build_envs(build_envs, compile_env)
+
+    def get_build_envs_by_service_ids(self, session: SessionClass, tenant_id, service_ids):
+        """
+        批量获取构建环境变量
+        :return: {service_id: envs}
+        """
+        build_envs = (
+            session.execute(
+                select(ComponentEnvVar).where(ComponentEnvVar.tenant_id == tenant_id,
+                                              ComponentEnvVar.service_id.in_(service_ids),
+                                              self._build_env_filter()))
+        ).scalars().all()
+        compile_envs = (session.execute(
+            select(TeamComponentEnv).where(TeamComponentEnv.service_id.in_(service_ids)))).scalars().all()
+        envs_map = {}
+        for benv in build_envs:
+            envs_map.setdefault(benv.service_id, []).append(benv)
+        compile_env_map = {}
+        for compile_env in compile_envs:
+            compile_env_map.setdefault(compile_env.service_id, compile_env)
+        return {service_id: self._assemble_build_envs(envs_map.get(service_id, []), compile_env_map.get(service_id))
+                for service_id in service_ids}
+
+    def _prefetch_deploy_data(self, session: SessionClass, tenant, services, user):
+        """
+        批量预取构建所需数据, 每类数据一次查询
+        """
+        service_ids = [service.service_id for service in services]
+        build_envs = self.get_build_envs_by_service_ids(session, tenant.tenant_id, service_ids)
+        source_infos = (
+            session.execute(
+                select(ComponentSourceInfo).where(ComponentSourceInfo.service_id.in_(service_ids)))
+        ).scalars().all()
+        service_sources = {}
+        for source_info in source_infos:
+            service_sources.setdefault((source_info.team_id, source_info.service_id), source_info)
+
+        oauth_service_ids = list({service.oauth_service_id for service in services if service.oauth_service_id})
+        oauth_services = {}
+        oauth_users = {}
+        if oauth_service_ids:
+            oauth_services = {oauth_service.ID: oauth_service for oauth_service in (
+                session.execute(
+                    select(OAuthServices).where(OAuthServices.ID.in_(oauth_service_ids),
+                                                OAuthServices.enable == True,
+                                                OAuthServices.is_deleted == False))
+            ).scalars().all()}
+            for oauth_user in (
+                    session.execute(select(UserOAuthServices).where(
+                        UserOAuthServices.service_id.in_(oauth_service_ids),
+                        UserOAuthServices.user_id == user.user_id))
+            ).scalars().all():
+                oauth_users.setdefault(oauth_user.service_id, oauth_user)
+        return build_envs, service_sources, oauth_services, oauth_users
+
     def __get_service_kind(self, session: SessionClass, service):
         """获取组件种类，兼容老的逻辑"""
         if service.service_source:
@@ -563,21 +624,20 @@ class AppManageService(AppManageBase):
         deploy_infos_list = []
         body["build_infos"] = deploy_infos_list
         app_version_cache = {}
+        build_envs, service_sources, oauth_services, oauth_users = self._prefetch_deploy_data(
+            session=session, tenant=tenant, services=services, user=user)
+        # 同一个 oauth 服务只创建一次实例
+        oauth_instances = {}
         for service in services:
             service_dict = dict()
             service_dict["service_id"] = service.service_id
             service_dict["action"] = 'deploy'
             if service.build_upgrade:
                 service_dict["action"] = 'upgrade'
-            envs = self.get_build_envs(session=session, tenant_id=tenant.tenant_id, service_id=service.service_id)
-            service_dict["envs"] = envs
+            service_dict["envs"] = build_envs.get(service.service_id, {})
             kind = self.__get_service_kind(session=session, service=service)
             service_dict["kind"] = kind
-            service_source = (
-                session.execute(
-                    select(ComponentSourceInfo).where(ComponentSourceInfo.team_id == service.tenant_id,
-                                                      ComponentSourceInfo.service_id == service.service_id))
-            ).scalars().first()
+            service_source = service_sources.get((service.tenant_id, service.service_id))
 
             clone_url = service.git_url
 
@@ -591,26 +651,17 @@ class AppManageService(AppManageBase):
                 source_code["lang"] = service.language
                 source_code["cmd"] = service.cmd
                 if service.oauth_service_id:
-                    try:
-                        oauth_service = (
-                            session.execute(
-                                select(OAuthServices).where(OAuthServices.ID == service.oauth_service_id,
-                                                            OAuthServices.enable == True,
-                                                            OAuthServices.is_deleted == False))
-                        ).scalars().first()
-
-                        oauth_user = (
-                            session.execute(select(UserOAuthServices).where(
-                                UserOAuthServices.service_id == service.oauth_service_id,
-                                UserOAuthServices.user_id == user.user_id))
-                        ).scalars().first()
-                    except Exception as e:
-                        logger.debug(e)
-                        continue
-                    try:
-                        instance = get_oauth_instance(oauth_service.oauth_type, oauth_service, oauth_user)
-                    except Exception as e:
-                        logger.debug(e)
+                    if service.oauth_service_id not in oauth_instances:
+                        oauth_service = oauth_services.get(service.oauth_service_id)
+                        oauth_user = oauth_users.get(service.oauth_service_id)
+                        try:
+                            oauth_instances[service.oauth_service_id] = get_oauth_instance(
+                                oauth_service.oauth_type, oauth_service, oauth_user)
+                        except Exception as e:
+                            logger.debug(e)
+                            oauth_instances[service.oauth_service_id] = None
+                    instance = oauth_instances[service.oauth_service_id]
+                    if not instance:
                         continue
                     if not instance.is_git_oauth():
                         continue
@@ -898,6 +949,7 @@ class AppManageService(AppManageBase):
                 remote_component_client.restart_service(session,
                                                         service.service_region, tenant.tenant_name,
                                                         service.service_alias, body)
+                component_status_cache.invalidate(service.service_region, [service.service_id])
                 logger.debug("user {0} retart app !".format(user.nick_name))
             except remote_component_client.CallApiError as e:
                 logger.exception(e)
@@ -916,6 +968,7 @@ class AppManageService(AppManageBase):
                 remote_component_client.stop_service(session,
                                                      service.service_region, tenant.tenant_name,
                                                      service.service_alias, body)
+                component_status_cache.invalidate(service.service_region, [service.service_id])
                 logger.debug("user {0} stop app !".format(user.nick_name))
             except remote_component_client.CallApiError as e:
                 logger.exception(e)
@@ -934,6 +987,7 @@ class AppManageService(AppManageBase):
                 remote_component_client.start_service(session,
                                                       service.service_region, tenant.tenant_name,
                                                       service.service_alias, body)
+                component_status_cache.invalidate(service.service_region, [service.service_id])
                 logger.debug("user {0} start app !".format(user.nick_name))
             except remote_component_client.CallApiError as e:
                 logger.exception(e)
@@ -956,6 +1010,7 @@ class AppManageService(AppManageBase):
             body = remote_component_client.upgrade_service(session,
                                                            service.service_region, tenant.tenant_name,
                                                            service.service_alias, body)
+            component_status_cache.invalidate(service.service_region, [service.service_id])
             event_id = body["bean"].get("event_id", "")
             return 200, "操作成功", event_id
         except remote_component_client.CallApiError as e:
@@ -1230,6 +1285,7 @@ class AppManageService(AppManageBase):
             re = remote_component_client.build_service(session,
                                                        service.service_region, tenant.tenant_name,
                                                        service.service_alias, body)
+            component_status_cache.invalidate(service.service_region, [service.service_id])
             if re and re.get("bean") and re.get("bean").get("status") != "success":
                 logger.error("deploy component failure {}".format(re))
                 return 507, "构建异常", ""
@@ -1253,6 +1309,7 @@ class AppManageService(AppManageBase):
             remote_component_client.delete_service(session, service.service_region, tenant.tenant_name,
                                                    service.service_alias, tenant.enterprise_id,
                                                    data)
+            component_status_cache.invalidate(service.service_region, [service.service_id])
             return 200, "success"
         except remote_component_client.CallApiError as e:
             if e.status != 404:
@@ -1659,6 +1716,7 @@ class AppManageService(AppManageBase):
                 remote_component_client.vertical_upgrade(session,
                                                          service.service_region, tenant.tenant_name,
                                                          service.service_alias, body)
+                component_status_cache.invalidate(service.service_region, [service.service_id])
                 service.min_cpu = new_cpu
                 service.min_memory = new_memory
                 service.gpu_type = new_gpu_type
@@ -1692,6 +1750,7 @@ class AppManageService(AppManageBase):
                 remote_component_client.horizontal_upgrade(session,
                                                            service.service_region, tenant.tenant_name,
                                                            service.service_alias, body)
+                component_status_cache.invalidate(service.service_region, [service.service_id])
                 service.min_node = new_node
                 # service.save()
             except ServiceHandleException as e:
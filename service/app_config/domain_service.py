@@ -8,7 +8,7 @@ from loguru import logger
 
 from clients.remote_build_client import remote_build_client
 from clients.remote_domain_client import remote_domain_client_api
-from core.utils.certutil import analyze_cert, cert_is_effective
+from core.utils.certutil import analyze_cert, cert_is_effective, domain_suffixes, san_suffix
 from core.utils.crypt import make_uuid
 from database.session import SessionClass
 from exceptions.main import ServiceHandleException, AbortRequest
@@ -36,6 +36,7 @@ class DomainService(object):
             raise ServiceHandleException("the certificate still has http rules", "仍有网关策略在使用该证书", 400, 400)
 
         domain_repo.delete_certificate_by_pk(session, pk)
+        domain_repo.delete_certificate_meta(session, cert.ID)
 
     def update_certificate(self, session, tenant, certificate_id, alias, certificate, private_key, certificate_type):
         cert_is_effective(certificate, private_key)
@@ -47,6 +48,7 @@ class DomainService(object):
             cert.alias = alias
         if certificate:
             cert.certificate = base64.b64encode(bytes(certificate, 'utf-8'))
+            self.__save_certificate_meta(session, cert, certificate)
         if certificate_type:
             cert.certificate_type = certificate_type
         if private_key:
@@ -90,12 +92,67 @@ class DomainService(object):
     def add_certificate(self, session, tenant, alias, certificate_id, certificate, private_key, certificate_type):
         self.__check_certificate_alias(session, tenant, alias)
         cert_is_effective(certificate, private_key)
+        content = certificate
         certificate = base64.b64encode(bytes(certificate, 'utf-8'))
         certificate = domain_repo.add_certificate(session, tenant.tenant_id, alias, certificate_id, certificate,
                                                   private_key,
                                                   certificate_type)
+        session.flush()
+        self.__save_certificate_meta(session, certificate, content)
         return certificate
 
+    def __save_certificate_meta(self, session, cert, content=None):
+        """
+        解析证书并保存解析结果, 列表与域名校验直接读取, 不再重复解析
+        """
+        if content is None:
+            content = base64.b64decode(cert.certificate).decode()
+        data = analyze_cert(content)
+        return domain_repo.save_certificate_meta(session, cert.ID, cert.tenant_id, data)
+
+    @staticmethod
+    def __backfill_certificate_meta(session, cert):
+        """
+        补齐历史证书的解析结果, 与并发的补齐互不冲突
+        :return: (解析结果, 解析出的证书域名, 是否由本次写入)
+        """
+        data = analyze_cert(base64.b64decode(cert.certificate).decode())
+        meta, inserted = domain_repo.backfill_certificate_meta(session, cert.ID, cert.tenant_id, data)
+        return meta, data["issued_to"], inserted
+
+    def __ensure_certificate_metas(self, session, tenant_id):
+        """
+        补齐历史证书的解析结果
+        """
+        for cert in domain_repo.list_tenant_certificates_without_meta(session, tenant_id):
+            try:
+                self.__backfill_certificate_meta(session, cert)
+            except Exception as e:
+                logger.warning("analyze certificate {} failed: {}", cert.ID, e)
+        session.flush()
+
+    @staticmethod
+    def __certificate_data(cert, meta):
+        data = dict()
+        data["alias"] = cert.alias
+        data["certificate_type"] = cert.certificate_type
+        data["id"] = cert.ID
+        if meta:
+            data["issued_to"] = json.loads(meta.issued_to)
+            data["has_expired"] = meta.not_after is not None and meta.not_after <= datetime.datetime.now()
+            data["issued_by"] = meta.issued_by
+            data["end_data"] = meta.end_data
+        return data
+
+    def get_expiring_certificates(self, session, tenant, days):
+        """
+        团队下 days 天内过期(含已过期)的证书
+        """
+        self.__ensure_certificate_metas(session, tenant.tenant_id)
+        before = datetime.datetime.now() + datetime.timedelta(days=days)
+        return [self.__certificate_data(cert, meta)
+                for cert, meta in domain_repo.list_expiring_certificates(session, tenant.tenant_id, before)]
+
     def get_time_now(self):
         return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
@@ -118,16 +175,17 @@ class DomainService(object):
                 status_code=400, error_code=400, msg="domain more than 256 bytes", msg_show="域名超过256个字符")
         if certificate_id:
             certificate_info = domain_repo.get_certificate_by_pk(session, int(certificate_id))
-            cert = base64.b64decode(certificate_info.certificate).decode()
-            data = analyze_cert(cert)
-            sans = data["issued_to"]
-            for certificat_domain_name in sans:
-                if certificat_domain_name.startswith('*'):
-                    domain_suffix = certificat_domain_name[2:]
-                else:
-                    domain_suffix = certificat_domain_name
-                if domain_name.endswith(domain_suffix):
-                    return
+            if not domain_repo.get_certificate_metas(session, [certificate_info.ID]):
+                _, sans, inserted = self.__backfill_certificate_meta(session, certificate_info)
+                session.flush()
+                if not inserted:
+                    # 由并发请求补齐, 其写入的域名后缀索引对当前事务不可见, 按解析结果判断
+                    if set(san_suffix(san) for san in sans if san) & set(domain_suffixes(domain_name)):
+                        return
+                    raise ServiceHandleException(status_code=400, error_code=400, msg="domain",
+                                                 msg_show="域名与选择的证书不匹配")
+            if domain_repo.certificate_matches_domain(session, certificate_info.ID, domain_name):
+                return
             raise ServiceHandleException(status_code=400, error_code=400, msg="domain", msg_show="域名与选择的证书不匹配")
 
     def update_tcpdomain(self, session: SessionClass, tenant, user, service, end_point, container_port, tcp_rule_id,
@@ -185,15 +243,13 @@ class DomainService(object):
         end = page_size * page - 1  # 一页数据的开始索引
         start = end - page_size + 1  # 一页数据的结束索引
         certificate, nums = domain_repo.get_tenant_certificate_page(session, tenant.tenant_id, start, end)
+        metas = domain_repo.get_certificate_metas(session, [c.ID for c in certificate])
         c_list = []
         for c in certificate:
-            cert = base64.b64decode(c.certificate)
-            data = dict()
-            data["alias"] = c.alias
-            data["certificate_type"] = c.certificate_type
-            data["id"] = c.ID
-            data.update(analyze_cert(cert))
-            c_list.append(data)
+            meta = metas.get(c.ID)
+            if not meta:
+                meta, _, _ = self.__backfill_certificate_meta(session, c)
+            c_list.append(self.__certificate_data(c, meta))
         return c_list, nums
 
     def get_port_bind_domains(self, session: SessionClass, service, container_port):
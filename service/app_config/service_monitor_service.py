@@ -6,6 +6,7 @@ from database.session import SessionClass
 from exceptions.bcode import ErrServiceMonitorExists, ErrRepeatMonitoringTarget
 from exceptions.main import ServiceHandleException
 from models.component.models import ComponentMonitor
+from repository.bulk import bulk_insert
 from repository.component.service_config_repo import port_repo
 from service.app_config.port_service import port_service
 
@@ -15,9 +16,7 @@ class ComponentServiceMonitor(object):
     def overwrite_by_component_ids(self, session, component_ids, monitors):
         session.execute(delete(ComponentMonitor).where(
             ComponentMonitor.service_id.in_(component_ids)))
-        for monitor in monitors:
-            session.merge(monitor)
-        session.flush()
+        bulk_insert(session, ComponentMonitor, monitors)
 
     def delete_by_service_id(self, session, service_id):
         session.execute(
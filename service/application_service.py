@@ -54,6 +54,7 @@ from service.app_config.service_monitor_service import service_monitor_service
 from service.base_services import base_service, baseService
 from service.label_service import label_service
 from service.probe_service import probe_service
+from service.region_app_reconciler import region_app_reconciler
 
 
 class ApplicationService(object):
@@ -388,6 +389,7 @@ class ApplicationService(object):
         )
         application_repo.create(session=session, model=app)
         self.create_region_app(session=session, tenant=tenant, region_name=region_name, app=app, eid=eid)
+        region_app_reconciler.mark_pending(session, tenant.tenant_id, region_name)
 
         res = jsonable_encoder(app)
         # compatible with the old version
@@ -4,7 +4,7 @@ from re import split as re_split
 from loguru import logger
 
 from clients.remote_build_client import remote_build_client
-from clients.remote_component_client import remote_component_client
+from common.component_status_cache import component_status_cache
 from core.git.github_http import GitHubApi
 from core.git.gitlab_http import GitlabApi
 from core.git.regionapi import RegionInvokeApi
@@ -28,13 +28,15 @@ region_api = RegionInvokeApi()
 
 class BaseService:
 
-    def get_group_services_list(self, session: SessionClass, team_id, region_name, group_id, query=""):
+    def get_group_services_list(self, session: SessionClass, team_id, region_name, group_id, query="",
+                                offset=None, limit=None):
         parms = {
             "team_id": team_id,
             "region_name": region_name,
             "group_id": group_id,
             "service_cname": query
         }
+        where_sql = self._group_services_where(query)
         query_sql = '''
             SELECT
                 t.service_id,
@@ -43,6 +45,7 @@ class BaseService:
                 t.create_status,
                 t.service_cname,
                 t.service_type,
+                t.service_source,
                 t.deploy_version,
                 t.version,
                 t.update_time,
@@ -52,16 +55,45 @@ class BaseService:
                 tenant_service t
                 LEFT JOIN service_group_relation r ON t.service_id = r.service_id
                 LEFT JOIN service_group g ON r.group_id = g.ID
+            {where_sql}
+            ORDER BY
+                t.update_time DESC, t.ID DESC
+        '''.format(where_sql=where_sql)
+        if limit is not None:
+            query_sql += " LIMIT :limit OFFSET :offset"
+            parms["limit"] = int(limit)
+            parms["offset"] = int(offset or 0)
+        services = session.execute(query_sql, parms).fetchall()
+        return services
+
+    def count_group_services(self, session: SessionClass, team_id, region_name, group_id, query=""):
+        parms = {
+            "team_id": team_id,
+            "region_name": region_name,
+            "group_id": group_id,
+            "service_cname": query
+        }
+        query_sql = '''
+            SELECT
+                count(1)
+            FROM
+                tenant_service t
+                JOIN service_group_relation r ON t.service_id = r.service_id
+            {where_sql}
+        '''.format(where_sql=self._group_services_where(query))
+        return session.execute(query_sql, parms).scalar()
+
+    @staticmethod
+    def _group_services_where(query):
+        where_sql = '''
             WHERE
                 t.tenant_id = :team_id
                 AND t.service_region = :region_name
                 AND r.group_id = :group_id
-                AND t.service_cname like '%' :service_cname '%'
-            ORDER BY
-                t.update_time DESC;
         '''
-        services = session.execute(query_sql, parms).fetchall()
-        return services
+        if query:
+            where_sql += " AND t.service_cname like '%' :service_cname '%'"
+        return where_sql
 
     def get_fuzzy_services_list(self, session: SessionClass, team_id, region_name, query_key, fields, order):
         if fields != "update_time" and fields != "ID":
@@ -97,15 +129,19 @@ class BaseService:
         session.remove()
         return services
 
-    def status_multi_service(self, session: SessionClass, region, tenant_name, service_ids, enterprise_id):
+    def status_multi_service(self, session: SessionClass, region, tenant_name, service_ids, enterprise_id,
+                             use_cache=True):
         try:
-            body = remote_component_client.service_status(session, region, tenant_name, {"service_ids": service_ids,
-                                                                                         "enterprise_id": enterprise_id})
-            return body["list"]
+            return component_status_cache.get_statuses(session, region, tenant_name, service_ids, enterprise_id,
+                                                       use_cache=use_cache)
         except Exception as e:
             return []
 
-    def get_no_group_services_list(self, session: SessionClass, team_id, region_name):
+    def get_no_group_services_list(self, session: SessionClass, team_id, region_name, offset=None, limit=None):
+        parms = {
+            "team_id": team_id,
+            "region_name": region_name
+        }
         query_sql = '''
             SELECT
                 t.service_id,
@@ -123,16 +159,33 @@ class BaseService:
                 LEFT JOIN service_group_relation r ON t.service_id = r.service_id
                 LEFT JOIN service_group g ON r.group_id = g.ID
             WHERE
-                t.tenant_id = "{team_id}"
-                AND t.service_region = "{region_name}"
+                t.tenant_id = :team_id
+                AND t.service_region = :region_name
                 AND r.group_id IS NULL
             ORDER BY
-                t.update_time DESC;
-        '''.format(
-            team_id=team_id, region_name=region_name)
-        services = (session.execute(query_sql)).fetchall()
+                t.update_time DESC, t.ID DESC
+        '''
+        if limit is not None:
+            query_sql += " LIMIT :limit OFFSET :offset"
+            parms["limit"] = int(limit)
+            parms["offset"] = int(offset or 0)
+        services = (session.execute(query_sql, parms)).fetchall()
         return services
 
+    def count_no_group_services(self, session: SessionClass, team_id, region_name):
+        query_sql = '''
+            SELECT
+                count(1)
+            FROM
+                tenant_service t
+                LEFT JOIN service_group_relation r ON t.service_id = r.service_id
+            WHERE
+                t.tenant_id = :team_id
+                AND t.service_region = :region_name
+                AND r.group_id IS NULL
+        '''
+        return session.execute(query_sql, {"team_id": team_id, "region_name": region_name}).scalar()
+
     def get_build_infos(self, session: SessionClass, tenant, service_ids):
         apps = dict()
         markets = dict()
@@ -0,0 +1,407 @@
+"""
+湖南高速大屏指标
+
+大屏各指标原先在每次刷新时对所有集群和数据库重新统计, 负载随观看的屏幕数增长。
+此处由后台任务按固定间隔将各企业的指标快照写入 redis, 接口直接读取快照:
+- 接口被访问时登记企业, 后台任务只统计最近有访问的企业
+- 多个 worker 通过 redis 锁保证同一周期内只有一个 worker 执行统计, 且统计过程不会与其他 worker 重叠
+- 只登记数据库中存在的企业
+- 数据库与 redis 的同步调用在线程池中执行, 不阻塞事件循环
+- 快照缺失(首次访问或任务未运行)时同步统计并写入快照
+"""
+import datetime
+import json
+import os
+import time
+
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+
+from clients.remote_expressway_client import hunan_expressway_client
+from common.component_status_cache import component_status_cache
+from common.region_fanout import fan_out, region_errors
+from core.utils.cache import TTLCache
+from core.utils.metrics import metrics
+from database.redis_session import redis_client
+from database.session import SessionClass
+from exceptions.main import ServiceHandleException
+from repository.application.application_repo import application_repo
+from repository.component.group_service_repo import service_info_repo
+from repository.enterprise.enterprise_repo import enterprise_repo
+from repository.region.region_info_repo import region_repo
+from service.expressway.hunan_expressway_service import hunan_expressway_service
+from service.team_service import team_services
+
+DASHBOARD_AGGREGATE_INTERVAL = int(os.environ.get("DASHBOARD_AGGREGATE_INTERVAL", 30))
+# 超过该时长未被访问的企业不再统计
+DASHBOARD_VIEWER_TTL = int(os.environ.get("DASHBOARD_VIEWER_TTL", 3600))
+# 统计过程的锁超时时间, 每统计完一个企业续期一次
+DASHBOARD_AGGREGATE_LOCK_TTL = int(os.environ.get("DASHBOARD_AGGREGATE_LOCK_TTL", 300))
+
+# 已确认存在的企业
+_known_enterprises = TTLCache("dashboard_enterprise", maxsize=1000, ttl=300)
+
+
+def _get_region_cluster(enterprise_id):
+    def _func(session, region_name):
+        res, body = hunan_expressway_client.get_region_cluster(session, region_name, enterprise_id)
+        if res["status"] != 200:
+            raise ServiceHandleException(msg="get region cluster failed", msg_show="获取集群节点信息失败")
+        return body["bean"]
+
+    return _func
+
+
+def _overview_region_app(enterprise_id):
+    def _func(session, region_name):
+        app_total_num = len(hunan_expressway_service.get_all_app(session, region_name))
+        data = component_status_cache.get_all_services_status(session, enterprise_id, region_name, test=True)
+        if not data:
+            return None
+        service_abnormal_ids = data["abnormal_services"]
+        service_close_ids = data["unrunning_services"]
+        groups_rel_list = hunan_expressway_service.get_groups_by_service_id(session, service_abnormal_ids)
+        app_abnormal_num = len(set([group_rel.group_id for group_rel in groups_rel_list]))
+        groups_rel_list = hunan_expressway_service.get_groups_by_service_id(session, service_close_ids)
+        app_unrunning_num = len(set([group_rel.group_id for group_rel in groups_rel_list]))
+        return {
+            "service_running": len(data["running_services"]),
+            "service_unrunning": len(data["unrunning_services"]),
+            "service_abnormal": len(data["abnormal_services"]),
+            "app_total": app_total_num,
+            "app_unrunning": app_unrunning_num,
+            "app_abnormal": app_abnormal_num,
+        }
+
+    return _func
+
+
+class HunanDashboardService(object):
+    """
+    HunanDashboardService
+    """
+    KINDS = ("cluster", "overview_app", "overview_tenant", "region_event")
+    VIEWERS_KEY = "dashboard:enterprises"
+    # 周期锁: 同一周期只统计一次; 运行锁: 统计过程中持有, 防止慢的统计与下一次重叠
+    LOCK_KEY = "dashboard:aggregate:lock"
+    RUNNING_KEY = "dashboard:aggregate:running"
+
+    @staticmethod
+    def _snapshot_key(enterprise_id, kind):
+        return "dashboard:{0}:{1}".format(enterprise_id, kind)
+
+    def _build(self, kind):
+        return getattr(self, "build_{}".format(kind))
+
+    async def build_cluster(self, session, enterprise_id):
+        node_info = []
+        store = {
+            "total_cpu": 0,
+            "used_cpu": 0,
+            "total_memory": 0,
+            "used_memory": 0,
+            "total_disk": 0,
+            "used_disk": 0
+        }
+        pod = {
+            "total": 0,
+            "used_pod": 0,
+            "free_pod": 0
+        }
+        usable_regions = await run_in_threadpool(region_repo.get_usable_regions_by_enterprise_id, session=session,
+                                                 enterprise_id=enterprise_id)
+        results = await fan_out([r.region_name for r in usable_regions], _get_region_cluster(enterprise_id))
+        for result in results:
+            if not result.success:
+                continue
+            result_bean = result.data
+            for node in result_bean['node_resources']:
+                node_info.append({
+                    "name": node["node_name"],
+                    "total_cpu": node["capacity_cpu"],
+                    "used_cpu": node["used_cpu"],
+                    "total_memory": node["capacity_mem"],
+                    "used_memory": node["used_mem"],
+                    "total_pod": node["capacity_pod"],
+                    "used_pod": node["used_pod"]
+                })
+
+            store["total_cpu"] += result_bean["cap_cpu"]
+            store["used_cpu"] += result_bean["req_cpu"]
+            store["total_memory"] += result_bean["cap_mem"]
+            store["used_memory"] += result_bean["req_mem"]
+            store["total_disk"] += result_bean["total_capacity_storage"]
+            store["used_disk"] += result_bean["total_used_storage"]
+
+            total_pod = result_bean['total_capacity_pods'] + result_bean['total_used_pods']
+            pod["total"] += total_pod
+            pod["used_pod"] += result_bean['total_used_pods']
+            pod["free_pod"] += result_bean['total_capacity_pods']
+
+        store["used_disk"] = round(store["used_disk"], 2)
+        store["total_memory"] = round(store["total_memory"], 2)
+        store["total_disk"] = round(store["total_disk"], 2)
+        info = {
+            "store": store,
+            "pod": pod,
+            "node": {
+                "total": len(node_info),
+                "info": node_info
+            }
+        }
+
+        return info, region_errors(results)
+
+    async def build_overview_app(self, session, enterprise_id):
+        service_info = {
+            "total": 0,
+            "running": 0,
+            "unrunning": 0,
+            "abnormal": 0
+        }
+        group_info = {
+            "total": 0,
+            "running": 0,
+            "unrunning": 0,
+            "abnormal": 0
+        }
+        usable_regions = await run_in_threadpool(region_repo.get_usable_regions_by_enterprise_id, session=session,
+                                                 enterprise_id=enterprise_id)
+        results = await fan_out([r.region_name for r in usable_regions], _overview_region_app(enterprise_id))
+        for result in results:
+            data = result.data
+            if not data:
+                continue
+            service_total_num = data["service_running"] + data["service_unrunning"] + data["service_abnormal"]
+            service_info["total"] += service_total_num
+            service_info["running"] += data["service_running"]
+            service_info["unrunning"] += data["service_unrunning"]
+            service_info["abnormal"] += data["service_abnormal"]
+            app_running_num = data["app_total"] - data["app_abnormal"] - data["app_unrunning"]
+            group_info["total"] += data["app_total"]
+            group_info["running"] += app_running_num
+            group_info["unrunning"] += data["app_unrunning"]
+            group_info["abnormal"] += data["app_abnormal"]
+
+        info = {
+            "group_info": group_info,
+            "service_info": service_info
+        }
+
+        return info, region_errors(results)
+
+    async def build_overview_tenant(self, session, enterprise_id):
+        tenant_pods_info = {}
+        tenant_info = []
+        usable_regions = await run_in_threadpool(region_repo.get_usable_regions_by_enterprise_id, session=session,
+                                                 enterprise_id=enterprise_id)
+        results = await fan_out([r.region_name for r in usable_regions], _get_region_cluster(enterprise_id))
+        for result in results:
+            if not result.success:
+                continue
+            tenant_pods = result.data["tenant_pods"] or {}
+            tenant_pods_info.update(sorted(tenant_pods.items(), key=lambda x: x[1])[-4:])
+
+        tenant_pods_info = sorted(tenant_pods_info.items(), key=lambda x: x[1])[-4:]
+
+        def _tenant_info():
+            for tenant_tuple in tenant_pods_info:
+                pods_num = tenant_tuple[1]
+                tenant = team_services.get_team_by_team_id(session, tenant_tuple[0])
+
+                team_service_num = service_info_repo.get_hn_team_service_num_by_team_id(
+                    session=session, team_id=tenant.tenant_id)
+                groups = application_repo.get_hn_tenant_region_groups(session, tenant.tenant_id)
+
+                tenant_info.append({
+                    "tenant_name": tenant.tenant_alias,
+                    "apps": len(groups),
+                    "services": team_service_num,
+                    "pods": pods_num
+                })
+
+        await run_in_threadpool(_tenant_info)
+        return tenant_info, region_errors(results)
+
+    async def build_region_event(self, session, enterprise_id):
+        events = []
+
+        def _get_cluster_and_events(region_session, region_name):
+            cluster = _get_region_cluster(enterprise_id)(region_session, region_name)
+            res, body = hunan_expressway_client.get_region_event(region_session, region_name, enterprise_id)
+            if res["status"] != 200:
+                raise ServiceHandleException(msg="get region event failed", msg_show="获取集群事件失败")
+            return cluster, body["list"]
+
+        usable_regions = await run_in_threadpool(region_repo.get_usable_regions_by_enterprise_id, session=session,
+                                                 enterprise_id=enterprise_id)
+        results = await fan_out([r.region_name for r in usable_regions], _get_cluster_and_events)
+        for region_result in results:
+            if not region_result.success:
+                continue
+            result_bean, event_list = region_result.data
+
+            now = datetime.datetime.now()
+            now_time = now.strftime("%Y-%m-%d %H:%M:%S")
+            for event in event_list:
+                events.append({
+                    "time": now_time,
+                    "name": "集群事件",
+                    "mesc": event["message"],
+                    "level": "警告",
+                })
+
+            for node in result_bean['node_resources']:
+                name = node["node_name"]
+                total_cpu = node["capacity_cpu"]
+                used_cpu = node["used_cpu"]
+                total_memory = node["capacity_mem"]
+                used_memory = node["used_mem"]
+                total_pod = node["capacity_pod"]
+                used_pod = node["used_pod"]
+                total_storage = node["capacity_storage"]
+                used_storage = node["used_storage"]
+                cpu_percent = used_cpu / total_cpu
+                memory_percent = used_memory / total_memory
+                pod_percent = used_pod / total_pod
+                storage_percent = used_storage / total_storage if total_storage != 0 else 0
+                if cpu_percent >= 0.80:
+                    if cpu_percent >= 1.20:
+                        events.append({
+                            "time": now_time,
+                            "name": "节点CPU",
+                            "mesc": name + "节点CPU过高",
+                            "level": "紧急",
+                        })
+                    else:
+                        events.append({
+                            "time": now_time,
+                            "name": "节点CPU",
+                            "mesc": name + "节点CPU略高",
+                            "level": "一般",
+                        })
+                if memory_percent >= 0.80:
+                    if cpu_percent >= 0.95:
+                        events.append({
+                            "time": now_time,
+                            "name": "节点内存",
+                            "mesc": name + "节点内存严重不足",
+                            "level": "紧急",
+                        })
+                    else:
+                        events.append({
+                            "time": now_time,
+                            "name": "节点内存",
+                            "mesc": name + "节点内存不足",
+                            "level": "一般",
+                        })
+                if pod_percent >= 0.90:
+                    events.append({
+                        "time": now_time,
+                        "name": "节点POD",
+                        "mesc": name + "节点分配容器组过多",
+                        "level": "紧急",
+                    })
+                if storage_percent >= 0.90:
+                    events.append({
+                        "time": now_time,
+                        "name": "节点存储",
+                        "mesc": name + "节点存在磁盘存储压力",
+                        "level": "紧急",
+                    })
+
+        return events, region_errors(results)
+
+    async def refresh(self, session, enterprise_id, kind):
+        """
+        统计并写入快照
+        """
+        with metrics.timer("dashboard.aggregate.{}".format(kind)):
+            bean, regions = await self._build(kind)(session, enterprise_id)
+        snapshot = {"bean": bean, "regions": regions, "updated_at": int(time.time())}
+        try:
+            await run_in_threadpool(redis_client.setex, self._snapshot_key(enterprise_id, kind),
+                                    DASHBOARD_AGGREGATE_INTERVAL * 3, json.dumps(snapshot))
+        except Exception as e:
+            logger.warning("set dashboard snapshot to redis failed: {}", e)
+        return snapshot
+
+    async def get(self, session, enterprise_id, kind):
+        """
+        读取指标快照, 快照缺失时同步统计
+        :return: {"bean", "regions", "updated_at"}
+        """
+        value = None
+        try:
+            pipe = redis_client.pipeline()
+            if await self._enterprise_exists(session, enterprise_id):
+                pipe.zadd(self.VIEWERS_KEY, {enterprise_id: int(time.time())})
+            pipe.get(self._snapshot_key(enterprise_id, kind))
+            value = (await run_in_threadpool(pipe.execute))[-1]
+        except Exception as e:
+            logger.warning("get dashboard snapshot from redis failed: {}", e)
+        if value:
+            metrics.incr("dashboard.snapshot.hit")
+            return json.loads(value)
+        metrics.incr("dashboard.snapshot.miss")
+        return await self.refresh(session, enterprise_id, kind)
+
+    @staticmethod
+    async def _enterprise_exists(session, enterprise_id):
+        """
+        接口未鉴权, 只登记存在的企业, 避免任意 enterprise_id 进入后台统计
+        """
+        if _known_enterprises.get(enterprise_id):
+            return True
+        enterprise = await run_in_threadpool(enterprise_repo.get_enterprise_by_enterprise_id, session, enterprise_id)
+        if not enterprise:
+            return False
+        _known_enterprises.set(enterprise_id, True)
+        return True
+
+    def _acquire(self):
+        """
+        获取运行锁与周期锁, 获取失败时不执行本次统计
+        """
+        if not redis_client.set(self.RUNNING_KEY, 1, nx=True, ex=DASHBOARD_AGGREGATE_LOCK_TTL):
+            return None
+        if not redis_client.set(self.LOCK_KEY, 1, nx=True, ex=max(DASHBOARD_AGGREGATE_INTERVAL - 1, 1)):
+            redis_client.delete(self.RUNNING_KEY)
+            return None
+        redis_client.zremrangebyscore(self.VIEWERS_KEY, 0, int(time.time()) - DASHBOARD_VIEWER_TTL)
+        return redis_client.zrange(self.VIEWERS_KEY, 0, -1)
+
+    async def aggregate(self):
+        """
+        后台任务: 统计最近有访问的企业的全部指标
+        """
+        try:
+            enterprise_ids = await run_in_threadpool(self._acquire)
+        except Exception as e:
+            logger.warning("dashboard aggregate skipped, redis unavailable: {}", e)
+            return
+        if enterprise_ids is None:
+            return
+        try:
+            for enterprise_id in enterprise_ids:
+                if isinstance(enterprise_id, bytes):
+                    enterprise_id = enterprise_id.decode()
+                session = SessionClass()
+                try:
+                    for kind in self.KINDS:
+                        try:
+                            await self.refresh(session, enterprise_id, kind)
+                        except Exception as e:
+                            logger.exception("dashboard aggregate {} of enterprise {} failed: {}", kind,
+                                             enterprise_id, e)
+                finally:
+                    await run_in_threadpool(session.close)
+                await run_in_threadpool(redis_client.expire, self.RUNNING_KEY, DASHBOARD_AGGREGATE_LOCK_TTL)
+        finally:
+            try:
+                await run_in_threadpool(redis_client.delete, self.RUNNING_KEY)
+            except Exception as e:
+                logger.warning("release dashboard aggregate lock failed: {}", e)
+
+
+hunan_dashboard_service = HunanDashboardService()
@@ -3,6 +3,7 @@ import json
 
 from fastapi.encoders import jsonable_encoder
 from loguru import logger
+from sqlalchemy import select, tuple_
 
 from clients.remote_build_client import remote_build_client
 from clients.remote_component_client import remote_component_client
@@ -13,7 +14,8 @@ from core.utils.constants import AppMigrateType
 from core.utils.crypt import make_uuid
 from database.session import SessionClass
 from exceptions.exceptions import ErrBackupRecordNotFound, ErrObjectStorageInfoNotFound, ErrNeedAllServiceCloesed
-from models.application.plugin import TeamComponentPluginRelation, ComponentPluginConfigVar
+from models.application.plugin import TeamComponentPluginRelation, ComponentPluginConfigVar, TeamPlugin, \
+    PluginBuildVersion, PluginConfigGroup, PluginConfigItems
 from models.component.models import TeamComponentInfo, TeamComponentPort, ComponentEnvVar, \
     TeamComponentConfigurationFile, TeamComponentVolume, TeamComponentEnv, ComponentLabels, ComponentProbe, \
     ComponentSourceInfo, TeamComponentAuth, ThirdPartyComponentEndpoints, TeamComponentMountRelation
@@ -21,17 +23,14 @@ from models.relate.models import TeamComponentRelation
 from repository.application.app_backup_repo import backup_record_repo
 from repository.application.app_migration_repo import migrate_repo
 from repository.application.application_repo import application_repo
+from repository.bulk import bulk_insert, bulk_insert_objects, fetch_ids
 from repository.component.component_repo import service_source_repo
-from repository.component.service_config_repo import port_repo, volume_repo, compile_env_repo, \
-    app_config_group_repo
+from repository.component.service_config_repo import port_repo, compile_env_repo, app_config_group_repo
 from repository.component.service_domain_repo import domain_repo
 from repository.component.service_probe_repo import probe_repo
 from repository.component.service_tcp_domain_repo import tcp_domain_repo
-from repository.plugin.plugin_config_repo import config_item_repo, config_group_repo
-from repository.plugin.plugin_version_repo import plugin_version_repo
 from repository.region.region_app_repo import region_app_repo
 from repository.region.region_info_repo import region_repo
-from repository.teams.team_plugin_repo import plugin_repo
 from repository.teams.team_repo import team_repo
 from service.app_config.component_graph import component_graph_service
 from service.app_config.port_service import port_service
@@ -299,7 +298,7 @@ class GroupappsMigrateService(object):
                                                                    })
 
         if port_list:
-            port_repo.bulk_all(session, port_list)
+            bulk_insert(session, TeamComponentPort, port_list)
             region = region_repo.get_region_by_region_name(session, service.service_region)
             for port in port_list:
                 if port.is_outer_service:
@@ -375,34 +374,31 @@ class GroupappsMigrateService(object):
                                                                        tcp_rule_id,
                                                                        tenant_id, region_id)
 
-    def __save_env(self, session: SessionClass, tenant, service, tenant_service_env_vars):
-        env_list = []
+    def __save_env(self, pending, tenant, service, tenant_service_env_vars):
         for env in tenant_service_env_vars:
             env.pop("ID")
             new_env = ComponentEnvVar(**env)
             new_env.tenant_id = tenant.tenant_id
             new_env.service_id = service.service_id
-            env_list.append(new_env)
-        if env_list:
-            port_repo.bulk_all(session, env_list)
+            pending.append(new_env)
 
-    def __save_volume(self, session: SessionClass, tenant, service, tenant_service_volumes, service_config_file):
+    def __save_volume(self, session: SessionClass, pending_volumes, tenant, service, tenant_service_volumes,
+                      service_config_file):
+        """
+        存储与配置文件先收集, 由 __flush_volumes 统一写入
+        """
         contain_config_file = False if not service_config_file else True
         if not service_config_file:
             contain_config_file = True
-        volume_list = []
-        config_list = []
-        volume_name_id = {}
         for volume in tenant_service_volumes:
             index = volume.pop("ID")
-            volume_name_id[volume["volume_name"]] = index
             if volume["volume_type"] == "config-file" and contain_config_file:
                 for config_file in service_config_file:
                     if config_file["volume_id"] == index:
                         config_file.pop("ID")
                         new_config_file = TeamComponentConfigurationFile(**config_file)
                         new_config_file.service_id = service.service_id
-                        config_list.append(new_config_file)
+                        pending_volumes["config_files"].append(new_config_file)
             settings = volume_service.get_best_suitable_volume_settings(session=session, tenant=tenant, service=service,
                                                                         volume_type=volume["volume_type"],
                                                                         access_mode=volume.get("access_mode"),
@@ -420,24 +416,30 @@ class GroupappsMigrateService(object):
             host_path = "/wtdata/tenant/{0}/service/{1}{2}".format(tenant.tenant_id, service.service_id,
                                                                    new_volume.volume_path)
             new_volume.host_path = host_path
-            volume_list.append(new_volume)
-        if volume_list:
-            # bulk_create do not return volume's id(django database connection feature can_return_ids_from_bulk_insert)
-            port_repo.bulk_all(session, volume_list)
-            # query again volume for volume_id
-            volumes = volume_repo.get_service_volumes_with_config_file(session, service.service_id)
-            # prepare old volume_id and new volume_id relations
-            volume_name_ids = [{"volume_name": volume.volume_name, "volume_id": volume.ID} for volume in volumes]
-            volume_id_relations = {}
-            for vni in volume_name_ids:
-                if volume_name_id.get(vni["volume_name"]):
-                    old_volume_id = volume_name_id.get(vni["volume_name"])
-                    new_volume_id = vni["volume_id"]
-                    volume_id_relations[old_volume_id] = new_volume_id
-            for config in config_list:
-                if volume_id_relations.get(config.volume_id):
-                    config.volume_id = volume_id_relations.get(config.volume_id)
-            port_repo.bulk_all(session, config_list)
+            pending_volumes["volumes"].append(new_volume)
+            pending_volumes["old_ids"][(service.service_id, volume["volume_name"])] = index
+
+    @staticmethod
+    def __flush_volumes(session: SessionClass, pending_volumes):
+        """
+        批量写入所有组件的存储, 按 (service_id, volume_name) 回查新存储 id 后写入配置文件
+        """
+        volumes = pending_volumes["volumes"]
+        if not volumes:
+            return
+        bulk_insert(session, TeamComponentVolume, volumes)
+        service_ids = list({volume.service_id for volume in volumes})
+        new_ids = fetch_ids(session, TeamComponentVolume,
+                            [TeamComponentVolume.service_id, TeamComponentVolume.volume_name],
+                            TeamComponentVolume.service_id.in_(service_ids))
+        # prepare old volume_id and new volume_id relations
+        old_ids = pending_volumes["old_ids"]
+        volume_id_relations = {old_ids[key]: new_id for key, new_id in new_ids.items() if old_ids.get(key)}
+        config_files = pending_volumes["config_files"]
+        for config in config_files:
+            if volume_id_relations.get(config.volume_id):
+                config.volume_id = volume_id_relations.get(config.volume_id)
+        bulk_insert(session, TeamComponentConfigurationFile, config_files)
 
     def __save_compile_env(self, session: SessionClass, service, compile_env):
         if compile_env:
@@ -446,27 +448,21 @@ class GroupappsMigrateService(object):
             new_compile_env.service_id = service.service_id
             compile_env_repo.save(session, new_compile_env)
 
-    def __save_service_label(self, session: SessionClass, tenant, service, region, service_labels):
-        service_label_list = []
+    def __save_service_label(self, pending, tenant, service, region, service_labels):
         for service_label in service_labels:
             service_label.pop("ID")
             new_service_label = ComponentLabels(**service_label)
             new_service_label.tenant_id = tenant.tenant_id
             new_service_label.service_id = service.service_id
             new_service_label.region = region
-            service_label_list.append(new_service_label)
-        if service_label_list:
-            port_repo.bulk_all(session, service_label_list)
+            pending.append(new_service_label)
 
-    def __save_service_probes(self, session: SessionClass, service, service_probes):
-        service_probe_list = []
+    def __save_service_probes(self, pending, service, service_probes):
         for probe in service_probes:
             probe.pop("ID")
             new_service_probe = ComponentProbe(**probe)
             new_service_probe.service_id = service.service_id
-            service_probe_list.append(new_service_probe)
-        if service_probe_list:
-            port_repo.bulk_all(session, service_probe_list)
+            pending.append(new_service_probe)
 
     def __save_service_source(self, session: SessionClass, tenant, service, service_source):
         if service_source:
@@ -478,18 +474,14 @@ class GroupappsMigrateService(object):
             new_service_source.team_id = tenant.tenant_id
             service_source_repo.save(session=session, new_service_source=new_service_source)
 
-    def __save_service_auth(self, session: SessionClass, service, service_auth):
-        service_auth_list = []
+    def __save_service_auth(self, pending, service, service_auth):
         for auth in service_auth:
             auth.pop("ID")
             new_service_auth = TeamComponentAuth(**auth)
             new_service_auth.service_id = service.service_id
-            service_auth_list.append(new_service_auth)
-        if service_auth_list:
-            port_repo.bulk_all(session, service_auth_list)
+            pending.append(new_service_auth)
 
-    def __save_third_party_service_endpoints(self, session: SessionClass, service, service_endpoints):
-        service_endpoint_list = []
+    def __save_third_party_service_endpoints(self, pending, service, service_endpoints):
         for service_endpoint in service_endpoints:
             endpoint = {
                 "tenant_id": service.tenant_id,
@@ -498,8 +490,7 @@ class GroupappsMigrateService(object):
                 "endpoints_info": service_endpoint["endpoints_info"],
                 "endpoints_type": service_endpoint["endpoints_type"]
             }
-            service_endpoint_list.append(ThirdPartyComponentEndpoints(**endpoint))
-        port_repo.bulk_all(session, service_endpoint_list)
+            pending.append(ThirdPartyComponentEndpoints(**endpoint))
 
     def __save_service_monitors(self, session: SessionClass, tenant, service, service_monitors):
         if not service_monitors:
@@ -512,43 +503,65 @@ class GroupappsMigrateService(object):
             return
         component_graph_service.bulk_create(session=session, component_id=service.service_id, graphs=component_graphs)
 
+    @staticmethod
+    def __create_missing(session: SessionClass, model, items, key_fields):
+        """
+        按唯一键一次查询已存在的记录, 只批量写入不存在的记录
+        :param items: 列值字典
+        :param key_fields: 组成唯一键的字段
+        :return: 已存在及新建的模型实例, 顺序与 items 一致
+        """
+        if not items:
+            return []
+        columns = [getattr(model, field) for field in key_fields]
+        keys = list({tuple(item[field] for field in key_fields) for item in items})
+        existing = session.execute(select(model).where(tuple_(*columns).in_(keys))).scalars().all()
+        records = {tuple(getattr(record, field) for field in key_fields): record for record in existing}
+        created = []
+        result = []
+        for item in items:
+            key = tuple(item[field] for field in key_fields)
+            record = records.get(key)
+            if not record:
+                record = model(**item)
+                records[key] = record
+                created.append(record)
+            result.append(record)
+        bulk_insert(session, model, created)
+        return result
+
     def __save_plugins(self, session: SessionClass, region_name, tenant, plugins):
         if not plugins:
             return
-        create_plugins = []
         for plugin in plugins:
             plugin.pop("ID")
             plugin["tenant_id"] = tenant.tenant_id
             plugin["region"] = region_name
-            plugin = plugin_repo.create_if_not_exist(session, **plugin)
-            if plugin:
-                create_plugins.append(plugin)
-        return create_plugins
+        return self.__create_missing(session, TeamPlugin, plugins, ["tenant_id", "plugin_id", "region"])
 
     def __save_plugin_config_items(self, session: SessionClass, plugin_config_items):
         if not plugin_config_items:
             return
         for item in plugin_config_items:
             item.pop("ID")
-            config_item_repo.create_if_not_exist(session, **item)
+        self.__create_missing(session, PluginConfigItems, plugin_config_items,
+                              ["plugin_id", "build_version", "attr_name"])
 
     def __save_plugin_config_groups(self, session: SessionClass, plugin_config_groups):
         if not plugin_config_groups:
             return
         for group in plugin_config_groups:
             group.pop("ID")
-            config_group_repo.create_if_not_exist(session, **group)
+        self.__create_missing(session, PluginConfigGroup, plugin_config_groups,
+                              ["plugin_id", "build_version", "config_name"])
 
     def __save_plugin_build_versions(self, session: SessionClass, tenant, plugin_build_versions):
         if not plugin_build_versions:
             return
-        create_version_list = []
         for version in plugin_build_versions:
             version.pop("ID")
             version["tenant_id"] = tenant.tenant_id
-            create_version = plugin_version_repo.create_if_not_exist(session, **version)
-            create_version_list.append(create_version)
-        return create_version_list
+        return self.__create_missing(session, PluginBuildVersion, plugin_build_versions, ["plugin_id", "tenant_id"])
 
     def __save_app_config_groups(self, session: SessionClass, config_groups, tenant, region_name, app_id,
                                  changed_service_map):
@@ -574,10 +587,9 @@ class GroupappsMigrateService(object):
                                                          region_name=region_name,
                                                          team_name=tenant.tenant_name)
 
-    def __save_plugin_relations(self, session: SessionClass, service_id, plugin_relations, plugin_versions):
+    def __save_plugin_relations(self, pending, service_id, plugin_relations, plugin_versions):
         if not plugin_relations:
             return
-        new_plugin_relations = []
         for pr in plugin_relations:
             pr.pop("ID")
             new_pr = TeamComponentPluginRelation(**pr)
@@ -590,21 +602,18 @@ class GroupappsMigrateService(object):
                         new_pr.min_memory = plugin_version.min_memory
                         new_pr.min_cpu = plugin_version.min_cpu
                         break
-            new_plugin_relations.append(new_pr)
-        port_repo.bulk_all(session, new_plugin_relations)
+            pending.append(new_pr)
 
-    def __save_service_plugin_config(self, session: SessionClass, sid, service_plugin_configs):
+    def __save_service_plugin_config(self, pending, sid, service_plugin_configs):
         if not service_plugin_configs:
             return
-        new_configs = []
         for cfg in service_plugin_configs:
             cfg.pop("ID")
             new_cfg = ComponentPluginConfigVar(**cfg)
             new_cfg.service_id = sid
-            new_configs.append(new_cfg)
-        port_repo.bulk_all(session, new_configs)
+            pending.append(new_cfg)
 
-    def __save_service_relations(self, session: SessionClass, tenant, service_relations_list, old_new_service_id_map,
+    def __save_service_relations(self, pending, tenant, service_relations_list, old_new_service_id_map,
                                  same_team,
                                  same_region):
         new_service_relation_list = []
@@ -622,9 +631,9 @@ class GroupappsMigrateService(object):
                 else:
                     continue
                 new_service_relation_list.append(new_service_relation)
-            port_repo.bulk_all(session, new_service_relation_list)
+            pending.extend(new_service_relation_list)
 
-    def __save_service_mnt_relation(self, session: SessionClass, tenant, service_mnt_relation_list,
+    def __save_service_mnt_relation(self, pending, tenant, service_mnt_relation_list,
                                     old_new_service_id_map, same_team,
                                     same_region):
         new_service_mnt_relation_list = []
@@ -646,7 +655,7 @@ class GroupappsMigrateService(object):
                 else:
                     continue
                 new_service_mnt_relation_list.append(new_service_mnt)
-            port_repo.bulk_all(session, new_service_mnt_relation_list)
+            pending.extend(new_service_mnt_relation_list)
 
     def save_data(
             self, session: SessionClass,
@@ -666,6 +675,9 @@ class GroupappsMigrateService(object):
         old_new_service_id_map = dict()
         service_relations_list = []
         service_mnt_list = []
+        # 组件子资源先收集, 按表批量写入
+        pending = []
+        pending_volumes = {"volumes": [], "config_files": [], "old_ids": {}}
         # restore component
         for app in apps:
             service_base_info = app["service_base"]
@@ -679,26 +691,29 @@ class GroupappsMigrateService(object):
             self.__save_port(session=session, region_name=migrate_region, tenant=migrate_tenant, service=ts,
                              tenant_service_ports=app["service_ports"], governance_mode=group.governance_mode,
                              tenant_service_env_vars=app["service_env_vars"], sync_flag=sync_flag)
-            self.__save_env(session=session, tenant=migrate_tenant, service=ts,
+            self.__save_env(pending=pending, tenant=migrate_tenant, service=ts,
                             tenant_service_env_vars=app["service_env_vars"])
-            self.__save_volume(session=session, tenant=migrate_tenant, service=ts,
+            self.__save_volume(session=session, pending_volumes=pending_volumes, tenant=migrate_tenant, service=ts,
                                tenant_service_volumes=app["service_volumes"],
                                service_config_file=app["service_config_file"] if 'service_config_file' in app else None)
             self.__save_compile_env(session=session, service=ts, compile_env=app["service_compile_env"])
-            self.__save_service_label(session=session, tenant=migrate_tenant, service=ts, region=migrate_region,
+            self.__save_service_label(pending=pending, tenant=migrate_tenant, service=ts, region=migrate_region,
                                       service_labels=app["service_labels"])
             if sync_flag:
-                self.__save_service_probes(session=session, service=ts, service_probes=app["service_probes"])
+                self.__save_service_probes(pending=pending, service=ts, service_probes=app["service_probes"])
             self.__save_service_source(session=session, tenant=migrate_tenant, service=ts,
                                        service_source=app["service_source"])
-            self.__save_service_auth(session=session, service=ts, service_auth=app["service_auths"])
-            self.__save_third_party_service_endpoints(session=session, service=ts,
+            self.__save_service_auth(pending=pending, service=ts, service_auth=app["service_auths"])
+            self.__save_third_party_service_endpoints(pending=pending, service=ts,
                                                       service_endpoints=app.get("third_party_service_endpoints", []))
             self.__save_service_monitors(session=session, tenant=migrate_tenant, service=ts,
                                          service_monitors=app.get("service_monitors"))
             self.__save_component_graphs(session=session, service=ts, component_graphs=app.get("component_graphs"))
 
             if ts.service_source == "third_party":
+                # 第三方组件需要从数据库读取端点与探针, 先写入已收集的记录
+                bulk_insert_objects(session, pending)
+                pending = []
                 application_service.create_third_party_service(session=session, tenant=migrate_tenant, service=ts,
                                                                user_name=user.nick_name)
                 probes = probe_repo.get_service_probe(session, ts.service_id)
@@ -749,6 +764,10 @@ class GroupappsMigrateService(object):
             ts.create_status = "complete"
             session.merge(ts)
 
+        bulk_insert_objects(session, pending)
+        pending = []
+        self.__flush_volumes(session, pending_volumes)
+
         # restore plugin info
         self.__save_plugins(session=session, region_name=migrate_region, tenant=migrate_tenant,
                             plugins=metadata["plugin_info"]["plugins"])
@@ -763,19 +782,20 @@ class GroupappsMigrateService(object):
             new_service_id = old_new_service_id_map[app["service_base"]["service_id"]]
             # plugin
             if app.get("service_plugin_relation", None):
-                self.__save_plugin_relations(session=session, service_id=new_service_id,
+                self.__save_plugin_relations(pending=pending, service_id=new_service_id,
                                              plugin_relations=app["service_plugin_relation"], plugin_versions=versions)
             if app.get("service_plugin_config", None):
-                self.__save_service_plugin_config(session=session, sid=new_service_id,
+                self.__save_service_plugin_config(pending=pending, sid=new_service_id,
                                                   service_plugin_configs=app["service_plugin_config"])
-        self.__save_service_relations(session=session, tenant=migrate_tenant,
+        self.__save_service_relations(pending=pending, tenant=migrate_tenant,
                                       service_relations_list=service_relations_list,
                                       old_new_service_id_map=old_new_service_id_map, same_team=same_team,
                                       same_region=same_region)
-        self.__save_service_mnt_relation(session=session, tenant=migrate_tenant,
+        self.__save_service_mnt_relation(pending=pending, tenant=migrate_tenant,
                                          service_mnt_relation_list=service_mnt_list,
                                          old_new_service_id_map=old_new_service_id_map, same_team=same_team,
                                          same_region=same_region)
+        bulk_insert_objects(session, pending)
         # restore application config group
         self.__save_app_config_groups(session=session,
                                       config_groups=metadata.get("app_config_group_info"), tenant=migrate_tenant,
@@ -32,6 +32,7 @@ from service.market_app.new_components import NewComponents
 from service.market_app.original_app import OriginalApp
 from service.market_app.plugin import Plugin
 from service.market_app.property_changes import PropertyChanges
+from service.market_app.region_stage import run_stage, StageError
 from service.market_app.update_components import UpdateComponents
 
 
@@ -99,11 +100,8 @@ class AppUpgrade(MarketApp):
         super(AppUpgrade, self).__init__(session, self.original_app, self.new_app)
 
     def install(self, session):
-        # install plugins
-        self.install_plugins(session)
-
-        # Sync the new application to the data center first
-        self.sync_new_app(session)
+        # install plugins and sync the new application to the data center first
+        self.install_plugins_and_sync_app(session)
 
         try:
             # Save the application to the console
@@ -118,16 +116,9 @@ class AppUpgrade(MarketApp):
             self._install_deploy(session)
 
     def upgrade(self, session):
-        # install plugins
-        try:
-            self.install_plugins(session)
-        except Exception as e:
-            self._update_upgrade_record(ApplicationUpgradeStatus.UPGRADE_FAILED.value)
-            raise e
-
-        # Sync the new application to the data center first
+        # install plugins and sync the new application to the data center first
         try:
-            self.sync_new_app(session)
+            self.install_plugins_and_sync_app(session)
         except Exception as e:
             self._update_upgrade_record(ApplicationUpgradeStatus.UPGRADE_FAILED.value)
             raise e
@@ -195,13 +186,32 @@ class AppUpgrade(MarketApp):
 
         return result
 
-    def install_plugins(self, session):
+    def install_plugins_and_sync_app(self, session):
+        """
+        保存并同步插件, 再将插件构建与组件同步并发执行, 最后同步配置组
+        """
         # save plugins
         self.save_new_plugins(session)
-        # sync plugins
+        # sync plugins, components reference the plugins
         self._sync_plugins(session, self.new_app.new_plugins)
-        # deploy plugins
-        self._deploy_plugins(session, self.new_app.new_plugins)
+
+        # plugin builds and component syncs are independent of each other
+        tasks = []
+        if self.new_app.new_plugins:
+            tasks.append(("build_plugins", self._deploy_plugins_func(self.new_app.new_plugins)))
+        tasks.append(("sync_components", self._sync_new_components_func()))
+        try:
+            run_stage(tasks)
+        except StageError as e:
+            if "sync_components" in e.succeeded:
+                # 插件构建失败而组件已同步, 回滚集群中的组件, 与串行执行时的集群状态保持一致
+                try:
+                    self._rollback_components(session)
+                except Exception as rollback_err:
+                    logger.exception(rollback_err)
+            raise e.first_error
+
+        self._sync_app_config_groups(session, self.new_app)
 
     def _save_new_app(self, session):
         self.save_new_app(session)
@@ -232,6 +242,12 @@ class AppUpgrade(MarketApp):
             raise ServiceHandleException(msg="install app failure", msg_show="安装应用发生异常，请稍后重试")
 
     def _deploy_plugins(self, session, plugins: [Plugin]):
+        self._deploy_plugins_func(plugins)(session)
+
+    def _deploy_plugins_func(self, plugins: [Plugin]):
+        """
+        在调用线程中构造插件构建请求体, 返回只发起集群调用的函数
+        """
         new_plugins = []
         for plugin in plugins:
             origin = plugin.plugin.origin
@@ -262,7 +278,13 @@ class AppUpgrade(MarketApp):
         body = {
             "plugins": new_plugins,
         }
-        remote_plugin_client.build_plugins(session, self.tenant_name, self.region_name, body)
+        tenant_name = self.tenant_name
+        region_name = self.region_name
+
+        def _build_plugins(session):
+            remote_plugin_client.build_plugins(session, tenant_name, region_name, body)
+
+        return _build_plugins
 
     def _deploy(self, session, record):
         # Optimization: not all components need deploy
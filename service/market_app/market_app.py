@@ -2,9 +2,11 @@
 import json
 
 from fastapi.encoders import jsonable_encoder
+from loguru import logger
 
 from clients.remote_app_client import remote_app_client
 from clients.remote_build_client import remote_build_client
+from common.component_status_cache import component_status_cache
 from core.enum.enterprise_enum import ActionType
 from core.utils.constants import PluginMetaType, PluginInjection
 from models.teams import ServiceDomain
@@ -14,6 +16,7 @@ from repository.teams.team_plugin_repo import plugin_repo
 from service.market_app.new_app import NewApp
 from service.market_app.original_app import OriginalApp
 from service.market_app.plugin import Plugin
+from service.market_app.region_stage import run_stage, StageError, chunks
 
 
 class MarketApp(object):
@@ -42,29 +45,48 @@ class MarketApp(object):
         upgrades = self._generate_upgrades()
 
         # Region do not support different operation in one API.
-        # We have to call build, then upgrade.
-        res = []
-        if builds:
+        # build 与 upgrade 分别按批次拆分, 各批次并发提交
+        tasks = []
+        for i, build_infos in enumerate(chunks(builds)):
             body = {
                 "operation": "build",
-                "build_infos": builds,
+                "build_infos": build_infos,
             }
-            _, body = remote_build_client.batch_operation_service(session, self.new_app.region_name,
-                                                                  self.new_app.tenant.tenant_name, body)
-            res += body["bean"]["batch_result"]
-
-        if upgrades:
+            tasks.append(("build-{}".format(i), self._batch_operation_func(body)))
+        for i, upgrade_infos in enumerate(chunks(upgrades)):
             body = {
                 "operation": "upgrade",
-                "upgrade_infos": upgrades,
+                "upgrade_infos": upgrade_infos,
             }
-            _, body = remote_build_client.batch_operation_service(session,
-                                                                  self.new_app.region_name,
-                                                                  self.new_app.tenant.tenant_name, body)
-            res += body["bean"]["batch_result"]
+            tasks.append(("upgrade-{}".format(i), self._batch_operation_func(body)))
+        if not tasks:
+            return []
+
+        try:
+            results = run_stage(tasks)
+        except StageError as e:
+            # 集群已受理的批次无法撤回, 记录后按第一个失败批次的错误返回
+            logger.error("region app id: {}; deploy batches succeeded: {}; failed: {}".format(
+                self.new_app.region_app_id, e.succeeded, [name for name, _ in e.errors]))
+            raise e.first_error
 
+        res = []
+        for name, _ in tasks:
+            res += results[name]
         return res
 
+    def _batch_operation_func(self, body):
+        region_name = self.new_app.region_name
+        tenant_name = self.new_app.tenant.tenant_name
+
+        def _batch_operation(session):
+            _, res = remote_build_client.batch_operation_service(session, region_name, tenant_name, body)
+            infos = body.get("build_infos") or body.get("upgrade_infos") or []
+            component_status_cache.invalidate(region_name, [info["service_id"] for info in infos])
+            return res["bean"]["batch_result"]
+
+        return _batch_operation
+
     def ensure_component_deps(self, new_deps, tmpl_component_ids=[], is_upgrade_one=False):
         """
         确保组件依赖关系的正确性.
@@ -125,10 +147,23 @@ class MarketApp(object):
         """
         synchronous components to the application in region
         """
+        self._sync_new_components_func()(session)
+
+    def _sync_new_components_func(self):
+        """
+        在调用线程中构造组件请求体, 返回只发起集群调用的函数, 可在并发阶段中执行
+        """
         body = {
             "components": self._create_component_body(self.new_app),
         }
-        remote_app_client.sync_components(session, self.tenant_name, self.region_name, self.new_app.region_app_id, body)
+        tenant_name = self.tenant_name
+        region_name = self.region_name
+        region_app_id = self.new_app.region_app_id
+
+        def _sync(session):
+            remote_app_client.sync_components(session, tenant_name, region_name, region_app_id, body)
+
+        return _sync
 
     def _rollback_components(self, session):
         body = {
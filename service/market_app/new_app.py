@@ -3,6 +3,7 @@
 from models.application.models import Application
 from repository.application.app_repository import config_file_repo
 from repository.application.config_group_repo import app_config_group_item_repo, app_config_group_service_repo
+from repository.bulk import bulk_insert_objects
 from repository.component.env_var_repo import env_var_repo
 from repository.component.graph_repo import component_graph_repo
 from repository.component.service_config_repo import port_repo, volume_repo, \
@@ -170,18 +171,10 @@ class NewApp(object):
 
         session.add_all(components)
         session.add_all(component_sources)
-        session.add_all(envs)
-        session.add_all(ports)
-        session.add_all(http_rules)
-        session.add_all(http_rule_configs)
-        session.add_all(volumes)
-        session.add_all(config_files)
-        session.add_all(probes)
-        session.add_all(extend_infos)
-        session.add_all(monitors)
-        session.add_all(graphs)
-        session.add_all(service_group_rels)
-        session.add_all(labels)
+        # 组件的子资源保存后不再经 ORM 修改, 按表批量写入
+        for rows in [envs, ports, http_rules, http_rule_configs, volumes, config_files, probes, extend_infos,
+                     monitors, graphs, service_group_rels, labels]:
+            bulk_insert_objects(session, rows)
 
     def _update_components(self, session):
         """
@@ -0,0 +1,75 @@
+# -*- coding: utf8 -*-
+"""
+市场应用安装/升级中面向集群的步骤并发执行
+
+集群客户端会通过数据库会话查询集群访问信息, 会话不能跨线程共享, 每个任务使用独立的短会话;
+请求体需在调用线程中预先构造好, 任务中只发起集群调用。
+所有任务结束后才汇总结果, 部分失败时调用方可以按已成功的任务确定性地回滚。
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from loguru import logger
+
+from core.utils.metrics import metrics
+from database.session import SessionClass
+
+stage_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("MARKET_APP_REGION_CONCURRENCY", 4)),
+                                    thread_name_prefix="market-app-stage")
+
+
+class StageError(Exception):
+    """
+    并发阶段中存在失败的任务
+    """
+
+    def __init__(self, errors, succeeded, results):
+        # errors: [(name, exception)], 按任务提交顺序
+        self.errors = errors
+        self.succeeded = succeeded
+        self.results = results
+        super(StageError, self).__init__("stage tasks failed: {}".format(", ".join([name for name, _ in errors])))
+
+    @property
+    def first_error(self):
+        return self.errors[0][1]
+
+
+def _run_task(name, func):
+    session = SessionClass()
+    try:
+        with metrics.timer("market_app.stage.{}".format(name.split("-")[0])):
+            return func(session)
+    finally:
+        session.close()
+
+
+def run_stage(tasks):
+    """
+    并发执行一组相互独立的集群调用, 等待全部完成后返回
+    :param tasks: [(name, func)], func 接收一个独立的数据库会话
+    :return: {name: result}
+    raise StageError: 任一任务失败
+    """
+    futures = [(name, stage_executor.submit(_run_task, name, func)) for name, func in tasks]
+    results = {}
+    succeeded = []
+    errors = []
+    for name, future in futures:
+        try:
+            results[name] = future.result()
+            succeeded.append(name)
+        except Exception as e:
+            logger.exception(e)
+            errors.append((name, e))
+    if errors:
+        raise StageError(errors, succeeded, results)
+    return results
+
+
+def chunks(items, size=None):
+    """
+    按批次拆分, 单次集群批量操作的条目数不超过 size
+    """
+    size = size or int(os.environ.get("MARKET_APP_DEPLOY_BATCH_SIZE", 20))
+    return [items[i:i + size] for i in range(0, len(items), size)]
@@ -5,6 +5,7 @@ from fastapi.responses import JSONResponse
 from loguru import logger
 
 from apis.manage.user.user_manage_controller import create_access_token
+from common.identity_cache import identity_cache
 from core.setting import settings, role_required
 from models.users.users import Users
 from repository.users.user_oauth_repo import oauth_user_repo
@@ -119,6 +120,7 @@ class OAuthUserService(object):
                                                                      oauth_user.enterprise_id)
             user_svc.make_user_as_admin_for_enterprise(session, user.user_id, enterprise.enterprise_id)
         user.enterprise_id = enterprise.enterprise_id
+        identity_cache.invalidate_user(session, user.user_id)
         return user
 
 
@@ -0,0 +1,179 @@
+"""
+应用与集群应用对账
+
+控制台应用在集群中对应一个集群应用, 对应关系记录在 region_app。团队总览接口原先在每次查询时补建缺失的集群应用,
+读接口中包含集群写操作和数据库写入。此处改由后台任务保持 region_app 同步:
+- 创建应用、团队开通集群后登记该团队集群, 事务提交后写入 redis 待处理集合, 由后台任务在下个周期处理
+- 后台任务按 REGION_APP_FULL_RECONCILE_INTERVAL 全量扫描缺失对应关系的应用
+- 多个 worker 通过 redis 锁保证同一时间只有一个 worker 执行对账
+- 各集群通过 fan_out 并发处理, 处理失败的团队集群放回待处理集合, 下个周期重试
+- 集群超时后其线程仍可能在执行, 每个团队集群在线程内持有独立的锁并在加锁后重新查询缺失的应用, 不会重复创建
+"""
+import os
+
+from loguru import logger
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from clients.remote_app_client import remote_app_client
+from common.region_fanout import fan_out
+from core.utils.metrics import metrics
+from database.redis_session import redis_client
+from database.session import SessionClass
+from models.region.models import RegionApp
+from repository.component.app_component_relation_repo import app_component_relation_repo
+from repository.region.region_app_repo import region_app_repo
+from repository.teams.team_repo import team_repo
+
+REGION_APP_RECONCILE_INTERVAL = int(os.environ.get("REGION_APP_RECONCILE_INTERVAL", 30))
+REGION_APP_FULL_RECONCILE_INTERVAL = int(os.environ.get("REGION_APP_FULL_RECONCILE_INTERVAL", 600))
+REGION_APP_RECONCILE_TIMEOUT = float(os.environ.get("REGION_APP_RECONCILE_TIMEOUT", 120))
+# 单个团队集群对账的锁超时时间, 需大于集群接口的最长耗时
+REGION_APP_TEAM_LOCK_TTL = int(os.environ.get("REGION_APP_TEAM_LOCK_TTL", 600))
+# 每个周期最多处理的待处理团队集群数
+REGION_APP_RECONCILE_BATCH = 1000
+
+
+class RegionAppReconciler(object):
+    """
+    RegionAppReconciler
+    """
+    PENDING_KEY = "region_app:pending"
+    LOCK_KEY = "region_app:reconcile:lock"
+    FULL_KEY = "region_app:reconcile:full"
+    TEAM_LOCK_KEY = "region_app:reconcile:{}:{}"
+    DIRTY_KEY = "region_app_pending"
+
+    def reconcile_team_region(self, session, tenant, region_name):
+        """
+        在集群中创建团队缺失的集群应用并记录对应关系
+        :return: 新建的对应关系数
+        """
+        apps = region_app_repo.list_unmapped_apps(session, tenant.tenant_id, region_name)
+        if not apps:
+            return 0
+        service_ids = app_component_relation_repo.list_service_ids_by_groups(
+            session, tenant.tenant_id, region_name, [app.ID for app in apps])
+        batch_create_app_body = []
+        for app in apps:
+            create_app_body = dict()
+            create_app_body["app_name"] = app.group_name
+            create_app_body["console_app_id"] = app.ID
+            create_app_body["service_ids"] = service_ids.get(app.ID, [])
+            if app.k8s_app:
+                create_app_body["k8s_app"] = app.k8s_app
+            batch_create_app_body.append(create_app_body)
+        applist = remote_app_client.batch_create_application(session, region_name, tenant.tenant_name,
+                                                             {"apps_info": batch_create_app_body})
+        app_list = [
+            RegionApp(app_id=app["app_id"], region_app_id=app["region_app_id"], region_name=region_name)
+            for app in applist or []
+        ]
+        region_app_repo.bulk_create(session=session, app_list=app_list)
+        metrics.incr("region_app.reconcile.created", len(app_list))
+        return len(app_list)
+
+    def _reconcile_region(self, team_regions):
+        def _func(session, region_name):
+            failed = []
+            tenants = team_repo.get_team_by_team_ids(session, team_regions[region_name])
+            for tenant in tenants:
+                lock_key = self.TEAM_LOCK_KEY.format(tenant.tenant_id, region_name)
+                if not redis_client.set(lock_key, 1, nx=True, ex=REGION_APP_TEAM_LOCK_TTL):
+                    # 上一周期超时的线程仍在处理, 下个周期再检查
+                    failed.append(tenant.tenant_id)
+                    continue
+                try:
+                    # 加锁后查询, 能看到上一次处理已提交的对应关系
+                    self.reconcile_team_region(session, tenant, region_name)
+                    session.commit()
+                except Exception as e:
+                    session.rollback()
+                    failed.append(tenant.tenant_id)
+                    logger.exception("reconcile region apps of team {} in region {} failed: {}",
+                                     tenant.tenant_name, region_name, e)
+                finally:
+                    redis_client.delete(lock_key)
+            return failed
+
+        return _func
+
+    def mark_pending(self, session, tenant_id, region_name):
+        """
+        登记需要对账的团队集群, 事务提交后写入待处理集合
+        """
+        session.info.setdefault(self.DIRTY_KEY, set()).add("{}:{}".format(tenant_id, region_name))
+
+    def add_pending(self, members):
+        try:
+            redis_client.sadd(self.PENDING_KEY, *members)
+        except Exception as e:
+            logger.warning("add region app reconcile pending failed: {}", e)
+
+    def _collect(self):
+        """
+        :return: {region_name: [tenant_id]}
+        """
+        members = redis_client.spop(self.PENDING_KEY, REGION_APP_RECONCILE_BATCH) or []
+        team_regions = {}
+        for member in members:
+            if isinstance(member, bytes):
+                member = member.decode()
+            tenant_id, region_name = member.split(":", 1)
+            team_regions.setdefault(region_name, set()).add(tenant_id)
+        if redis_client.set(self.FULL_KEY, 1, nx=True, ex=REGION_APP_FULL_RECONCILE_INTERVAL):
+            session = SessionClass()
+            try:
+                for tenant_id, region_name in region_app_repo.list_unmapped_team_regions(session):
+                    team_regions.setdefault(region_name, set()).add(tenant_id)
+            finally:
+                session.close()
+        return {region_name: list(tenant_ids) for region_name, tenant_ids in team_regions.items()}
+
+    async def reconcile(self):
+        """
+        后台任务: 处理待处理的团队集群, 并定期全量对账
+        """
+        try:
+            if not await run_in_threadpool(redis_client.set, self.LOCK_KEY, 1, nx=True,
+                                           ex=int(REGION_APP_RECONCILE_TIMEOUT) + 1):
+                return
+        except Exception as e:
+            logger.warning("region app reconcile skipped, redis unavailable: {}", e)
+            return
+        try:
+            team_regions = await run_in_threadpool(self._collect)
+            if not team_regions:
+                return
+            results = await fan_out(list(team_regions.keys()), self._reconcile_region(team_regions),
+                                    timeout=REGION_APP_RECONCILE_TIMEOUT)
+            retry = []
+            for result in results:
+                failed = result.data if result.success else team_regions[result.region_name]
+                retry.extend("{}:{}".format(tenant_id, result.region_name) for tenant_id in failed)
+            if retry:
+                metrics.incr("region_app.reconcile.failed", len(retry))
+                await run_in_threadpool(self.add_pending, retry)
+        except Exception as e:
+            logger.exception("region app reconcile failed: {}", e)
+        finally:
+            try:
+                await run_in_threadpool(redis_client.delete, self.LOCK_KEY)
+            except Exception as e:
+                logger.warning("release region app reconcile lock failed: {}", e)
+
+
+region_app_reconciler = RegionAppReconciler()
+
+
+@event.listens_for(Session, "after_commit")
+def _add_pending_after_commit(session):
+    members = session.info.pop(RegionAppReconciler.DIRTY_KEY, None)
+    if members:
+        region_app_reconciler.add_pending(list(members))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop(RegionAppReconciler.DIRTY_KEY, None)
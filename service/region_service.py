@@ -18,6 +18,7 @@ from repository.application.application_repo import application_repo
 from repository.component.group_service_repo import service_info_repo
 from repository.config.config_repo import sys_config_repo
 from repository.enterprise.enterprise_repo import enterprise_repo
+from repository.region.region_config_repo import region_config_repo
 from repository.region.region_info_repo import region_repo
 from repository.teams.team_plugin_repo import plugin_repo
 from repository.teams.team_region_repo import team_region_repo
@@ -29,6 +30,27 @@ from service.market_app_service import market_app_service
 
 from service.platform_config_service import ConfigService
 from service.plugin_service import plugin_service
+from service.region_app_reconciler import region_app_reconciler
+
+
+def team_region_info(region, region_config):
+    """
+    团队已开通集群的展示信息
+    :param region: TeamRegionInfo
+    :param region_config: RegionConfig
+    """
+    return {
+        "service_status": region.service_status,
+        "is_active": region.is_active,
+        "region_status": region_config.status,
+        "team_region_alias": region_config.region_alias,
+        "region_tenant_id": region.region_tenant_id,
+        "team_region_name": region.region_name,
+        "region_scope": region_config.scope,
+        "region_create_time": region_config.create_time,
+        "websocket_uri": region_config.wsurl,
+        "tcpdomain": region_config.tcpdomain
+    }
 
 
 def get_region_list_by_team_name(session: SessionClass, team_name):
@@ -43,19 +65,7 @@ def get_region_list_by_team_name(session: SessionClass, team_name):
         for region in regions:
             region_config = team_region_repo.get_region_by_region_name(session, region.region_name)
             if region_config and region_config.status in ("1", "3"):
-                region_info = {
-                    "service_status": region.service_status,
-                    "is_active": region.is_active,
-                    "region_status": region_config.status,
-                    "team_region_alias": region_config.region_alias,
-                    "region_tenant_id": region.region_tenant_id,
-                    "team_region_name": region.region_name,
-                    "region_scope": region_config.scope,
-                    "region_create_time": region_config.create_time,
-                    "websocket_uri": region_config.wsurl,
-                    "tcpdomain": region_config.tcpdomain
-                }
-                region_name_list.append(region_info)
+                region_name_list.append(team_region_info(region, region_config))
         return region_name_list
     else:
         return []
@@ -63,11 +73,24 @@ def get_region_list_by_team_name(session: SessionClass, team_name):
 
 class RegionService(object):
 
-    async def get_region_by_request(self, session, request):
-        try:
-            data = await request.json()
-        except:
-            data = {}
+    async def get_region_by_request(self, session, request, read_body=True, body=None):
+        """
+        :param read_body: 为 False 时不读取请求体, 仅从查询参数、请求头与 cookie 中获取集群, 用于流式转发
+        :param body: 调用方已读取的请求体, 指定时从中解析集群名称
+        """
+        data = {}
+        if body is not None:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                data = {}
+            if not isinstance(data, dict):
+                data = {}
+        elif read_body:
+            try:
+                data = await request.json()
+            except:
+                data = {}
         response_region = data.get("region_name", None)
         if not response_region:
             response_region = request.query_params.get("region_name", None)
@@ -80,10 +103,9 @@ class RegionService(object):
         region_name = response_region
         if not response_region:
             raise AbortRequest("region not found", "数据中心不存在", status_code=404, error_code=404)
-        region = region_repo.get_region_by_region_name(session, region_name)
+        region = region_config_repo.get_cached_region_config_by_region_name(session, region_name)
         if not region:
             raise AbortRequest("region not found", "数据中心不存在", status_code=404, error_code=404)
-        region = region
         return region
 
     def get_public_key(self, session, tenant, region):
@@ -378,6 +400,7 @@ class RegionService(object):
                 tenant_region.region_scope = region_config.scope
                 tenant_region.enterprise_id = tenant.enterprise_id
         _ = application_service.create_default_app(session=session, tenant=tenant, region_name=region_name)
+        region_app_reconciler.mark_pending(session, tenant.tenant_id, region_name)
         return tenant_region
 
     def delete_tenant_on_region(self, session: SessionClass, enterprise_id, team_name, region_name, user):
@@ -398,12 +421,13 @@ class RegionService(object):
                 ignore_cluster_resource = True
         services = service_info_repo.get_services_by_team_and_region(session, tenant.tenant_id, region_name)
         if not ignore_cluster_resource and services and len(services) > 0:
-            # check component status
+            # check component status, 不使用状态缓存
             service_ids = [service.service_id for service in services]
             status_list = base_service.status_multi_service(session=session,
                                                             region=region_name, tenant_name=tenant.tenant_name,
                                                             service_ids=service_ids,
-                                                            enterprise_id=tenant.enterprise_id)
+                                                            enterprise_id=tenant.enterprise_id,
+                                                            use_cache=False)
             status_list = [x for x in [x["status"] for x in status_list] if x not in ["closed", "undeploy"]]
             if len(status_list) > 0:
                 raise ServiceHandleException(
@@ -3,17 +3,23 @@ from loguru import logger
 from sqlalchemy import select, delete
 
 from clients.remote_build_client import remote_build_client
+from common.identity_cache import identity_cache
+from common.perms_cache import perms_cache
+from core.utils.perms import get_compiled_perms
 from database.session import SessionClass
 from exceptions.main import ServiceHandleException
-from models.teams import TeamInfo, PermRelTenant, UserRole
+from models.region.models import TeamRegionInfo
+from models.teams import TeamInfo, PermRelTenant, UserRole, RoleInfo, RegionConfig
+from repository.enterprise.enterprise_user_perm_repo import enterprise_user_perm_repo
 from repository.enterprise.enterprise_repo import enterprise_repo
 from repository.region.region_info_repo import region_repo
 from repository.teams.team_repo import team_repo
+from repository.users.role_perm_relation_repo import role_perm_repo
 from repository.users.role_repo import role_repo
 from repository.users.user_role_repo import user_role_repo
 from repository.users.user_repo import user_repo
 from service.app_actions.app_deploy import RegionApiBaseHttpClient
-from service.region_service import region_services
+from service.region_service import region_services, team_region_info
 
 
 class TeamService(object):
@@ -25,6 +31,7 @@ class TeamService(object):
     def update_tenant_alias(self, session, tenant_name, new_team_alias):
         tenant = team_repo.get_tenant_by_tenant_name(session=session, team_name=tenant_name, exception=True)
         tenant.tenant_alias = new_team_alias
+        identity_cache.invalidate_team(session, tenant.tenant_name)
         return tenant
 
     def list_user_teams(self, session, enterprise_id, user, name):
@@ -199,6 +206,7 @@ class TeamService(object):
             session.execute(
                 delete(UserRole).where(UserRole.user_id.in_(user_id_list),
                                        UserRole.role_id.in_(role_ids)))
+            perms_cache.invalidate(session)
 
     def get_team_users(self, session: SessionClass, team, name=None):
         users = team_repo.get_tenant_users_by_tenant_ID(session, team.ID)
@@ -261,6 +269,7 @@ class TeamService(object):
                 raise ServiceHandleException(
                     msg_show="{}集群自动卸载失败，请手动卸载后重新删除团队".format(region.region_name), msg="delete tenant failure")
         team_repo.delete_by_tenant_id(session=session, tenant_id=tenant.tenant_id)
+        identity_cache.invalidate_team(session, tenant.tenant_name)
 
     def get_not_join_users(self, session: SessionClass, enterprise, tenant, query):
         return team_repo.get_not_join_users(session, enterprise, tenant, query)
@@ -291,5 +300,81 @@ class TeamService(object):
         else:
             return tenant
 
+    def list_user_teams_details(self, session, user):
+        """
+        用户加入的全部团队及其集群、角色与权限, 查询次数与团队数量无关
+        """
+        tenants = session.execute(select(TeamInfo).where(TeamInfo.ID.in_(
+            select(PermRelTenant.tenant_id).where(PermRelTenant.user_id == user.user_id))).order_by(
+            TeamInfo.create_time.desc())).scalars().all()
+        if not tenants:
+            return []
+        tenant_ids = [tenant.tenant_id for tenant in tenants]
+
+        # 集群
+        team_regions = session.execute(select(TeamRegionInfo).where(
+            TeamRegionInfo.tenant_id.in_(tenant_ids), TeamRegionInfo.is_active == 1,
+            TeamRegionInfo.is_init == 1)).scalars().all()
+        region_configs = {}
+        region_names = list(set([region.region_name for region in team_regions]))
+        if region_names:
+            for region_config in session.execute(select(RegionConfig).where(
+                    RegionConfig.region_name.in_(region_names)).order_by(RegionConfig.ID)).scalars().all():
+                region_configs.setdefault(region_config.region_name, region_config)
+        tenant_regions = {}
+        for region in team_regions:
+            region_config = region_configs.get(region.region_name)
+            if region_config and region_config.status in ("1", "3"):
+                tenant_regions.setdefault(region.tenant_id, []).append(team_region_info(region, region_config))
+
+        # 角色与权限
+        roles = session.execute(select(RoleInfo).where(
+            RoleInfo.kind == "team", RoleInfo.kind_id.in_(tenant_ids))).scalars().all()
+        role_map = {role.ID: role for role in roles}
+        user_role_ids = []
+        if role_map:
+            user_role_ids = session.execute(select(UserRole.role_id).where(
+                UserRole.user_id == user.user_id, UserRole.role_id.in_(list(role_map.keys())))).scalars().all()
+        # user_role.role_id 为字符串, role_info.ID 与 role_perms.role_id 为整数
+        role_pks = [int(role_id) for role_id in user_role_ids]
+        compiled = get_compiled_perms()
+        role_masks = {}
+        if role_pks:
+            for relation in role_perm_repo.get_roles_perm_relation(session, role_pks):
+                role_masks[relation.role_id] = role_masks.get(relation.role_id, 0) | compiled.mask(
+                    [relation.perm_code])
+        tenant_roles = {}
+        tenant_masks = {}
+        for role_id, role_pk in zip(user_role_ids, role_pks):
+            role = role_map.get(role_pk)
+            if not role:
+                continue
+            tenant_roles.setdefault(role.kind_id, []).append({"role_id": role_id, "role_name": role.name})
+            tenant_masks[role.kind_id] = tenant_masks.get(role.kind_id, 0) | role_masks.get(role_pk, 0)
+
+        is_enterprise_admin = enterprise_user_perm_repo.is_admin(session, user.enterprise_id, user.user_id)
+        tenant_list = []
+        for tenant in tenants:
+            is_team_owner = tenant.creater == user.user_id
+            if is_team_owner or is_enterprise_admin:
+                mask = compiled.all_mask
+            else:
+                mask = tenant_masks.get(tenant.tenant_id, 0)
+            tenant_list.append({
+                "team_id": tenant.ID,
+                "team_name": tenant.tenant_name,
+                "team_alias": tenant.tenant_alias,
+                "limit_memory": tenant.limit_memory,
+                "pay_level": tenant.pay_level,
+                "region": tenant_regions.get(tenant.tenant_id, []),
+                "creater": tenant.creater,
+                "create_time": tenant.create_time,
+                "namespace": tenant.namespace,
+                "role_name_list": tenant_roles.get(tenant.tenant_id, []),
+                "tenant_actions": compiled.render(mask, "team"),
+                "is_team_owner": is_team_owner,
+            })
+        return tenant_list
+
 
 team_services = TeamService()
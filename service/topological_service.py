@@ -1,3 +1,4 @@
+from collections import Counter
 from functools import reduce
 
 from fastapi.encoders import jsonable_encoder
@@ -5,6 +6,9 @@ from loguru import logger
 from sqlalchemy import select
 
 from clients.remote_component_client import remote_component_client
+from common.component_status_cache import component_status_cache
+from common.topology_cache import topology_cache
+from core.utils.status_translate import status_map
 from database.session import SessionClass
 from models.application.models import ComponentApplicationRelation
 from models.teams import ServiceDomain
@@ -13,6 +17,99 @@ from models.relate.models import TeamComponentRelation
 from service.region_service import region_services
 
 
+# 状态中文名转换表, 只构建一次; status_map 中个别状态(deployed)的值直接是中文名
+STATUS_CN_MAP = {status: info["status_cn"] if isinstance(info, dict) else info
+                 for status, info in status_map().items()}
+
+
+class TopologySnapshot(object):
+    """
+    拓扑图静态部分: 组件节点、依赖边及对外端口, 不含状态与实例数
+    """
+    __slots__ = ("member_ids", "service_ids", "nodes", "edges", "epoch", "cacheable")
+
+    def __init__(self, member_ids, service_ids, nodes, edges, cacheable):
+        self.member_ids = frozenset(member_ids)
+        self.service_ids = service_ids
+        self.nodes = nodes
+        self.edges = edges
+        self.epoch = None
+        self.cacheable = cacheable
+
+
+def build_topology_snapshot(member_ids, service_list, service_relation_list, outer_service_ids):
+    """
+    :param member_ids: 应用下的组件 id
+    :param service_list: 应用组件及其依赖的组件
+    :param service_relation_list: 依赖关系
+    :param outer_service_ids: 开启了对外端口的组件 id
+    """
+    nodes = {}
+    edges = {}
+    # 存在创建中的组件时不缓存快照, 避免创建完成后仍显示创建中
+    cacheable = True
+    for service_info in service_list:
+        nodes[service_info.service_id] = {
+            "service_id": service_info.service_id,
+            "service_cname": service_info.service_cname,
+            "service_alias": service_info.service_alias,
+            "service_source": service_info.service_source,
+            "min_node": service_info.min_node,
+            "create_status": service_info.create_status,
+            "is_internet": service_info.service_id in outer_service_ids,
+        }
+        edges[service_info.service_id] = []
+        if service_info.create_status != "complete":
+            cacheable = False
+    for service_relation in service_relation_list:
+        if service_relation.service_id in nodes and service_relation.dep_service_id in nodes:
+            edges[service_relation.service_id].append(service_relation.dep_service_id)
+    return TopologySnapshot(member_ids, list(nodes.keys()), nodes, edges, cacheable)
+
+
+def render_topology(snapshot, service_status_map, dynamic_services_list):
+    """
+    在快照上拼接组件状态与实例数
+    :param service_status_map: {service_id: status}
+    :param dynamic_services_list: 集群返回的组件实例列表
+    """
+    # 实例按组件分组计数, 只遍历一次
+    pod_counts = Counter([pod["service_id"] for pod in dynamic_services_list]) if dynamic_services_list else None
+    json_data = {}
+    for service_id, node in snapshot.nodes.items():
+        if pod_counts is not None:
+            node_num = pod_counts.get(service_id, 0)
+        else:
+            node_num = node["min_node"]
+        data = {
+            "service_id": service_id,
+            "service_cname": node["service_cname"],
+            "service_alias": node["service_alias"],
+            "service_source": node["service_source"],
+            "node_num": node_num,
+        }
+        service_status = service_status_map.get(service_id)
+        status = service_status.get("status", "Unknown") if service_status else None
+        if status:
+            status_cn = service_status.get("status_cn", None) or STATUS_CN_MAP.get(status, "未知")
+            data['cur_status'] = status
+            data['status_cn'] = status_cn
+        elif node["create_status"] != "complete":
+            data['cur_status'] = 'creating'
+            data['status_cn'] = '创建中'
+        else:
+            data['cur_status'] = 'Unknown'
+            data['status_cn'] = '未知'
+        if node["service_source"] == "third_party":
+            data['cur_status'] = "third_party"
+        data['is_internet'] = node["is_internet"]
+        json_data[service_id] = data
+    return {
+        "json_data": json_data,
+        "json_svg": {service_id: list(deps) for service_id, deps in snapshot.edges.items()},
+    }
+
+
 class TopologicalService(object):
 
     def get_group_topological_graph_details(self, session, team, team_id, team_name, service, region_name):
@@ -235,12 +332,43 @@ class TopologicalService(object):
         return result
 
     def get_group_topological_graph(self, session: SessionClass, group_id, region, team_name, enterprise_id):
-        topological_info = dict()
-        service_group_relation_list = (
-            session.execute(select(ComponentApplicationRelation).where(ComponentApplicationRelation.group_id == group_id))
+        service_id_list = (
+            session.execute(select(ComponentApplicationRelation.service_id).where(
+                ComponentApplicationRelation.group_id == group_id))
         ).scalars().all()
 
-        service_id_list = [x.service_id for x in service_group_relation_list]
+        snapshot = topology_cache.get(group_id, service_id_list)
+        if not snapshot:
+            epoch = topology_cache.epoch()
+            snapshot = self._build_snapshot(session, service_id_list)
+            snapshot.epoch = epoch
+            topology_cache.set(group_id, snapshot)
+
+        service_status_map = {}
+        dynamic_services_list = []
+        if snapshot.service_ids:
+            # 批量查询组件状态
+            try:
+                service_status_list = component_status_cache.get_statuses(session, region, team_name,
+                                                                          snapshot.service_ids, enterprise_id)
+                if service_status_list:
+                    service_status_map = {status["service_id"]: status for status in service_status_list}
+            except Exception as e:
+                logger.error('batch query service status failed!')
+                logger.exception(e)
+
+            # 拼接组件状态
+            try:
+                dynamic_services_info = remote_component_client.get_dynamic_services_pods(session, region, team_name,
+                                                                                          snapshot.service_ids)
+                dynamic_services_list = dynamic_services_info["list"]
+            except Exception as e:
+                logger.exception(e)
+
+        return render_topology(snapshot, service_status_map, dynamic_services_list)
+
+    @staticmethod
+    def _build_snapshot(session: SessionClass, service_id_list):
         # 查询组件依赖信息
         service_relation_list = (
             session.execute(
@@ -256,108 +384,14 @@ class TopologicalService(object):
                 select(TeamComponentInfo).where(TeamComponentInfo.service_id.in_(all_service_id_list)))
         ).scalars().all()
 
-        service_map = {x.service_id: x for x in service_list}
-        json_data = {}
-        json_svg = {}
-        service_status_map = {}
-
-        # 批量查询组件状态
-        if len(service_list) > 0:
-            try:
-                service_status_list = remote_component_client.service_status(session, region, team_name, {
-                    "service_ids": all_service_id_list,
-                    "enterprise_id": enterprise_id
-                })
-                service_status_list = service_status_list["list"]
-                if service_status_list:
-                    service_status_map = {status_map["service_id"]: status_map for status_map in service_status_list}
-            except Exception as e:
-                logger.error('batch query service status failed!')
-                logger.exception(e)
-
-        # 拼接组件状态
-        try:
-            dynamic_services_info = remote_component_client.get_dynamic_services_pods(session, region, team_name,
-                                                                                      [service.service_id for
-                                                                                       service in
-                                                                                       service_list])
-            dynamic_services_list = dynamic_services_info["list"]
-        except Exception as e:
-            logger.exception(e)
-            dynamic_services_list = []
-
-        for service_info in service_list:
-            node_num = 0
-            if dynamic_services_list:
-                for dynamic_service in dynamic_services_list:
-                    if dynamic_service["service_id"] == service_info.service_id:
-                        node_num += 1
-            else:
-                node_num = service_info.min_node
-            json_data[service_info.service_id] = {
-                "service_id": service_info.service_id,
-                "service_cname": service_info.service_cname,
-                "service_alias": service_info.service_alias,
-                "service_source": service_info.service_source,
-                "node_num": node_num,
-            }
-            json_svg[service_info.service_id] = []
-            if service_status_map.get(service_info.service_id):
-                status = service_status_map.get(service_info.service_id).get("status", "Unknown")
-                status_cn = service_status_map.get(service_info.service_id).get("status_cn", None)
-            else:
-                status = None
-                status_cn = None
-            if status:
-                if not status_cn:
-                    from core.utils.status_translate import status_map
-                    status_info_map = status_map().get(status, None)
-                    if not status_info_map:
-                        status_cn = "未知"
-                    else:
-                        status_cn = status_info_map["status_cn"]
-                json_data[service_info.service_id]['cur_status'] = status
-                json_data[service_info.service_id]['status_cn'] = status_cn
-            else:
-                if service_info.create_status != "complete":
-                    json_data[service_info.service_id]['cur_status'] = 'creating'
-                    json_data[service_info.service_id]['status_cn'] = '创建中'
-                else:
-                    json_data[service_info.service_id]['cur_status'] = 'Unknown'
-                    json_data[service_info.service_id]['status_cn'] = '未知'
-
-            if json_data[service_info.service_id]["service_source"] == "third_party":
-                json_data[service_info.service_id]['cur_status'] = "third_party"
-
-            # 查询是否打开对外组件端口
-            port_list = (
-                session.execute(
-                    select(TeamComponentPort).where(TeamComponentPort.service_id == service_info.service_id))
-            ).scalars().all()
+        # 一次查询开启了对外端口的组件
+        outer_service_ids = set((
+            session.execute(
+                select(TeamComponentPort.service_id).where(TeamComponentPort.service_id.in_(all_service_id_list),
+                                                           TeamComponentPort.is_outer_service == 1).distinct())
+        ).scalars().all())
 
-            # 判断组件是否有对外端口
-            outer_port_exist = False
-            if len(port_list) > 0:
-                outer_port_exist = reduce(lambda x, y: x or y, [t.is_outer_service for t in list(port_list)])
-            json_data[service_info.service_id]['is_internet'] = outer_port_exist
-
-        for service_relation in service_relation_list:
-            tmp_id = service_relation.service_id
-            tmp_info = service_map.get(tmp_id)
-            if tmp_info:
-                tmp_dep_id = service_relation.dep_service_id
-                tmp_dep_info = service_map.get(tmp_dep_id)
-                # 依赖组件的cname
-                if tmp_dep_info:
-                    tmp_info_relation = []
-                    if tmp_info.service_id in list(json_svg.keys()):
-                        tmp_info_relation = json_svg.get(tmp_info.service_id)
-                    tmp_info_relation.append(tmp_dep_info.service_id)
-                    json_svg[tmp_info.service_id] = tmp_info_relation
-
-        topological_info["json_data"] = json_data
-        topological_info["json_svg"] = json_svg
-        return topological_info
+        return build_topology_snapshot(service_id_list, service_list, service_relation_list, outer_service_ids)
 
 
 topological_service = TopologicalService()
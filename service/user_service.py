@@ -1,16 +1,16 @@
 # -*- coding: utf8 -*-
 import binascii
-import copy
 import os
-import pickle
 import re
 from jose import jwt
 from loguru import logger
 from sqlalchemy import select, or_, func, delete
+from common.identity_cache import identity_cache
+from common.perms_cache import perms_cache
 from core.setting import settings
 from core.utils import perms
 from core.utils.oauth.oauth_types import get_oauth_instance
-from core.utils.perms import get_perms_model, get_enterprise_perms_model, get_team_perms_model, TEAM, ENTERPRISE
+from core.utils.perms import get_compiled_perms, get_perms_name_code_kv
 from database.session import SessionClass
 from exceptions.exceptions import ErrCannotDelLastAdminUser, ErrAdminUserDoesNotExist, UserNotExistError
 from exceptions.main import ServiceHandleException, AbortRequest
@@ -39,26 +39,6 @@ error_messages = {
 }
 
 
-def get_perms_name_code(perms_model, kind_name):
-    perms = {}
-    sub_models = list(perms_model.keys())
-    if "perms" in sub_models:
-        sub_models.remove("perms")
-    for perm in perms_model.get("perms", []):
-        perms.update({'_'.join([kind_name, perm[0]]): perm[2]})
-    if sub_models:
-        for sub_model in sub_models:
-            perms.update(get_perms_name_code(perms_model[sub_model], sub_model))
-    return perms
-
-
-def get_perms_name_code_kv():
-    perms = {}
-    perms.update(get_perms_name_code(copy.deepcopy(TEAM), "team"))
-    perms.update(get_perms_name_code(copy.deepcopy(ENTERPRISE), "enterprise"))
-    return perms
-
-
 class UserService(object):
 
     def init_webhook_user(self, session, service, hook_type, committer_name=None):
@@ -436,6 +416,7 @@ class UserService(object):
             u.set_password(new_password)
             session.add(u)
             session.flush()
+            identity_cache.invalidate_user(session, u.user_id)
             return True, "password update success"
 
     def check_user_is_enterprise_center_user(self, session: SessionClass, user_id):
@@ -483,7 +464,7 @@ class UserService(object):
             user.phone = phone
         if raw_password:
             user.set_password(raw_password)
-        request.app.state.redis.set("user_%d" % user.user_id, pickle.dumps(user), 24 * 60 * 60)
+        identity_cache.invalidate_user(session, user.user_id)
         return user
 
     def delete_user(self, session: SessionClass, user_id):
@@ -497,16 +478,24 @@ class UserService(object):
             delete(Users).where(Users.user_id == user_id))
         session.execute(
             delete(EnterpriseUserPerm).where(EnterpriseUserPerm.user_id == user_id))
+        perms_cache.invalidate(session)
+        identity_cache.invalidate_user(session, user.user_id)
 
 
 class UserKindPermService(object):
     def get_user_perms(self, session: SessionClass, kind, kind_id, user, is_owner=False, is_ent_admin=False):
         if is_owner or is_ent_admin:
             is_owner = True
-        user_roles = user_role_repo.get_user_roles_model(session, kind, kind_id, user)
-        perms = role_perm_service.get_roles_union_perms(session=session, roles=user_roles, kind=kind, is_owner=is_owner)
+        compiled = get_compiled_perms()
+        if is_owner:
+            mask = compiled.all_mask
+        else:
+            mask = perms_cache.get_or_load(
+                user.user_id, kind, kind_id,
+                lambda: role_perm_service.get_roles_union_mask(
+                    session, user_role_repo.get_user_roles_model(session, kind, kind_id, user)))
         data = {"user_id": user.user_id}
-        data.update(perms)
+        data.update({"permissions": compiled.render(mask, kind)})
         return data
 
 
@@ -539,23 +528,20 @@ class RolePermService(object):
         self.delete_role_perms(session, role_id)
         self.unpack_role_perms_tree(session, perms_model, role_id, get_perms_name_code_kv())
 
+    def get_roles_union_mask(self, session: SessionClass, roles):
+        """
+        多个角色权限并集的位图
+        """
+        if not roles:
+            return 0
+        role_ids = [role.role_id for role in roles]
+        roles_perm_relation_mode = role_perm_repo.get_roles_perm_relation(session, role_ids)
+        return get_compiled_perms().mask([mode.perm_code for mode in roles_perm_relation_mode])
+
     def get_roles_union_perms(self, session: SessionClass, roles, kind=None, is_owner=False):
-        union_role_perms = []
-        if roles:
-            role_ids = [role.role_id for role in roles]
-            roles_perm_relation_mode = role_perm_repo.get_roles_perm_relation(session, role_ids)
-            if roles_perm_relation_mode:
-                # roles_perm_relations = roles_perm_relation_mode.values("role_id", "perm_code")
-                union_role_perms = [mode.perm_code for mode in roles_perm_relation_mode]
-                # for roles_perm_relation in roles_perm_relations:
-                #     union_role_perms.append(roles_perm_relation["perm_code"])
-        if kind == "team":
-            permissions = self.pack_role_perms_tree(get_team_perms_model(), union_role_perms, is_owner)
-        elif kind == "enterprise":
-            permissions = self.pack_role_perms_tree(get_enterprise_perms_model(), union_role_perms, is_owner)
-        else:
-            permissions = self.pack_role_perms_tree(get_perms_model(), union_role_perms, is_owner)
-        return {"permissions": permissions}
+        compiled = get_compiled_perms()
+        mask = compiled.all_mask if is_owner else self.get_roles_union_mask(session, roles)
+        return {"permissions": compiled.render(mask, kind)}
 
     # 角色权限树打包
     def pack_role_perms_tree(self, models, role_codes, is_owner=False):
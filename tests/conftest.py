@@ -0,0 +1,36 @@
+"""
+测试公共 fixture
+"""
+import pytest
+
+
+@pytest.fixture()
+def counted_session():
+    """
+    创建 SQLite 内存库会话, session.statements 记录执行的 SQL, 用于统计查询次数
+    用法: session = counted_session(Model1, Model2, ...)
+    """
+    sqlalchemy = pytest.importorskip("sqlalchemy")
+    from sqlalchemy.orm import sessionmaker
+
+    created = []
+
+    def _make(*models):
+        engine = sqlalchemy.create_engine("sqlite://")
+        for model in models:
+            model.__table__.create(engine)
+        # 与 SessionClass 一致, 提交后不过期, 避免统计到重新加载 seed 对象的查询
+        session = sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)()
+        session.statements = []
+
+        @sqlalchemy.event.listens_for(engine, "before_cursor_execute")
+        def _count(conn, cursor, statement, parameters, context, executemany):
+            session.statements.append(statement)
+
+        created.append((engine, session))
+        return session
+
+    yield _make
+    for engine, session in created:
+        session.close()
+        engine.dispose()
@@ -0,0 +1,108 @@
+"""
+app_manage_service.deploy_services_info: 批量构建预取的查询次数与组件数量无关, 结果与逐组件查询一致
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from models.component.models import (ComponentEnvVar, ComponentSourceInfo, TeamComponentEnv,  # noqa: E402
+                                     TeamComponentInfo)
+from models.users.oauth import OAuthServices, UserOAuthServices  # noqa: E402
+from models.users.users import Users  # noqa: E402
+from service.app_actions import app_manage  # noqa: E402
+from service.app_actions.app_manage import app_manage_service  # noqa: E402
+
+TABLES = [ComponentEnvVar, TeamComponentEnv, ComponentSourceInfo, OAuthServices, UserOAuthServices]
+OAUTH_SERVICE_NUM = 3
+
+
+class _FakeOAuth(object):
+
+    def is_git_oauth(self):
+        return True
+
+    def get_clone_url(self, url):
+        return url.replace("https://", "https://oauth2:token@")
+
+
+@pytest.fixture()
+def session(counted_session):
+    return counted_session(*TABLES)
+
+
+@pytest.fixture()
+def oauth_calls(monkeypatch):
+    calls = []
+
+    def _get_oauth_instance(oauth_type, oauth_service, oauth_user):
+        calls.append(oauth_service.ID)
+        return _FakeOAuth()
+
+    monkeypatch.setattr(app_manage, "get_oauth_instance", _get_oauth_instance)
+    return calls
+
+
+def _seed(session, component_num):
+    """
+    一半源码组件(使用 oauth), 一半镜像组件(私有仓库账号)
+    """
+    user = Users(user_id=1, nick_name="u")
+    for i in range(OAUTH_SERVICE_NUM):
+        session.add(OAuthServices(ID=i + 1, name="oauth{}".format(i), client_id="c", client_secret="s",
+                                  redirect_uri="", oauth_type="gitlab", enable=True, is_deleted=False))
+        session.add(UserOAuthServices(service_id=i + 1, user_id=user.user_id, access_token="token"))
+    services = []
+    for i in range(component_num):
+        service_id = "s{}".format(i)
+        from_source = i % 2 == 0
+        service = TeamComponentInfo(
+            service_id=service_id, tenant_id="t1", service_alias="gr{}".format(i), service_region="region1",
+            category="application", image="nginx", service_key="application", build_upgrade=True,
+            service_source="source_code" if from_source else "docker_image",
+            git_url="https://git.example.com/repo{}.git".format(i), code_version="master",
+            oauth_service_id=i % OAUTH_SERVICE_NUM + 1 if from_source else None)
+        services.append(service)
+        session.add(ComponentEnvVar(tenant_id="t1", service_id=service_id, attr_name="BUILD_GOPROXY",
+                                    attr_value="proxy{}".format(i), scope="build"))
+        session.add(ComponentEnvVar(tenant_id="t1", service_id=service_id, attr_name="PORT",
+                                    attr_value="80", scope="inner"))
+        session.add(TeamComponentEnv(service_id=service_id, user_dependency="{}"))
+        session.add(ComponentSourceInfo(team_id="t1", service_id=service_id, user_name="admin",
+                                        password="pwd{}".format(i)))
+    session.commit()
+    return user, services
+
+
+def _deploy(session, services, user):
+    tenant = type("Tenant", (), {"tenant_id": "t1", "enterprise_id": "eid"})()
+    _, body = app_manage_service.deploy_services_info(session, {}, services, tenant, user)
+    return {info["service_id"]: info for info in body["build_infos"]}
+
+
+@pytest.mark.parametrize("component_num", [1, 10, 200])
+def test_deploy_prefetch_query_count(session, oauth_calls, component_num):
+    user, services = _seed(session, component_num)
+
+    # 逐组件查询构建环境变量, 每个组件 2 次查询
+    session.statements.clear()
+    per_component_envs = {service.service_id: app_manage_service.get_build_envs(session, "t1", service.service_id)
+                          for service in services}
+    assert len(session.statements) == 2 * component_num
+
+    session.statements.clear()
+    infos = _deploy(session, services, user)
+    # 构建环境变量 2 次, 源码信息 1 次, oauth 服务及用户授权各 1 次
+    assert len(session.statements) == 5
+    # 同一个 oauth 服务只创建一次实例
+    assert sorted(oauth_calls) == sorted(set(oauth_calls))
+
+    assert len(infos) == component_num
+    for i, service in enumerate(services):
+        info = infos[service.service_id]
+        assert info["envs"] == per_component_envs[service.service_id]
+        assert info["envs"]["GOPROXY"] == "proxy{}".format(i)
+        if service.service_source == "source_code":
+            assert info["code_info"]["repo_url"].startswith("https://oauth2:token@")
+        else:
+            assert info["image_info"]["password"] == "pwd{}".format(i)
@@ -0,0 +1,117 @@
+"""
+async_remote_app_client.proxy_stream: 请求体与响应体按块透传, 内存占用与传输大小无关
+"""
+import asyncio
+import time
+import tracemalloc
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+pytest.importorskip("starlette")
+
+from starlette.requests import Request  # noqa: E402
+
+from clients import async_remote_app_client as async_remote_app_module  # noqa: E402
+from clients.async_remote_app_client import async_remote_app_client  # noqa: E402
+from exceptions.main import ServiceHandleException  # noqa: E402
+
+CHUNK_SIZE = 64 * 1024
+BODY_SIZE = 64 * 1024 * 1024
+# 传输 2 x 64MB, 内存峰值只允许若干个块
+MEMORY_LIMIT = 4 * 1024 * 1024
+
+
+def _chunks(total):
+    chunk = b"x" * CHUNK_SIZE
+    for _ in range(total // CHUNK_SIZE):
+        yield chunk
+
+
+def _request(total):
+    """
+    分块上传 total 字节的请求
+    """
+    chunks = _chunks(total)
+
+    async def receive():
+        chunk = next(chunks, None)
+        if chunk is None:
+            return {"type": "http.request", "body": b"", "more_body": False}
+        return {"type": "http.request", "body": chunk, "more_body": True}
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/wt-proxy/upload",
+        "query_string": b"",
+        "headers": [(b"transfer-encoding", b"chunked"), (b"content-type", b"application/octet-stream")],
+    }
+    return Request(scope, receive)
+
+
+class _UpstreamTransport(httpx.AsyncBaseTransport):
+    """
+    模拟集群: 逐块读取请求体并计数, 分块响应 BODY_SIZE 字节;
+    httpx.MockTransport 会把响应体整体读入内存, 这里不能使用
+    """
+
+    def __init__(self):
+        self.received = []
+
+    async def handle_async_request(self, request):
+        size = 0
+        async for chunk in request.stream:
+            size += len(chunk)
+        self.received.append(size)
+
+        async def _body():
+            for chunk in _chunks(BODY_SIZE):
+                yield chunk
+
+        return httpx.Response(200, content=_body())
+
+
+@pytest.fixture()
+def upstream(monkeypatch):
+    transport = _UpstreamTransport()
+    client = httpx.AsyncClient(transport=transport)
+
+    async def _get_async_client(region_config):
+        return client
+
+    monkeypatch.setattr(async_remote_app_client, "get_async_client", _get_async_client)
+    return transport.received
+
+
+def test_proxy_stream_memory_bounded(upstream):
+    async def _proxy():
+        response = await async_remote_app_client.proxy_stream(_request(BODY_SIZE), "http://region/upload",
+                                                              region=None)
+        size = 0
+        async for chunk in response.body_iterator:
+            size += len(chunk)
+        await response.background()
+        return response.status_code, size
+
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        status_code, size = asyncio.run(_proxy())
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert status_code == 200
+    assert upstream == [BODY_SIZE]
+    assert size == BODY_SIZE
+    assert peak < MEMORY_LIMIT, "peak {} bytes".format(peak)
+    print("proxied {}MB each way in {:.2f}s, peak {:.1f}KB".format(BODY_SIZE >> 20, elapsed, peak / 1024))
+
+
+def test_proxy_stream_body_limit(upstream, monkeypatch):
+    monkeypatch.setattr(async_remote_app_module, "PROXY_MAX_BODY_SIZE", 1024 * 1024)
+    with pytest.raises(ServiceHandleException) as exc_info:
+        asyncio.run(async_remote_app_client.proxy_stream(_request(BODY_SIZE), "http://region/upload", region=None))
+    assert exc_info.value.status_code == 413
+    assert upstream == []
@@ -0,0 +1,77 @@
+"""
+service_info_repo.get_group_service_by_group_id: 查询次数与组件数量无关, 只查询当前页组件的状态
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from models.application.models import Application, ComponentApplicationRelation  # noqa: E402
+from models.component.models import TeamComponentInfo  # noqa: E402
+from repository.component.group_service_repo import service_info_repo  # noqa: E402
+from service.base_services import base_service  # noqa: E402
+
+TABLES = [TeamComponentInfo, Application, ComponentApplicationRelation]
+
+
+@pytest.fixture()
+def session(counted_session):
+    return counted_session(*TABLES)
+
+
+@pytest.fixture()
+def status_calls(monkeypatch):
+    """
+    替换集群状态查询, 记录每次查询的组件
+    """
+    calls = []
+
+    def _status_multi_service(session, region, tenant_name, service_ids, enterprise_id, use_cache=True):
+        calls.append(list(service_ids))
+        return [{"service_id": service_id, "status": "running", "status_cn": "运行中"} for service_id in service_ids]
+
+    monkeypatch.setattr(base_service, "status_multi_service", _status_multi_service)
+    return calls
+
+
+def _seed(session, component_num):
+    app = Application(ID=1, tenant_id="t1", group_name="app", region_name="region1")
+    session.add(app)
+    for i in range(component_num):
+        service_id = "s{}".format(i)
+        session.add(TeamComponentInfo(ID=i + 1, service_id=service_id, tenant_id="t1", service_key="application",
+                                      service_alias="gr{}".format(i), service_cname="component{}".format(i),
+                                      service_region="region1", category="application", version="latest",
+                                      image="nginx", service_source="docker_image", create_status="complete"))
+        session.add(ComponentApplicationRelation(service_id=service_id, group_id=app.ID, tenant_id="t1",
+                                                 region_name="region1"))
+    session.commit()
+
+
+def _list(session, page=None, page_size=None):
+    return service_info_repo.get_group_service_by_group_id(session, group_id=1, region_name="region1",
+                                                           team_id="t1", team_name="team", enterprise_id="eid",
+                                                           page=page, page_size=page_size)
+
+
+@pytest.mark.parametrize("component_num", [1, 10, 200])
+def test_list_group_services_query_count(session, status_calls, component_num):
+    _seed(session, component_num)
+    session.statements.clear()
+    services = _list(session)
+    assert len(session.statements) == 1
+    assert len(status_calls) == 1
+    assert len(services) == component_num
+    assert {service["service_source"] for service in services} == {"docker_image"}
+    assert {service["status"] for service in services} == {"running"}
+
+
+@pytest.mark.parametrize("component_num", [10, 200])
+def test_list_group_services_page(session, status_calls, component_num):
+    _seed(session, component_num)
+    session.statements.clear()
+    services = _list(session, page=2, page_size=5)
+    assert len(session.statements) == 1
+    assert len(services) == 5
+    # 只查询当前页组件的状态
+    assert status_calls == [[service["service_id"] for service in services]]
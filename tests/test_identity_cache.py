@@ -0,0 +1,115 @@
+"""
+get_current_user / get_current_team: 缓存命中时不查询数据库, 每次返回新的 detached 对象;
+并对比缓存路径与数据库加载路径的单次耗时
+"""
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+pytest.importorskip("jose")
+
+from jose import jwt  # noqa: E402
+
+from common import identity_cache as identity_cache_module  # noqa: E402
+from common.identity_cache import identity_cache  # noqa: E402
+from core import deps  # noqa: E402
+from core.setting import settings  # noqa: E402
+from models.teams import TeamInfo  # noqa: E402
+from models.users.users import Users  # noqa: E402
+
+ROUNDS = 200
+
+
+class _FakeRedis(object):
+    """
+    进程内的异步 redis, 只实现 identity_cache 用到的 get/set
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+@pytest.fixture()
+def redis(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(identity_cache_module, "async_redis_client", fake)
+    identity_cache.local.clear()
+    yield fake
+    identity_cache.local.clear()
+
+
+@pytest.fixture()
+def session(counted_session):
+    session = counted_session(Users, TeamInfo)
+    session.add(Users(user_id=1, email="u@example.com", nick_name="u", password="x", origion="", github_token="",
+                      client_ip="", rf="", union_id="", enterprise_id="eid"))
+    session.add(TeamInfo(ID=1, tenant_id="t1", tenant_name="team1", pay_type="free", namespace="ns1", creater=1))
+    session.commit()
+    session.statements.clear()
+    return session
+
+
+def _authorization():
+    return "Bearer " + jwt.encode({"user_id": 1}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def test_current_user_cached(session, redis):
+    authorization = _authorization()
+    user = asyncio.run(deps.get_current_user(None, authorization, session))
+    assert user.user_id == 1
+    assert len(session.statements) == 1
+
+    # 进程内缓存命中
+    cached = asyncio.run(deps.get_current_user(None, authorization, session))
+    assert len(session.statements) == 1
+    assert cached is not user
+    assert cached.nick_name == user.nick_name
+
+    # 进程内缓存过期, redis 命中
+    identity_cache.local.clear()
+    cached = asyncio.run(deps.get_current_user(None, authorization, session))
+    assert len(session.statements) == 1
+    assert cached.email == user.email
+
+
+def test_current_team_cached(session, redis):
+    team = asyncio.run(deps.get_current_team(None, "team1", session))
+    assert len(session.statements) == 1
+    cached = asyncio.run(deps.get_current_team(None, "team1", session))
+    assert len(session.statements) == 1
+    assert cached is not team
+    assert cached.tenant_id == team.tenant_id
+
+
+def test_identity_dependency_cost(session, redis):
+    """
+    单次依赖耗时: 每次从数据库加载 vs 缓存命中
+    """
+    authorization = _authorization()
+
+    async def _resolve(clear):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            if clear:
+                identity_cache.local.clear()
+                redis.data.clear()
+            await deps.get_current_user(None, authorization, session)
+            await deps.get_current_team(None, "team1", session)
+        return (time.perf_counter() - start) / ROUNDS
+
+    db_cost = asyncio.run(_resolve(clear=True))
+    statements = len(session.statements)
+    assert statements == 2 * ROUNDS
+    cached_cost = asyncio.run(_resolve(clear=False))
+    assert len(session.statements) == statements
+    print("identity per request: db {:.1f}us, cached {:.1f}us".format(db_cost * 1e6, cached_cost * 1e6))
+    assert cached_cost < db_cost
@@ -0,0 +1,79 @@
+"""
+region_client_pool 熔断: 只有连接失败计入, 读超时重试耗尽不计入
+"""
+import socket
+import threading
+
+import pytest
+
+urllib3 = pytest.importorskip("urllib3")
+
+from common.region_client_pool import RegionClientPoolRegistry, is_connection_failure  # noqa: E402
+from exceptions.main import ServiceHandleException  # noqa: E402
+
+
+def _request(port, read_timeout=0.2):
+    with pytest.raises(urllib3.exceptions.MaxRetryError) as exc_info:
+        urllib3.PoolManager().request("GET", "http://127.0.0.1:{}/".format(port), retries=2,
+                                      timeout=urllib3.Timeout(connect=1, read=read_timeout))
+    return exc_info.value
+
+
+def test_connection_refused_is_failure():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    assert is_connection_failure(_request(port))
+
+
+def test_read_timeout_is_not_failure():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+    accepted = []
+    stop = threading.Event()
+
+    def _accept():
+        # 接受连接但不响应
+        server.settimeout(0.1)
+        while not stop.is_set():
+            try:
+                accepted.append(server.accept()[0])
+            except socket.timeout:
+                continue
+
+    thread = threading.Thread(target=_accept, daemon=True)
+    thread.start()
+    try:
+        e = _request(server.getsockname()[1])
+        assert isinstance(e.reason, urllib3.exceptions.ReadTimeoutError)
+        assert not is_connection_failure(e)
+    finally:
+        stop.set()
+        thread.join()
+        for conn in accepted:
+            conn.close()
+        server.close()
+
+
+def test_breaker_counts_only_failures():
+    registry = RegionClientPoolRegistry()
+    registry.failure_threshold = 2
+    registry.cooldown = 0
+    for _ in range(5):
+        registry.record_error("r1")
+    registry.check_breaker("r1")
+
+    registry.record_failure("r1")
+    registry.record_failure("r1")
+    # 冷却期结束后放行一次试探, 试探未结束时拒绝其他请求
+    registry.check_breaker("r1")
+    with pytest.raises(ServiceHandleException):
+        registry.check_breaker("r1")
+    # 试探遇到不计入熔断的错误, 下一个请求继续试探
+    registry.record_error("r1")
+    registry.check_breaker("r1")
+    registry.record_success("r1")
+    registry.check_breaker("r1")
+    registry.check_breaker("r1")
@@ -0,0 +1,78 @@
+"""
+region_executor.run_with_session: 线程内使用独立的数据库会话, 执行结束后关闭
+"""
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from common import region_executor as region_executor_module  # noqa: E402
+from common.region_executor import RegionExecutor  # noqa: E402
+
+
+class _FakeSession(object):
+
+    def __init__(self):
+        self.thread = threading.get_ident()
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture()
+def sessions(monkeypatch):
+    created = []
+
+    def _session_class():
+        session = _FakeSession()
+        created.append(session)
+        return session
+
+    monkeypatch.setattr(region_executor_module, "SessionClass", _session_class)
+    return created
+
+
+def test_run_with_session(sessions):
+    executor = RegionExecutor(max_workers=1, max_pending=2)
+
+    def _query(session, region_name, page=None):
+        assert not session.closed
+        return threading.get_ident(), region_name, page
+
+    try:
+        thread, region_name, page = asyncio.run(
+            executor.run_with_session("region1", _query, region_name="region1", page=2))
+    finally:
+        executor.shutdown()
+    # 调用方的 region_name 关键字参数传给 func
+    assert (region_name, page) == ("region1", 2)
+    assert thread != threading.get_ident()
+    assert len(sessions) == 1
+    assert sessions[0].thread == thread
+    assert sessions[0].closed
+
+
+def test_session_closed_after_cancel(sessions):
+    executor = RegionExecutor(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    def _slow(session):
+        release.wait(5)
+
+    async def _cancel():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(executor.run_with_session("region1", _slow), 0.05)
+        # 调用方已取消, 线程仍在使用自己的会话
+        assert not sessions[0].closed
+        release.set()
+        while executor.stats()["region1"]["pending"]:
+            await asyncio.sleep(0.01)
+
+    try:
+        asyncio.run(_cancel())
+    finally:
+        executor.shutdown()
+    assert sessions[0].closed
@@ -0,0 +1,69 @@
+"""
+team_services.list_user_teams_details: 查询次数与团队数量无关, 结果与逐团队查询一致
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from core.utils.perms import get_compiled_perms  # noqa: E402
+from models.region.models import TeamRegionInfo  # noqa: E402
+from models.relate.models import EnterpriseUserPerm  # noqa: E402
+from models.teams import TeamInfo  # noqa: E402
+from models.teams.team import PermRelTenant, RegionConfig, RoleInfo, RolePerms, UserRole  # noqa: E402
+from models.users.users import Users  # noqa: E402
+from repository.users.user_role_repo import user_role_repo  # noqa: E402
+from service.region_service import get_region_list_by_team_name  # noqa: E402
+from service.team_service import team_services  # noqa: E402
+from service.user_service import role_perm_service  # noqa: E402
+
+TABLES = [TeamInfo, PermRelTenant, TeamRegionInfo, RegionConfig, RoleInfo, RolePerms, UserRole,
+          EnterpriseUserPerm, Users]
+
+
+@pytest.fixture()
+def session(counted_session):
+    return counted_session(*TABLES)
+
+
+def _seed(session, team_num):
+    user = Users(user_id=1, email="u@example.com", nick_name="u", password="x", origion="", github_token="",
+                 client_ip="", rf="", union_id="", enterprise_id="eid")
+    session.add(user)
+    session.add(RegionConfig(region_id="r1", region_name="region1", region_alias="region1", url="", wsurl="",
+                             httpdomain="", tcpdomain="", status="1", desc=""))
+    perm_codes = sorted(get_compiled_perms().bits)[:3]
+    for i in range(team_num):
+        tenant_id = "t{}".format(i)
+        session.add(TeamInfo(ID=i + 1, tenant_id=tenant_id, tenant_name="team{}".format(i), pay_type="free",
+                             namespace="ns{}".format(i), creater=1 if i % 5 == 0 else 2))
+        session.add(PermRelTenant(user_id=1, tenant_id=i + 1, enterprise_id=0))
+        session.add(TeamRegionInfo(tenant_id=tenant_id, region_name="region1", is_active=True, is_init=True))
+        role = RoleInfo(ID=i + 1, name="dev{}".format(i), kind="team", kind_id=tenant_id)
+        session.add(role)
+        if i % 2 == 0:
+            session.add(UserRole(user_id="1", role_id=str(role.ID)))
+            for code in perm_codes[:i % 3 + 1]:
+                session.add(RolePerms(role_id=role.ID, perm_code=code))
+    session.commit()
+    return user
+
+
+@pytest.mark.parametrize("team_num", [1, 10, 200])
+def test_list_user_teams_details(session, team_num):
+    user = _seed(session, team_num)
+    session.statements.clear()
+    details = team_services.list_user_teams_details(session, user)
+    assert len(session.statements) <= 7
+
+    assert len(details) == team_num
+    for detail in details:
+        tenant = session.get(TeamInfo, detail["team_id"])
+        is_team_owner = tenant.creater == user.user_id
+        assert detail["is_team_owner"] == is_team_owner
+        assert detail["region"] == get_region_list_by_team_name(session, tenant.tenant_name)
+        assert detail["role_name_list"] == user_role_repo.get_user_roles(
+            session=session, kind="team", kind_id=tenant.tenant_id, user=user)["roles"]
+        roles = user_role_repo.get_user_roles_model(session, "team", tenant.tenant_id, user)
+        expected = role_perm_service.get_roles_union_perms(session, roles, "team", is_owner=is_team_owner)
+        assert detail["tenant_actions"] == expected["permissions"]
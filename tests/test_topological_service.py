@@ -0,0 +1,115 @@
+"""
+topological_service.get_group_topological_graph: 查询次数与组件数量无关, 实例数按组件计数
+"""
+import time
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("fastapi")
+
+from common.topology_cache import topology_cache  # noqa: E402
+from models.application.models import ComponentApplicationRelation  # noqa: E402
+from models.component.models import TeamComponentInfo, TeamComponentPort  # noqa: E402
+from models.relate.models import TeamComponentRelation  # noqa: E402
+from service import topological_service as topological_module  # noqa: E402
+from service.topological_service import render_topology, topological_service  # noqa: E402
+
+TABLES = [ComponentApplicationRelation, TeamComponentRelation, TeamComponentInfo, TeamComponentPort]
+PODS_PER_COMPONENT = 10
+
+
+@pytest.fixture()
+def session(counted_session):
+    return counted_session(*TABLES)
+
+
+@pytest.fixture()
+def region(monkeypatch):
+    """
+    替换集群状态与实例查询, 每个组件 PODS_PER_COMPONENT 个实例
+    """
+    calls = []
+
+    def _get_statuses(session, region, tenant_name, service_ids, enterprise_id):
+        calls.append("status")
+        return [{"service_id": service_id, "status": "running", "status_cn": "运行中"} for service_id in service_ids]
+
+    def _get_dynamic_services_pods(session, region, tenant_name, service_ids):
+        calls.append("pods")
+        return {"list": [{"service_id": service_id, "pod_name": "{}-{}".format(service_id, i)}
+                         for service_id in service_ids for i in range(PODS_PER_COMPONENT)]}
+
+    monkeypatch.setattr(topological_module.component_status_cache, "get_statuses", _get_statuses)
+    monkeypatch.setattr(topological_module.remote_component_client, "get_dynamic_services_pods",
+                        _get_dynamic_services_pods)
+    monkeypatch.setattr(topology_cache, "epoch", lambda: 1)
+    topology_cache.local.clear()
+    yield calls
+    topology_cache.local.clear()
+
+
+def _seed(session, component_num):
+    """
+    组件依次依赖前一个组件, 每 10 个组件有一个开启对外端口
+    """
+    for i in range(component_num):
+        service_id = "s{}".format(i)
+        session.add(TeamComponentInfo(service_id=service_id, tenant_id="t1", service_key="application",
+                                      service_alias="gr{}".format(i), service_cname="component{}".format(i),
+                                      service_region="region1", category="application", version="latest",
+                                      image="nginx", service_source="docker_image", create_status="complete"))
+        session.add(ComponentApplicationRelation(service_id=service_id, group_id=1, tenant_id="t1",
+                                                 region_name="region1"))
+        if i > 0:
+            session.add(TeamComponentRelation(tenant_id="t1", service_id=service_id,
+                                              dep_service_id="s{}".format(i - 1), dep_order=0))
+        if i % 10 == 0:
+            session.add(TeamComponentPort(service_id=service_id, k8s_service_name=service_id, container_port=80,
+                                          is_outer_service=True))
+    session.commit()
+
+
+def _graph(session):
+    return topological_service.get_group_topological_graph(session, 1, "region1", "team", "eid")
+
+
+@pytest.mark.parametrize("component_num", [10, 500])
+def test_topology_query_count(session, region, component_num):
+    _seed(session, component_num)
+
+    session.statements.clear()
+    graph = _graph(session)
+    # 应用组件、依赖关系、组件信息、对外端口各一次
+    assert len(session.statements) == 4
+    assert region == ["status", "pods"]
+
+    # 快照命中后只查询应用组件
+    session.statements.clear()
+    assert _graph(session) == graph
+    assert len(session.statements) == 1
+
+    json_data = graph["json_data"]
+    assert len(json_data) == component_num
+    assert {data["node_num"] for data in json_data.values()} == {PODS_PER_COMPONENT}
+    assert {data["cur_status"] for data in json_data.values()} == {"running"}
+    assert json_data["s0"]["is_internet"] and not json_data["s1"]["is_internet"]
+    assert graph["json_svg"]["s0"] == []
+    assert graph["json_svg"]["s{}".format(component_num - 1)] == ["s{}".format(component_num - 2)]
+
+
+def test_render_large_topology(session, region):
+    """
+    500 个组件、5000 个实例, 实例计数只遍历一次实例列表
+    """
+    _seed(session, 500)
+    snapshot = topological_service._build_snapshot(session, ["s{}".format(i) for i in range(500)])
+    pods = [{"service_id": "s{}".format(i % 500)} for i in range(5000)]
+    statuses = {service_id: {"status": "running"} for service_id in snapshot.service_ids}
+    start = time.perf_counter()
+    for _ in range(10):
+        graph = render_topology(snapshot, statuses, pods)
+    elapsed = (time.perf_counter() - start) / 10
+    assert sum(data["node_num"] for data in graph["json_data"].values()) == 5000
+    # 逐组件扫描实例列表需要 250 万次比较; 按组件计数后单次渲染远小于该量级
+    assert elapsed < 0.1
@@ -0,0 +1,41 @@
+"""
+topology_cache: 依赖关系变更在事务提交后才失效快照, 回滚时不失效
+"""
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from common.topology_cache import topology_cache  # noqa: E402
+from models.relate.models import TeamComponentRelation  # noqa: E402
+from repository.component.service_config_repo import dep_relation_repo  # noqa: E402
+
+
+@pytest.fixture()
+def session(counted_session):
+    return counted_session(TeamComponentRelation)
+
+
+@pytest.fixture()
+def invalidations(monkeypatch):
+    calls = []
+    monkeypatch.setattr(topology_cache, "invalidate_now", lambda: calls.append(1))
+    return calls
+
+
+def test_invalidate_after_commit(session, invalidations):
+    dep_relation_repo.add_service_dependency(session, tenant_id="t1", service_id="s1", dep_service_id="s2",
+                                             dep_order=0)
+    session.flush()
+    assert invalidations == []
+    session.commit()
+    assert invalidations == [1]
+    # 之后的事务没有依赖变更, 不再失效
+    session.commit()
+    assert invalidations == [1]
+
+
+def test_discard_on_rollback(session, invalidations):
+    dep_relation_repo.delete_service_relation(session, "t1", "s1")
+    session.rollback()
+    session.commit()
+    assert invalidations == []